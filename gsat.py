@@ -34,10 +34,9 @@ __description__ = \
 
 import os
 import sys
-import wx
-from optparse import OptionParser
+from optparse import OptionParser, OptionGroup
 
-import modules.mainwnd as mw
+import modules.config as gc
 
 
 """----------------------------------------------------------------------------
@@ -63,16 +62,72 @@ def get_cli_params():
       dest="vverbose", action="store_true", default=False,
       help="print extra extra information while processing input file.")
 
+   # headless mode, defaults same as UI settings
+   configData = gc.gsatConfigData()
+
+   group = OptionGroup(parser, "Headless mode",
+      "Run a g-code file from the command line without wxPython, progress is "\
+      "printed to stdout, exit status is 0 on success.")
+
+   group.add_option("--headless",
+      dest="headless", action="store_true", default=False,
+      help="don't start UI, requires --port and --run.")
+
+   group.add_option("--run", dest="run",
+      help="g-code file to run.", metavar="FILE")
+
+   group.add_option("--port", dest="port",
+      help="serial port device is connected to.", metavar="PORT")
+
+   group.add_option("--baud", dest="baud", default=configData.Get('/machine/Baud'),
+      help="serial port baud rate [default: %default].")
+
+   group.add_option("--device", dest="device", default=configData.Get('/machine/Device'),
+      choices=gc.gDEV_LIST,
+      help="device type %s [default: %%default]." % gc.gDEV_LIST)
+
+   group.add_option("--streaming",
+      dest="streaming", action="store_true", default=configData.Get('/machine/Streaming'),
+      help="stream lines (character counting or queue reports) instead of waiting for each "\
+         "acknowledge.")
+
+   group.add_option("--rx-buffer", dest="rxBufferSize", type="int",
+      default=configData.Get('/machine/RxBufferSize'),
+      help="device RX buffer size for streaming [default: %default].")
+
+   group.add_option("--queue-threshold", dest="queueThreshold", type="int",
+      default=configData.Get('/machine/QueueThreshold'),
+      help="TinyG/TinyG2 streaming, planner free slots threshold [default: %default].")
+
+   group.add_option("--trace", dest="traceFile", default="",
+      help="write binary per line timing trace to FILE.", metavar="FILE")
+
+   group.add_option("--process",
+      dest="processExec", action="store_true", default=configData.Get('/machine/ProcessExec'),
+      help="run serial link in a worker process.")
+
+   group.add_option("--timeout", dest="timeout", type="int", default=10,
+      help="seconds to wait for device to respond [default: %default].")
+
+   parser.add_option_group(group)
+
    (options, args) = parser.parse_args()
 
    # check arguments sanity
    if options.vverbose:
       options.verbose = True
 
-   if not wx.VERSION >= (2,8,0,0):
-      print "** Required wxPython 2.7 or grater."
-      options.error()
-      error(1)
+   if options.headless:
+      if options.port is None or options.run is None:
+         parser.error("--headless requires --port and --run")
+
+   else:
+      import wx
+
+      if not wx.VERSION >= (2,8,0,0):
+         print "** Required wxPython 2.7 or grater."
+         options.error()
+         error(1)
 
    return (options, args)
 
@@ -83,6 +138,14 @@ if __name__ == '__main__':
 
    (cmd_line_options, cli_args) = get_cli_params()
 
+   if cmd_line_options.headless:
+      import modules.headless as hl
+
+      sys.exit(hl.gsatHeadless(cmd_line_options).Run())
+
+   import wx
+   import modules.mainwnd as mw
+
    app = wx.App(0)
    mw.gsatMainWindow(None, title=__appname__, cmd_line_options=cmd_line_options)
    app.MainLoop()
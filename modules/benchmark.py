@@ -0,0 +1,318 @@
+"""----------------------------------------------------------------------------
+   benchmark.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import sys
+import json
+import math
+import time
+import array
+import platform
+import resource
+import threading
+import collections
+import multiprocessing
+from optparse import OptionParser
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# case name : (default line count, line generator)
+def GenShortSegments(index):
+   return "G1 X%0.3f Y%0.3f" % ((index % 1000) * 0.01, (index / 1000 % 1000) * 0.01)
+
+def GenLongArcs(index):
+   return "G2 X%0.4f Y%0.4f Z%0.4f I%0.4f J%0.4f F1500.0" % \
+      (math.cos(index) * 50.0, math.sin(index) * 50.0, -0.1 * (index % 10), -25.0, 25.0)
+
+def GenCommentHeavy(index):
+   if index % 4 == 0:
+      return "(step %d: move to next point, tool T1 3.175mm flat end mill, climb milling)" % index
+   return "G1 X%0.3f Y%0.3f ; feature %d pass %d" % (index * 0.01, index * 0.02, index / 100, index % 3)
+
+gBENCH_CASES = collections.OrderedDict([
+   ('short_segments',   (20000, GenShortSegments)),
+   ('long_arcs',        (5000, GenLongArcs)),
+   ('comment_heavy',    (20000, GenCommentHeavy)),
+   ('million_lines',    (1000000, GenShortSegments)),
+])
+
+gBENCH_MODES = ['ack', 'stream']
+
+"""----------------------------------------------------------------------------
+   gsatTimingSerial:
+   Serial port proxy, records write time of every line and matches device
+   acknowledges (in order) to compute ack round trip times.
+----------------------------------------------------------------------------"""
+class gsatTimingSerial():
+   def __init__(self, serial_port, is_ack):
+      self.serPort = serial_port
+      self.IsAck = is_ack
+      self.lock = threading.Lock()
+      self.pendingWrites = collections.deque()
+      self.rxBuffer = ""
+      self.ackTimes = array.array('d')
+      self.bytesWritten = 0
+
+   def __getattr__(self, name):
+      return getattr(self.serPort, name)
+
+   def write(self, data):
+      now = time.time()
+
+      with self.lock:
+         for i in range(data.count('\n')):
+            self.pendingWrites.append(now)
+         self.bytesWritten += len(data)
+
+      return self.serPort.write(data)
+
+   def read(self, size=1):
+      data = self.serPort.read(size)
+      now = time.time()
+
+      with self.lock:
+         self.rxBuffer = "".join([self.rxBuffer, data])
+
+         while '\n' in self.rxBuffer:
+            line, self.rxBuffer = self.rxBuffer.split('\n', 1)
+
+            if len(self.pendingWrites) > 0 and self.IsAck("%s\n" % line):
+               self.ackTimes.append(now - self.pendingWrites.popleft())
+
+      return data
+
+"""----------------------------------------------------------------------------
+   Helpers
+----------------------------------------------------------------------------"""
+def Percentile(sortedData, pct):
+   if len(sortedData) == 0:
+      return 0.0
+
+   index = int(math.ceil(pct / 100.0 * len(sortedData))) - 1
+   return sortedData[max(0, min(index, len(sortedData) - 1))]
+
+class gsatBenchOptions():
+   verbose = False
+   vverbose = False
+
+"""----------------------------------------------------------------------------
+   RunCase:
+   Runs in its own process so CPU time and peak memory belong to gsat only,
+   simulator runs on the parent process.
+----------------------------------------------------------------------------"""
+def RunCase(port_name, device, case, mode, line_count, rx_buffer_size, result_queue):
+   import Queue
+   import serial
+   import modules.config as gc
+   import modules.device as dev
+   import modules.program as prog
+   import modules.progexec as progexec
+
+   deviceID = dev.GetDeviceID(device)
+   lineGenerator = gBENCH_CASES[case][1]
+
+   # build program, same as file open
+   t0 = time.time()
+   rawText = "\n".join([lineGenerator(i) for i in xrange(line_count)])
+   program = prog.gsatProgram(prog.SplitLines(rawText))
+   rawText = None
+   compileTime = time.time() - t0
+
+   # engine
+   serPort = serial.Serial(port_name, 115200, timeout=1)
+   timingPort = gsatTimingSerial(serPort, dev.GetDevice(deviceID).IsAcknowledge)
+   inQueue = Queue.Queue()
+   outQueue = Queue.Queue()
+
+   usage0 = resource.getrusage(resource.RUSAGE_SELF)
+   t0 = time.time()
+
+   execThread = progexec.gsatProgramExecuteThread(None, timingPort, inQueue, outQueue,
+      gsatBenchOptions(), deviceID, 0, mode == 'stream', rx_buffer_size)
+
+   inQueue.put(gc.threadEvent(gc.gEV_CMD_RUN, [program, 0, set()]))
+
+   result = dict()
+   while True:
+      e = outQueue.get()
+
+      if e.event_id == gc.gEV_RUN_END:
+         break
+
+      if e.event_id == gc.gEV_ABORT:
+         result['error'] = str(e.data).strip()
+         break
+
+   elapsed = time.time() - t0
+   usage1 = resource.getrusage(resource.RUSAGE_SELF)
+
+   inQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
+   execThread.join(5)
+   serPort.close()
+
+   ackTimes = sorted(timingPort.ackTimes)
+   cpuUser = usage1.ru_utime - usage0.ru_utime
+   cpuSystem = usage1.ru_stime - usage0.ru_stime
+
+   # ru_maxrss is KB on Linux, bytes on Mac
+   peakRss = usage1.ru_maxrss
+   if sys.platform == 'darwin':
+      peakRss = peakRss / 1024
+
+   result.update({
+      'case'            : case,
+      'device'          : device,
+      'mode'            : mode,
+      'lines'           : line_count,
+      'bytes'           : timingPort.bytesWritten,
+      'compile_s'       : round(compileTime, 4),
+      'elapsed_s'       : round(elapsed, 4),
+      'lines_per_s'     : round(line_count / elapsed, 1),
+      'bytes_per_s'     : round(timingPort.bytesWritten / elapsed, 1),
+      'ack_rtt_ms'      : {
+         'count'  : len(ackTimes),
+         'p50'    : round(Percentile(ackTimes, 50) * 1000.0, 3),
+         'p95'    : round(Percentile(ackTimes, 95) * 1000.0, 3),
+         'p99'    : round(Percentile(ackTimes, 99) * 1000.0, 3),
+         'max'    : round(Percentile(ackTimes, 100) * 1000.0, 3),
+      },
+      'cpu_s'           : {'user':round(cpuUser, 3), 'system':round(cpuSystem, 3)},
+      'cpu_pct'         : round((cpuUser + cpuSystem) / elapsed * 100.0, 1),
+      'peak_rss_kb'     : peakRss,
+   })
+
+   result_queue.put(result)
+
+"""----------------------------------------------------------------------------
+   RunBenchmark:
+   Runs every case/mode against a fresh simulator, returns list of results.
+----------------------------------------------------------------------------"""
+def RunBenchmark(cases, modes, device="Grbl", line_count=None, line_delay=0.0,
+   rx_buffer_size=None, timeout=3600, verbose=False):
+   import modules.simulator as sim
+
+   results = []
+
+   for case in cases:
+      for mode in modes:
+         simDevice = sim.gsatDeviceSimulator(device, line_delay=line_delay,
+            rx_buffer_size=rx_buffer_size)
+         portName = simDevice.Start()
+
+         # gsat side keeps one byte of margin, like Grbl 127 of 128
+         rxBufferSize = simDevice.rxBufferSize - 1
+         lineCount = line_count or gBENCH_CASES[case][0]
+
+         if verbose:
+            print "Running %s/%s, %d lines on %s %s..." % (case, mode, lineCount, device, portName)
+            sys.stdout.flush()
+
+         resultQueue = multiprocessing.Queue()
+         proc = multiprocessing.Process(target=RunCase, args=(portName, device, case, mode,
+            lineCount, rxBufferSize, resultQueue))
+         proc.start()
+
+         try:
+            result = resultQueue.get(timeout=timeout)
+         except Exception:
+            result = dict({'case':case, 'device':device, 'mode':mode, 'error':'timeout'})
+            proc.terminate()
+
+         proc.join()
+
+         simStats = simDevice.GetStats()
+         simDevice.Stop()
+
+         result['line_delay_ms'] = line_delay * 1000.0
+         result['device_rx_overflow'] = simStats['rxOverflow']
+         result['device_rx_peak'] = simStats['rxBufferPeak']
+
+         if verbose:
+            print "   %(lines_per_s)10.1f lines/s %(bytes_per_s)12.1f bytes/s  cpu %(cpu_pct)5.1f%%  "\
+               "rss %(peak_rss_kb)d KB" % result if 'error' not in result else "   error: %s" % result['error']
+            if 'ack_rtt_ms' in result:
+               print "   ack rtt ms p50 %(p50)0.3f p95 %(p95)0.3f p99 %(p99)0.3f max %(max)0.3f" % \
+                  result['ack_rtt_ms']
+            sys.stdout.flush()
+
+         results.append(result)
+
+   return results
+
+"""----------------------------------------------------------------------------
+   main:
+   Run benchmark, results written as JSON.
+----------------------------------------------------------------------------"""
+if __name__ == '__main__':
+   parser = OptionParser(usage="usage: %prog [options]")
+   parser.add_option("-o", "--output", dest="output", default="benchmark.json",
+      help="JSON results file [default: %default]", metavar="FILE")
+   parser.add_option("--case", dest="cases", action="append", default=None,
+      help="Case to run, can be repeated %s [default: all]" % gBENCH_CASES.keys())
+   parser.add_option("--mode", dest="modes", action="append", default=None,
+      help="Mode to run, can be repeated %s [default: all]" % gBENCH_MODES)
+   parser.add_option("-d", "--device", dest="device", default="Grbl",
+      help="Simulated device [default: %default]")
+   parser.add_option("--lines", dest="lines", type="int", default=None,
+      help="Override line count of every case")
+   parser.add_option("--delay", dest="lineDelay", type="float", default=0.0,
+      help="Simulated device line execution time in milliseconds [default: %default]")
+   parser.add_option("--rx-buffer", dest="rxBufferSize", type="int", default=None,
+      help="Simulated device RX buffer size in bytes")
+   parser.add_option("-q", "--quiet", dest="verbose", action="store_false", default=True,
+      help="don't print progress")
+
+   (options, args) = parser.parse_args()
+
+   cases = options.cases or gBENCH_CASES.keys()
+   modes = options.modes or gBENCH_MODES
+
+   for case in cases:
+      if case not in gBENCH_CASES:
+         parser.error("unknown case [%s]" % case)
+
+   for mode in modes:
+      if mode not in gBENCH_MODES:
+         parser.error("unknown mode [%s]" % mode)
+
+   results = RunBenchmark(cases, modes, options.device, options.lines, options.lineDelay/1000.0,
+      options.rxBufferSize, verbose=options.verbose)
+
+   report = dict({
+      'timestamp' : time.strftime("%Y-%m-%dT%H:%M:%S"),
+      'python'    : platform.python_version(),
+      'platform'  : platform.platform(),
+      'results'   : results,
+   })
+
+   with open(options.output, 'w') as f:
+      json.dump(report, f, indent=2, sort_keys=True)
+
+   if options.verbose:
+      print "Results written to %s" % options.output
+
+   # non zero exit if any case failed
+   sys.exit(int(any(['error' in r for r in results])))
@@ -23,13 +23,18 @@
 
 ----------------------------------------------------------------------------"""
 
-import wx
+# wx is optional, headless mode only needs the constants and thread events
+try:
+   import wx
+except ImportError:
+   wx = None
 
 """----------------------------------------------------------------------------
    Globals:
 ----------------------------------------------------------------------------"""
-gEdityBkColor = wx.WHITE
-gReadOnlyBkColor = wx.Colour(242, 241, 240)
+if wx is not None:
+   gEdityBkColor = wx.WHITE
+   gReadOnlyBkColor = wx.Colour(242, 241, 240)
 
 
 gWILDCARD = \
@@ -54,24 +59,50 @@ gDEVICE_CMD_JOG_Z             = "G00 Z<VAL>\n"
 gDEVICE_CMD_SPINDLE_ON        = "M3\n"
 gDEVICE_CMD_SPINDLE_OFF       = "M5\n"
 
+# real-time commands, device acts on them as soon as they arrive, no
+# acknowledge and they don't use RX buffer space
+gDEVICE_CMD_FEED_HOLD         = "!"
+gDEVICE_CMD_CYCLE_START       = "~"
+gDEVICE_CMD_RESET             = "\x18"
+
 # --------------------------------------------------------------------------
 # TinyG/TinyG2 commands
 # --------------------------------------------------------------------------
 gTINYG_CMD_GET_STATUS         = "?\n"
+gTINYG_CMD_QUEUE_REPORT_ON    = "$qv=1\n"
 gTINYG_CMD_RESET_TO_VAL       = "G28.3 <AXIS><VAL>\n"
 gTINYG_CMD_ALL_RESET_TO_VAL   = "G28.3 X<XVAL> Y<YVAL> Z<ZVAL>\n"
 gTINYG_CMD_GO_HOME            = "G28.2 <AXIS>0\n"
 gTINYG_CMD_ALL_GO_HOME        = "G28.2 X0 Y0 Z0\n"
 
+# JSON mode
+gTINYG_JSON_CMD_JSON_ON       = "{\"ej\":1}\n"
+gTINYG_JSON_CMD_GET_STATUS    = "{\"sr\":null}\n"
+gTINYG_JSON_CMD_QUEUE_REPORT_ON = "{\"qv\":1}\n"
+
 # --------------------------------------------------------------------------
 # Grbl commands
 # --------------------------------------------------------------------------
 gGRBL_CMD_GET_STATUS          = "?\n"
+gGRBL_RT_GET_STATUS           = "?"
 gGRBL_CMD_RESET_TO_VAL        = "G92 <AXIS><VAL>\n"
 gGRBL_CMD_ALL_RESET_TO_VAL    = "G92 X<XVAL> Y<YVAL> Z<ZVAL>\n"
 gGRBL_CMD_GO_HOME             = "G28.2 <AXIS>0\n"
 gGRBL_CMD_ALL_GO_HOME         = "G28.2 X0 Y0 Z0\n"
 
+# --------------------------------------------------------------------------
+# Grbl 1.1 commands
+# --------------------------------------------------------------------------
+gGRBL11_CMD_RESET_TO_VAL      = "G10 L20 P0 <AXIS><VAL>\n"
+gGRBL11_CMD_ALL_RESET_TO_VAL  = "G10 L20 P0 X<XVAL> Y<YVAL> Z<ZVAL>\n"
+
+# --------------------------------------------------------------------------
+# Smoothieware commands
+# --------------------------------------------------------------------------
+gSMOOTHIE_CMD_GET_VERSION     = "version\n"
+gSMOOTHIE_CMD_GO_HOME         = "G28 <AXIS>0\n"
+gSMOOTHIE_CMD_ALL_GO_HOME     = "G28\n"
+
 # --------------------------------------------------------------------------
 # state machine states and transition
 # --------------------------------------------------------------------------
@@ -125,6 +156,7 @@ gEV_CMD_SEND         = 1060
 gEV_CMD_SEND_W_ACK   = 1062
 gEV_CMD_AUTO_STATUS  = 1070
 gEV_CMD_OK_TO_POST   = 1080
+gEV_CMD_REALTIME     = 1090
 
 gEV_NULL             = 0100
 gEV_ABORT            = 2000
@@ -139,6 +171,8 @@ gEV_SER_RXDATA       = 2080
 gEV_TIMER            = 2090
 gEV_DATA_STATUS      = 2100
 gEV_DEVICE_DETECTED  = 2110
+gEV_DATA_TIMING      = 2120
+gEV_DATA_ERROR       = 2130
 
 # --------------------------------------------------------------------------
 # Device type
@@ -147,8 +181,13 @@ gDEV_NONE            = 0000
 gDEV_GRBL            = 1000
 gDEV_TINYG           = 1100
 gDEV_TINYG2          = 1200
+gDEV_GRBL11          = 1010
+gDEV_SMOOTHIE        = 1300
+gDEV_TINYG_JSON      = 1110
+gDEV_TINYG2_JSON     = 1210
 
-gDEV_LIST = ["Grbl", "TinyG", "TinyG2"]
+# device names, as saved in config, see device.py for each device protocol
+gDEV_LIST = ["Grbl", "Grbl 1.1", "TinyG", "TinyG JSON", "TinyG2", "TinyG2 JSON", "Smoothieware"]
 
 """----------------------------------------------------------------------------
    gsatStateData:
@@ -169,8 +208,6 @@ class gsatStateData():
       self.deviceDetected = False
 
       # machine status
-      self.machineStatusAutoRefresh = False
-      self.machineStatusAutoRefreshPeriod = 1
       self.machineStatusString ="Idle"
 
       # program status
@@ -179,6 +216,7 @@ class gsatStateData():
       self.fileIsOpen = False
       self.gcodeFileName = ""
       self.gcodeFileLines = []
+      self.gcodeProgram = None
 
 """----------------------------------------------------------------------------
    gsatStateData:
@@ -208,6 +246,8 @@ class gsatConfigData():
          '/code/CaretLine'                   :(True , True),
          '/code/CaretLineForeground'         :(False, '#000000'),
          '/code/CaretLineBackground'         :(False, '#EFEFEF'), #C299A9 #A9C299, 9D99C2
+         # MB, files this size or larger open in the read only viewer, 0:Never
+         '/code/LargeFileSize'               :(True , 32),
          '/code/LineNumber'                  :(True , True),
          '/code/LineNumberForeground'        :(False, '#000000'),
          '/code/LineNumberBackground'        :(False, '#99A9C2'),
@@ -230,6 +270,8 @@ class gsatConfigData():
          '/output/LineNumber'                :(True , False),
          '/output/LineNumberForeground'      :(False, '#000000'),
          '/output/LineNumberBackground'      :(False, '#FFFFFF'),
+         '/output/LogFile'                   :(False, ""),
+         '/output/MaxLines'                  :(True , 10000),
          '/output/ReadOnly'                  :(True , False),
          '/output/WindowForeground'          :(False, '#000000'),
          '/output/WindowBackground'          :(False, '#FFFFFF'),
@@ -248,11 +290,17 @@ class gsatConfigData():
          '/machine/Device'                   :(False, "TinyG2"),
          '/machine/Port'                     :(False, ""),
          '/machine/Baud'                     :(False, "115200"),
-         '/machine/AutoStatus'               :(True , False),
          '/machine/AutoRefresh'              :(True , False),
          '/machine/AutoRefreshPeriod'        :(True , 1000),
+         '/machine/StatusRate'               :(True , 30),
          '/machine/InitScript'               :(False, ""),
          '/machine/GrblDroHack'              :(True , False),
+         '/machine/Streaming'                :(True , False),
+         '/machine/RxBufferSize'             :(True , 127),
+         '/machine/QueueThreshold'           :(True , 4),
+         '/machine/TraceFile'                :(False, ""),
+         '/machine/Machines'                 :(False, ""),
+         '/machine/ProcessExec'              :(True , False),
 
       # jogging keys
          '/jogging/XYZReadOnly'              :(True , False),
@@ -355,13 +403,14 @@ def EVT_THREAD_QUEUE_EVENT(win, func):
    """Define thread data event."""
    win.Connect(-1, -1, EVT_THREAD_QUEQUE_EVENT_ID, func)
 
-class threadQueueEvent(wx.PyEvent):
-   """Simple event to carry arbitrary data."""
-   def __init__(self, data):
-      """Init Result Event."""
-      wx.PyEvent.__init__(self)
-      self.SetEventType(EVT_THREAD_QUEQUE_EVENT_ID)
-      self.data = data
+if wx is not None:
+   class threadQueueEvent(wx.PyEvent):
+      """Simple event to carry arbitrary data."""
+      def __init__(self, data):
+         """Init Result Event."""
+         wx.PyEvent.__init__(self)
+         self.SetEventType(EVT_THREAD_QUEQUE_EVENT_ID)
+         self.data = data
 
 class threadEvent():
    def __init__(self, event_id, data):
@@ -0,0 +1,406 @@
+"""----------------------------------------------------------------------------
+   device.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import re
+import json
+import collections
+
+import modules.config as gc
+import modules.status as st
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# streaming flow control
+gFLOW_ACK         = 0   # no streaming, wait for each acknowledge
+gFLOW_CHAR_COUNT  = 1   # lines sent while they fit in device RX buffer
+gFLOW_QUEUE_REPORT= 2   # character counting and planner queue reports
+
+# acknowledge
+gReGrblAck = re.compile(r'^ok\s$')                 # grbl example  "ok"
+gReGrblErrorAck = re.compile(r'^error:.*\s$')      # grbl example  "error: Bad number format"
+gReTinyGAck = re.compile(r'\sok>\s$')              # tinyG example "tinyg [mm] ok>"
+gReTinyGErrorAck = re.compile(r'^.*\serr:.*\s$')   # tinyG example "tinyg [mm] err: ..."
+gReSmoothieErrorAck = re.compile(r'^!!\s$')        # smoothie halted, every line gets "!!"
+
+# grbl version, example "Grbl 0.8c ['$' for help]"
+gReGrblVersion = re.compile(r'Grbl\s*(.*)\s*\[.*\]')
+
+# TinyG detect, example "tinyg [mm] ok>"
+gReTinyGDetect = re.compile(r'tinyg\s+(.*)\s+ok>')
+
+# smoothie detect, "version" response example "Build version: edge-94de12c, ..."
+# or "Smoothie" sent on reset
+gReSmoothieDetect = re.compile(r'Build version:|^Smoothie')
+
+# tinyG queue report example "qr:28"
+gReTinyGQueueReport = re.compile(r'qr:(\d+)')
+
+# devices by device ID, see RegisterDevice
+gDEVICES = collections.OrderedDict()
+
+"""----------------------------------------------------------------------------
+   gsatDevice:
+   Device protocol, one class per device (controller firmware). Class
+   attributes hold the protocol data, command templates are the same format
+   as gc.gDEVICE_CMD_*. The program execute thread keeps one instance per
+   link, status parser state (Grbl 1.1 work offsets) belongs to the link.
+
+   This base device knows "ok" acknowledges only, used for unknown devices.
+----------------------------------------------------------------------------"""
+class gsatDevice():
+   name = ""
+   deviceID = gc.gDEV_NONE
+
+   statusParserClass = None
+   flowControl = gFLOW_ACK
+
+   reDetect = None
+   reAcknowledge = [gReGrblAck]
+   reErrorAck = []
+
+   # status request line, and real-time status request for devices that
+   # only report when asked (None for devices with automatic reports)
+   getStatusCmd = None
+   statusPollCmd = None
+
+   # command templates, <AXIS> <VAL> and <XVAL> <YVAL> <ZVAL> are replaced
+   resetToValCmd = gc.gGRBL_CMD_RESET_TO_VAL
+   allResetToValCmd = gc.gGRBL_CMD_ALL_RESET_TO_VAL
+   goHomeCmd = gc.gGRBL_CMD_GO_HOME
+   allGoHomeCmd = gc.gGRBL_CMD_ALL_GO_HOME
+
+   def __init__(self):
+      self.statusParser = None
+      if self.statusParserClass is not None:
+         self.statusParser = self.statusParserClass()
+
+   def GetInitCommands(self, streaming):
+      """ Lines sent when link opens.
+      """
+      return []
+
+   def Detect(self, serialData):
+      return self.reDetect is not None and self.reDetect.search(serialData) is not None
+
+   def IsAcknowledge(self, serialData):
+      # ok and error replies, both complete a line
+      for reAcknowledge in self.reAcknowledge:
+         if reAcknowledge.search(serialData) is not None:
+            return True
+
+      return self.GetError(serialData) is not None
+
+   def GetError(self, serialData):
+      """ Error message of an error acknowledge, None if not an error.
+      """
+      for reErrorAck in self.reErrorAck:
+         if reErrorAck.search(serialData) is not None:
+            return serialData.strip()
+
+      return None
+
+   def ParseStatus(self, serialData):
+      if self.statusParser is None:
+         return None
+
+      return self.statusParser.Parse(serialData)
+
+   def ParseQueueReport(self, serialData):
+      """ Planner queue free slots, None if not a queue report.
+      """
+      return None
+
+"""----------------------------------------------------------------------------
+   gsatGrblDevice:
+   Grbl 0.8/0.9, reports status when asked with real-time "?".
+----------------------------------------------------------------------------"""
+class gsatGrblDevice(gsatDevice):
+   name = "Grbl"
+   deviceID = gc.gDEV_GRBL
+
+   statusParserClass = st.gsatGrblStatusParser
+   flowControl = gFLOW_CHAR_COUNT
+
+   reDetect = gReGrblVersion
+   reAcknowledge = [gReGrblAck]
+   reErrorAck = [gReGrblErrorAck]
+
+   getStatusCmd = gc.gGRBL_CMD_GET_STATUS
+   statusPollCmd = gc.gGRBL_RT_GET_STATUS
+
+   def GetInitCommands(self, streaming):
+      return [gc.gGRBL_CMD_GET_STATUS, gc.gGRBL_CMD_GET_STATUS]
+
+"""----------------------------------------------------------------------------
+   gsatGrbl11Device:
+   Grbl 1.1, "|" separated status reports, work offset set with G10 L20.
+----------------------------------------------------------------------------"""
+class gsatGrbl11Device(gsatGrblDevice):
+   name = "Grbl 1.1"
+   deviceID = gc.gDEV_GRBL11
+
+   resetToValCmd = gc.gGRBL11_CMD_RESET_TO_VAL
+   allResetToValCmd = gc.gGRBL11_CMD_ALL_RESET_TO_VAL
+
+"""----------------------------------------------------------------------------
+   gsatTinyGDevice:
+   TinyG, sends status reports on its own while moving, streaming uses
+   planner queue reports.
+----------------------------------------------------------------------------"""
+class gsatTinyGDevice(gsatDevice):
+   name = "TinyG"
+   deviceID = gc.gDEV_TINYG
+
+   statusParserClass = st.gsatTinyGStatusParser
+   flowControl = gFLOW_QUEUE_REPORT
+
+   reDetect = gReTinyGDetect
+   reAcknowledge = [gReTinyGAck]
+   reErrorAck = [gReTinyGErrorAck]
+
+   getStatusCmd = gc.gTINYG_CMD_GET_STATUS
+
+   resetToValCmd = gc.gTINYG_CMD_RESET_TO_VAL
+   allResetToValCmd = gc.gTINYG_CMD_ALL_RESET_TO_VAL
+   goHomeCmd = gc.gTINYG_CMD_GO_HOME
+   allGoHomeCmd = gc.gTINYG_CMD_ALL_GO_HOME
+
+   def GetInitCommands(self, streaming):
+      # status request helps to force TinyG into text mode
+      initCmds = [gc.gTINYG_CMD_GET_STATUS]
+
+      # streaming needs queue reports for flow control
+      if streaming:
+         initCmds.append(gc.gTINYG_CMD_QUEUE_REPORT_ON)
+
+      return initCmds
+
+   def ParseQueueReport(self, serialData):
+      if 'qr:' not in serialData:
+         return None
+
+      rematch = gReTinyGQueueReport.search(serialData)
+      if rematch is None:
+         return None
+
+      return int(rematch.group(1))
+
+"""----------------------------------------------------------------------------
+   gsatTinyG2Device:
+   TinyG2 (g2core), same protocol as TinyG in text mode.
+----------------------------------------------------------------------------"""
+class gsatTinyG2Device(gsatTinyGDevice):
+   name = "TinyG2"
+   deviceID = gc.gDEV_TINYG2
+
+"""----------------------------------------------------------------------------
+   gsatTinyGJsonDevice:
+   TinyG in JSON mode, every line the device sends is one JSON object:
+   {"r":{...},"f":[...]} responses, one per line received, footer second
+   value is the line status (0 ok), {"sr":{...}} status reports and
+   {"qr":n} queue reports. Each line is decoded once, Decode keeps the
+   last line and its object for the calls that follow on the same line.
+----------------------------------------------------------------------------"""
+class gsatTinyGJsonDevice(gsatTinyGDevice):
+   name = "TinyG JSON"
+   deviceID = gc.gDEV_TINYG_JSON
+
+   statusParserClass = None
+
+   reDetect = None
+   reAcknowledge = []
+   reErrorAck = []
+
+   getStatusCmd = gc.gTINYG_JSON_CMD_GET_STATUS
+
+   def __init__(self):
+      gsatTinyGDevice.__init__(self)
+
+      self.jsonLine = None
+      self.jsonData = None
+
+   def GetInitCommands(self, streaming):
+      # device answers JSON commands in JSON, ej switches text mode off
+      initCmds = [gc.gTINYG_JSON_CMD_JSON_ON, gc.gTINYG_JSON_CMD_GET_STATUS]
+
+      # streaming needs queue reports for flow control
+      if streaming:
+         initCmds.append(gc.gTINYG_JSON_CMD_QUEUE_REPORT_ON)
+
+      return initCmds
+
+   def Decode(self, serialData):
+      """ JSON object of line, None for lines that are not JSON (text mode
+          prompt before ej is processed, garbled lines).
+      """
+      if serialData != self.jsonLine:
+         self.jsonLine = serialData
+         self.jsonData = None
+
+         if serialData.startswith('{'):
+            try:
+               jsonData = json.loads(serialData)
+            except ValueError:
+               jsonData = None
+
+            if isinstance(jsonData, dict):
+               self.jsonData = jsonData
+
+      return self.jsonData
+
+   def GetResponse(self, serialData):
+      jsonData = self.Decode(serialData)
+
+      if jsonData is None:
+         return None
+
+      return jsonData.get('r')
+
+   def Detect(self, serialData):
+      return self.GetResponse(serialData) is not None
+
+   def IsAcknowledge(self, serialData):
+      return self.GetResponse(serialData) is not None
+
+   def GetError(self, serialData):
+      response = self.GetResponse(serialData)
+
+      if response is None:
+         return None
+
+      # footer is next to "r", inside it on older firmware
+      footer = self.jsonData.get('f')
+      if footer is None and isinstance(response, dict):
+         footer = response.get('f')
+
+      if not isinstance(footer, list) or len(footer) < 2 or footer[1] == 0:
+         return None
+
+      message = None
+      if isinstance(response, dict):
+         message = response.get('msg')
+
+      if message is None:
+         return "error %s" % str(footer[1])
+
+      return "error %s: %s" % (str(footer[1]), str(message))
+
+   def ParseStatus(self, serialData):
+      jsonData = self.Decode(serialData)
+
+      if jsonData is None:
+         return None
+
+      # status report, or response to {"sr":null}
+      report = jsonData.get('sr')
+      if report is None and isinstance(jsonData.get('r'), dict):
+         report = jsonData['r'].get('sr')
+
+      if not isinstance(report, dict):
+         return None
+
+      return st.TinyGReportRecord(report.iteritems())
+
+   def ParseQueueReport(self, serialData):
+      jsonData = self.Decode(serialData)
+
+      if jsonData is None:
+         return None
+
+      plannerFree = jsonData.get('qr')
+      if plannerFree is None and isinstance(jsonData.get('r'), dict):
+         plannerFree = jsonData['r'].get('qr')
+
+      if not isinstance(plannerFree, (int, long)):
+         return None
+
+      return plannerFree
+
+"""----------------------------------------------------------------------------
+   gsatTinyG2JsonDevice:
+   TinyG2 (g2core) in JSON mode, same protocol as TinyG.
+----------------------------------------------------------------------------"""
+class gsatTinyG2JsonDevice(gsatTinyGJsonDevice):
+   name = "TinyG2 JSON"
+   deviceID = gc.gDEV_TINYG2_JSON
+
+"""----------------------------------------------------------------------------
+   gsatSmoothieDevice:
+   Smoothieware, Grbl like status reports on real-time "?". No fixed RX
+   buffer to count characters against, lines wait for their acknowledge.
+----------------------------------------------------------------------------"""
+class gsatSmoothieDevice(gsatDevice):
+   name = "Smoothieware"
+   deviceID = gc.gDEV_SMOOTHIE
+
+   statusParserClass = st.gsatGrblStatusParser
+   flowControl = gFLOW_ACK
+
+   reDetect = gReSmoothieDetect
+   reAcknowledge = [gReGrblAck]
+   reErrorAck = [gReGrblErrorAck, gReSmoothieErrorAck]
+
+   getStatusCmd = gc.gGRBL_CMD_GET_STATUS
+   statusPollCmd = gc.gGRBL_RT_GET_STATUS
+
+   goHomeCmd = gc.gSMOOTHIE_CMD_GO_HOME
+   allGoHomeCmd = gc.gSMOOTHIE_CMD_ALL_GO_HOME
+
+   def GetInitCommands(self, streaming):
+      # version response is used to detect device
+      return [gc.gSMOOTHIE_CMD_GET_VERSION]
+
+"""----------------------------------------------------------------------------
+   Device registry:
+----------------------------------------------------------------------------"""
+def RegisterDevice(device_class):
+   gDEVICES[device_class.deviceID] = device_class
+
+def GetDeviceClass(device_id):
+   # class attributes only (commands, flags), no per link state
+   return gDEVICES.get(device_id, gsatDevice)
+
+def GetDevice(device_id):
+   return GetDeviceClass(device_id)()
+
+def GetDeviceID(device_name):
+   for deviceClass in gDEVICES.itervalues():
+      if deviceClass.name == device_name:
+         return deviceClass.deviceID
+
+   return gc.gDEV_NONE
+
+def GetDeviceNames():
+   return [deviceClass.name for deviceClass in gDEVICES.itervalues()]
+
+RegisterDevice(gsatGrblDevice)
+RegisterDevice(gsatGrbl11Device)
+RegisterDevice(gsatTinyGDevice)
+RegisterDevice(gsatTinyGJsonDevice)
+RegisterDevice(gsatTinyG2Device)
+RegisterDevice(gsatTinyG2JsonDevice)
+RegisterDevice(gsatSmoothieDevice)
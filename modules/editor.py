@@ -25,13 +25,45 @@
 
 import os
 import re
+import time
+import codecs
+import shutil
+import threading
+import Queue
 import wx
 from wx import stc as stc
 from wx.lib import scrolledpanel as scrolled
 from wx.lib import colourselect as  csel
 
 import modules.config as gc
+import modules.program as prog
 
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# g-code tokens for highlighting, comments first so keywords or numbers in
+# comments are not styled, tokens don't span lines
+gReStyleToken = re.compile(
+   r'(?P<comment>\(.*\)|;.*)'
+   r'|(?P<gcode>[GM]\d+\.{0,1}\d*)'
+   r'|(?P<number>N\d+)'
+   r'|(?P<param>[DEFHLOPQRST])(?=[ \t]*[-+]*\d)'
+   r'|(?P<axis>[ABCIJKUVWXYZ])(?=[ \t]*[-+]*\d)', re.IGNORECASE)
+
+gSTYLE_TOKENS = {
+   'comment':stc.STC_P_COMMENTLINE, 'gcode':stc.STC_P_OPERATOR, 'number':stc.STC_P_IDENTIFIER,
+   'param':stc.STC_P_WORD2, 'axis':stc.STC_P_WORD,
+}
+
+# cached lines, cache starts over past this
+gSTYLE_CACHE_MAX = 100000
+
+# background styling, bytes per chunk, chunks waiting and seconds of idle
+# time spent applying chunks
+gSTYLE_CHUNK_SIZE = 65536
+gSTYLE_CHUNK_QUEUE = 16
+gSTYLE_IDLE_TIME = 0.02
 
 def hex_to_rgb(hex_color):
    m = re.match(r'^#?([0-9a-f]{2})([0-9a-f]{2})([0-9a-f]{2})$',
@@ -103,6 +135,48 @@ class gsatStyledTextCtrlSettingsPanel(scrolled.ScrolledPanel):
 
       vBoxSizer.Add(gBoxSizer, 0, wx.ALL|wx.EXPAND, border=5)
 
+      if self.key == 'output':
+         hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+         text = wx.StaticText(self, label="Max Lines")
+         hBoxSizer.Add(text, 0, flag=wx.ALIGN_CENTER_VERTICAL)
+
+         self.scMaxLines = wx.SpinCtrl(self, wx.ID_ANY, "")
+         self.scMaxLines.SetRange(0,10000000)
+         self.scMaxLines.SetValue(self.configData.Get('/%s/MaxLines' % self.key))
+         self.scMaxLines.SetToolTip(
+            wx.ToolTip("Oldest lines are dropped past this count (0 keeps all lines)"))
+         hBoxSizer.Add(self.scMaxLines, 0, flag=wx.ALL|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+         vBoxSizer.Add(hBoxSizer, 0, wx.LEFT|wx.EXPAND|wx.ALIGN_LEFT, border=20)
+
+         hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+         text = wx.StaticText(self, label="Log File")
+         hBoxSizer.Add(text, 0, flag=wx.ALIGN_CENTER_VERTICAL)
+
+         self.tcLogFile = wx.TextCtrl(self, wx.ID_ANY, self.configData.Get('/%s/LogFile' % self.key))
+         self.tcLogFile.SetToolTip(
+            wx.ToolTip("Full output transcript is appended to this file (empty to disable)"))
+         hBoxSizer.Add(self.tcLogFile, 1, flag=wx.ALL|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+         vBoxSizer.Add(hBoxSizer, 0, wx.LEFT|wx.EXPAND|wx.ALIGN_LEFT, border=20)
+
+      if self.key == 'code':
+         hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+         text = wx.StaticText(self, label="Large File Size (MB)")
+         hBoxSizer.Add(text, 0, flag=wx.ALIGN_CENTER_VERTICAL)
+
+         self.scLargeFileSize = wx.SpinCtrl(self, wx.ID_ANY, "")
+         self.scLargeFileSize.SetRange(0,100000)
+         self.scLargeFileSize.SetValue(self.configData.Get('/%s/LargeFileSize' % self.key))
+         self.scLargeFileSize.SetToolTip(
+            wx.ToolTip("Files this size or larger open in a read only line viewer (0 never)"))
+         hBoxSizer.Add(self.scLargeFileSize, 0, flag=wx.ALL|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+         vBoxSizer.Add(hBoxSizer, 0, wx.LEFT|wx.EXPAND|wx.ALIGN_LEFT, border=20)
+
       # Colors
       text = wx.StaticText(self, label="Colors")
       font = wx.Font(10, wx.DEFAULT, wx.NORMAL, wx.BOLD)
@@ -243,7 +317,17 @@ class gsatStyledTextCtrlSettingsPanel(scrolled.ScrolledPanel):
       self.configData.Set('/%s/LineNumberBackground' % self.key,
          self.lineNumbersBackground.GetColour().GetAsString(wx.C2S_HTML_SYNTAX))
 
+      if self.key == 'output':
+         self.configData.Set('/%s/MaxLines' % self.key,
+            self.scMaxLines.GetValue())
+
+         self.configData.Set('/%s/LogFile' % self.key,
+            self.tcLogFile.GetValue())
+
       if self.key == 'code':
+         self.configData.Set('/%s/LargeFileSize' % self.key,
+            self.scLargeFileSize.GetValue())
+
          self.configData.Set('/%s/GCodeHighlight' % self.key,
             self.gCodeHighlight.GetColour().GetAsString(wx.C2S_HTML_SYNTAX))
 
@@ -274,6 +358,12 @@ class gsatStcStyledTextCtrl(stc.StyledTextCtrl):
       self.stateData = state_data
       self.autoScroll = False
 
+      # batched appends, trimming and log file (output only)
+      self.appendBuffer = []
+      self.configMaxLines = 0
+      self.logFile = None
+      self.logFileName = ""
+
       self.InitConfig()
       self.InitUI()
 
@@ -295,12 +385,17 @@ class gsatStcStyledTextCtrl(stc.StyledTextCtrl):
       self.configCaretLine = self.configData.Get('/output/CaretLine')
       self.configCaretLineForeground = self.configData.Get('/output/CaretLineForeground')
       self.configCaretLineBackground = self.configData.Get('/output/CaretLineBackground')
+      self.configMaxLines = self.configData.Get('/output/MaxLines')
+      self.configLogFile = self.configData.Get('/output/LogFile')
 
       self.SetReadOnly(self.configReadOnly)
 
       if (self.configAutoScroll == 1) or (self.configAutoScroll == 2):
          self.autoScroll = True
 
+      if self.configLogFile != self.logFileName:
+         self.OpenLogFile(self.configLogFile)
+
    def UpdateSettings(self, config_data):
       self.configData = config_data
       self.InitConfig()
@@ -342,6 +437,9 @@ class gsatStcStyledTextCtrl(stc.StyledTextCtrl):
       self.SetMarginMask(1, pow(2,0))
       self.SetMarginMask(2, pow(2,1))
 
+      # output is a log, don't keep undo history for every append
+      self.SetUndoCollection(False)
+
 
    def UpdateUI(self, stateData):
       self.stateData = stateData
@@ -365,13 +463,65 @@ class gsatStcStyledTextCtrl(stc.StyledTextCtrl):
          self.autoScroll = False
 
    def AppendText(self, string):
+      # batch appends, text gets to the control once per UI tick
+      if len(self.appendBuffer) == 0:
+         wx.CallAfter(self.FlushAppendText)
+
+      self.appendBuffer.append(string)
+
+   def FlushAppendText(self):
+      string = "".join(self.appendBuffer)
+      self.appendBuffer = []
+
+      if self.logFile is not None:
+         try:
+            self.logFile.write(string)
+            self.logFile.flush()
+         except IOError, e:
+            self.logFile = None
+            string = "%s** Output log file error: %s\n" % (string, str(e))
+
       readOnly = self.GetReadOnly()
       self.SetReadOnly(False)
       stc.StyledTextCtrl.AppendText(self, string)
+
+      # drop oldest lines in chunks of a tenth of max lines
+      if self.configMaxLines > 0:
+         lineCount = self.GetLineCount()
+         if lineCount > self.configMaxLines + max(1, self.configMaxLines/10):
+            self.SetTargetStart(0)
+            self.SetTargetEnd(self.PositionFromLine(lineCount - self.configMaxLines))
+            self.ReplaceTarget("")
+
       self.SetReadOnly(readOnly)
 
       if self.autoScroll:
-         wx.CallAfter(self.ScrollToEnd)
+         self.ScrollToEnd()
+
+   def SetConsoleText(self, string):
+      # replace console contents (machine switch), not written to log file
+      self.appendBuffer = []
+
+      readOnly = self.GetReadOnly()
+      self.SetReadOnly(False)
+      self.SetText(string)
+      self.SetReadOnly(readOnly)
+
+      if self.autoScroll:
+         self.ScrollToEnd()
+
+   def OpenLogFile(self, fileName):
+      if self.logFile is not None:
+         self.logFile.close()
+         self.logFile = None
+
+      self.logFileName = fileName
+
+      if len(fileName) > 0:
+         try:
+            self.logFile = codecs.open(fileName, 'a', 'utf-8')
+         except IOError, e:
+            self.AppendText("** Unable to open output log file: %s\n" % str(e))
 
    def FindFirstText(self, text):
       lastLine = self.GetLineCount()
@@ -413,6 +563,109 @@ class gsatStcStyledTextCtrl(stc.StyledTextCtrl):
       self.GotoLine(line)
       #self.ScrollToLine(self.GetLineCount())
 
+"""----------------------------------------------------------------------------
+   gsatGcodeStyler:
+   G-code syntax highlighting, a single pass of one combined token regex.
+   Style bytes are cached by line text, unchanged lines are not tokenized
+   again. No wx calls, style data can be made off the UI thread.
+----------------------------------------------------------------------------"""
+class gsatGcodeStyler():
+   def __init__(self):
+      self.cache = dict()
+
+      # style byte by token regex group index
+      self.groupStyles = [chr(stc.STC_P_DEFAULT)] * (gReStyleToken.groups + 1)
+      for name, index in gReStyleToken.groupindex.iteritems():
+         self.groupStyles[index] = chr(gSTYLE_TOKENS[name])
+
+   def Tokenize(self, data):
+      """ Style bytes for data, one per data byte, no caching.
+      """
+      groupStyles = self.groupStyles
+      defaultStyle = groupStyles[0]
+      styles = []
+      position = 0
+
+      for m in gReStyleToken.finditer(data):
+         start, end = m.span()
+         styles.append(defaultStyle * (start - position))
+         styles.append(groupStyles[m.lastindex] * (end - start))
+         position = end
+
+      styles.append(defaultStyle * (len(data) - position))
+      return "".join(styles)
+
+   def Style(self, data):
+      """ Style bytes for data (whole lines, line ends included), lines not
+          in the cache are tokenized together in one pass.
+      """
+      lines = data.splitlines(True)
+      cache = self.cache
+      missLines = [line for line in set(lines) if line not in cache]
+
+      if len(missLines) > gSTYLE_CACHE_MAX:
+         return self.Tokenize(data)
+
+      if len(missLines) > 0:
+         if len(cache) + len(missLines) > gSTYLE_CACHE_MAX:
+            cache.clear()
+            missLines = list(set(lines))
+
+         # tokens don't span lines, lines are joined with a separator
+         styles = self.Tokenize("\n".join(missLines))
+         position = 0
+
+         for line in missLines:
+            cache[line] = styles[position:position + len(line)]
+            position = position + len(line) + 1
+
+      return "".join([cache[line] for line in lines])
+
+"""----------------------------------------------------------------------------
+   gsatGcodeStyleThread:
+   Styles a copy of the loaded text ahead of the editor, (position, style
+   bytes) chunks go to styleQueue in text order. Has its own styler, the
+   editor styler cache is UI thread only.
+----------------------------------------------------------------------------"""
+class gsatGcodeStyleThread(threading.Thread):
+   def __init__(self, data):
+      threading.Thread.__init__(self)
+      self.daemon = True
+
+      self.data = data
+      self.styler = gsatGcodeStyler()
+      self.styleQueue = Queue.Queue(gSTYLE_CHUNK_QUEUE)
+      self.endThread = False
+
+      # start thread
+      self.start()
+
+   def Stop(self):
+      self.endThread = True
+
+   def run(self):
+      position = 0
+
+      while position < len(self.data) and not self.endThread:
+         # chunks end on a line end
+         end = self.data.find('\n', position + gSTYLE_CHUNK_SIZE)
+         if end < 0:
+            end = len(self.data)
+         else:
+            end = end + 1
+
+         chunk = (position, self.styler.Style(self.data[position:end]))
+
+         while not self.endThread:
+            try:
+               self.styleQueue.put(chunk, timeout=0.2)
+               break
+            except Queue.Full:
+               pass
+
+         wx.WakeUpIdle()
+         position = end
+
 """----------------------------------------------------------------------------
    gsatGcodeStcStyledTextCtrl:
    Text control to display GCODE
@@ -424,9 +677,17 @@ class gsatGcodeStcStyledTextCtrl(gsatStcStyledTextCtrl):
       gsatStcStyledTextCtrl.__init__(self, parent, config_data, state_data, id, pos, size,
          style, name)
 
+      # compiled program, kept in sync with text on every modification
+      self.stateData.gcodeProgram = prog.gsatProgram(prog.SplitLines(self.GetText()))
+      self.fileLoading = False
+      self.styler = gsatGcodeStyler()
+      self.styleThread = None
+
       self.InitConfig()
       self.InitUI()
 
+      self.Bind(wx.EVT_IDLE, self.OnIdle)
+
    def InitConfig(self):
       self.configReadOnly                 = self.configData.Get('/code/ReadOnly')
       self.configAutoScroll               = self.configData.Get('/code/AutoScroll')
@@ -501,89 +762,133 @@ class gsatGcodeStcStyledTextCtrl(gsatStcStyledTextCtrl):
       self.SetLexer(stc.STC_LEX_CONTAINER)
 
       self.Bind(stc.EVT_STC_STYLENEEDED, self.onStyleNeeded)
+      self.Bind(stc.EVT_STC_MODIFIED, self.onModified)
 
       # g-code
       self.StyleSetSpec(stc.STC_P_OPERATOR, "fore:%s" % self.configGCodeHighlight)
-      self.reGCode = re.compile(r'[GM]\d+\.{0,1}\d*', re.IGNORECASE)
 
       # axis
       self.StyleSetSpec(stc.STC_P_WORD, "fore:%s" % self.configAxisHighlight)
-      self.reAxis = re.compile(r'([ABCIJKUVWXYZ])(\s*[-+]*\d+\.{0,1}\d*)', re.IGNORECASE)
 
       # parameters
       self.StyleSetSpec(stc.STC_P_WORD2, "fore:%s" % self.configParametersHighlight)
-      self.reParams = re.compile(r'([DEFHLOPQRST])(\s*[-+]*\d+\.{0,1}\d*)', re.IGNORECASE)
 
       # g-code line number
       self.StyleSetSpec(stc.STC_P_IDENTIFIER, "fore:%s" % self.configGCodeLineNumberHighlight)
-      self.reLineNumber = re.compile(r'N\d+', re.IGNORECASE)
 
       # comments
       self.StyleSetSpec(stc.STC_P_COMMENTLINE, "fore:%s" % self.configCommentsHighlight)
-      self.reComments = []
-      self.reComments.append(re.compile(r'\(.*\)'))
-      self.reComments.append(re.compile(r';.*'))
 
    def onStyleNeeded(self, e):
-      stStart = self.GetEndStyled()    # this is the first character that needs styling
-      stEnd = e.GetPosition()          # this is the last character that needs styling
-      stData = self.GetTextRange(stStart, stEnd)
-
-      # need to do styling on line, make sure we don't get stock on a loop
-      # if the first char to style is a new line, getting line form pos will
-      # always return the same line. Nex styling car will always be the
-      # end of line char.
-      if stData[0] == "\n":
-         stStart = stStart + 1
-
-      stLine = self.LineFromPosition(stStart)
+      # style whole lines, from the line of the first char that needs styling
+      # through the end of the line of the last one
+      stLine = self.LineFromPosition(self.GetEndStyled())
       stStart = self.PositionFromLine(stLine)
-      stData = self.GetTextRange(stStart, stEnd)
+      stEnd = self.PositionFromLine(self.LineFromPosition(e.GetPosition()) + 1)
+
+      if stEnd <= stStart:
+         stEnd = self.GetLength()
+
+      stData = self.GetTextRangeRaw(stStart, stEnd)
+
+      if len(stData) > 0:
+         self.StartStyling(stStart, 31)   # only style the text style bits
+         self.SetStyleBytes(len(stData), self.styler.Style(stData))
 
+   def LoadFile(self, fileName):
+      """ Loaded text is compiled in one go, not line by line as modified.
+          The program is the text shown, not the file on disk (large files
+          use gsatGcodeListCtrl and a file program).
+      """
+      self.fileLoading = True
+      try:
+         loaded = gsatStcStyledTextCtrl.LoadFile(self, fileName)
+      finally:
+         self.fileLoading = False
 
-      #print stStart, stEnd, stLine
+      program = prog.gsatProgram(prog.SplitLines(self.GetText()))
+      self.stateData.gcodeProgram = program
 
-      # start with default (revert to default, if text gets modify)
-      self.StartStyling(stStart, 31)   # in this example, only style the text style bits
-      self.SetStyling(len(stData), stc.STC_P_DEFAULT)
+      # style ahead of the view in the background
+      self.StartStyleThread()
+
+      return loaded
+
+   def StartStyleThread(self):
+      self.StopStyleThread()
+
+      if self.GetLength() > 0:
+         self.styleThread = gsatGcodeStyleThread(self.GetTextRaw())
+
+   def StopStyleThread(self):
+      if self.styleThread is not None:
+         self.styleThread.Stop()
+         self.styleThread = None
+
+   def OnIdle(self, e):
+      if self.styleThread is not None:
+         styleQueue = self.styleThread.styleQueue
+         endTime = time.time() + gSTYLE_IDLE_TIME
+
+         while self.styleThread is not None and time.time() < endTime:
+            try:
+               position, styles = styleQueue.get_nowait()
+            except Queue.Empty:
+               break
+
+            self.ApplyStyles(position, styles)
+
+         if self.styleThread is not None:
+            if not styleQueue.empty():
+               e.RequestMore()
+            elif not self.styleThread.isAlive():
+               self.styleThread = None
+
+      e.Skip()
 
-      # match gcodes
-      mArray = self.reGCode.finditer(stData)
+   def ApplyStyles(self, position, styles):
+      # text before end styled is already styled (on demand), past it
+      # styling must be contiguous
+      endStyled = self.GetEndStyled()
 
-      for m in mArray:
-         self.StartStyling(stStart+m.start(0), 31)   # in this example, only style the text style bits
-         self.SetStyling(m.end(0)-m.start(0), stc.STC_P_OPERATOR)
+      if position + len(styles) <= endStyled:
+         return
 
-      # match line number
-      mArray = self.reLineNumber.finditer(stData)
+      if position > endStyled:
+         self.StopStyleThread()
+         return
 
-      for m in mArray:
-         self.StartStyling(stStart+m.start(0), 31)   # in this example, only style the text style bits
-         self.SetStyling(m.end(0)-m.start(0), stc.STC_P_IDENTIFIER)
+      styles = styles[endStyled - position:]
+      self.StartStyling(endStyled, 31)
+      self.SetStyleBytes(len(styles), styles)
 
-      # match paramters
-      mArray = self.reParams.finditer(stData)
+   def onModified(self, e):
+      modType = e.GetModificationType()
 
-      for m in mArray:
-         self.StartStyling(stStart+m.start(1), 31)   # in this example, only style the text style bits
-         self.SetStyling(m.end(1)-m.start(1), stc.STC_P_WORD2)
+      if self.fileLoading:
+         pass
 
-      # match axis
-      mArray = self.reAxis.finditer(stData)
+      elif modType & (stc.STC_MOD_INSERTTEXT | stc.STC_MOD_DELETETEXT):
+         # background styles are for the loaded text
+         self.StopStyleThread()
 
-      for m in mArray:
-         self.StartStyling(stStart+m.start(1), 31)   # in this example, only style the text style bits
-         self.SetStyling(m.end(1)-m.start(1), stc.STC_P_WORD)
+         # text is already modified, lines [stLine, stLine + linesAdded] now
+         # replace the old lines touched by the insert, for delete the one
+         # remaining line replaces the old lines touched
+         linesAdded = e.GetLinesAdded()
+         stLine = self.LineFromPosition(e.GetPosition())
 
-      # match comments or skip code
-      # *** must be last to catch any keywords or numbers in commnets
-      for regex in self.reComments:
-         mArray = regex.finditer(stData)
+         if modType & stc.STC_MOD_INSERTTEXT:
+            oldCount = 1
+            enLine = stLine + linesAdded
+         else:
+            oldCount = 1 - linesAdded
+            enLine = stLine
 
-         for m in mArray:
-            self.StartStyling(stStart+m.start(0), 31)   # in this example, only style the text style bits
-            self.SetStyling(m.end(0)-m.start(0), stc.STC_P_COMMENTLINE)
+         stData = self.GetTextRange(self.PositionFromLine(stLine), self.GetLineEndPosition(enLine))
+         self.stateData.gcodeProgram.Splice(stLine, oldCount, prog.SplitLines(stData))
 
+      e.Skip()
 
    def UpdateUI(self, stateData):
       self.stateData = stateData
@@ -622,3 +927,221 @@ class gsatGcodeStcStyledTextCtrl(gsatStcStyledTextCtrl):
             self.MarkerDelete(pc, self.markerBreakpoint)
          else:
             self.MarkerAdd(pc, self.markerBreakpoint)
+
+"""----------------------------------------------------------------------------
+   gsatGcodeListCtrl:
+   Read only virtual list to display large GCODE files, only the visible
+   lines are read from the program (memory mapped file and line index).
+   Same interface as gsatGcodeStcStyledTextCtrl as used by main window,
+   PC and breakpoints are row colors.
+----------------------------------------------------------------------------"""
+class gsatGcodeListCtrl(wx.ListCtrl):
+   def __init__(self, parent, config_data, state_data, id=wx.ID_ANY, pos=wx.DefaultPosition,
+      size=wx.DefaultSize, style=0):
+
+      wx.ListCtrl.__init__(self, parent, id, pos, size,
+         style|wx.LC_REPORT|wx.LC_VIRTUAL|wx.LC_SINGLE_SEL)
+
+      self.configData = config_data
+      self.stateData = state_data
+      self.autoScroll = False
+
+      self.program = None
+      self.pcLine = -1
+      self.breakPoints = set()
+
+      self.InsertColumn(0, "Line", wx.LIST_FORMAT_RIGHT, 80)
+      self.InsertColumn(1, "G-Code", wx.LIST_FORMAT_LEFT, 800)
+
+      self.InitConfig()
+      self.InitUI()
+
+      # bind events
+      self.Bind(wx.EVT_LEFT_DOWN, self.OnCaretChange)
+      self.Bind(wx.EVT_KEY_DOWN, self.OnCaretChange)
+      self.Bind(wx.EVT_MOUSEWHEEL, self.OnCaretChange)
+      self.Bind(wx.EVT_KILL_FOCUS, self.OnKillFocus)
+
+   def InitConfig(self):
+      self.configAutoScroll               = self.configData.Get('/code/AutoScroll')
+      self.configWindowForeground         = self.configData.Get('/code/WindowForeground')
+      self.configWindowBackground         = self.configData.Get('/code/WindowBackground')
+      self.configLineNumber               = self.configData.Get('/code/LineNumber')
+
+      if (self.configAutoScroll == 1) or (self.configAutoScroll == 2) or (self.configAutoScroll == 3):
+         self.autoScroll = True
+
+   def InitUI(self):
+      defsize = wx.SystemSettings.GetFont(wx.SYS_ANSI_FIXED_FONT).GetPointSize()
+      self.SetFont(wx.Font(defsize, wx.FONTFAMILY_TELETYPE, wx.NORMAL, wx.BOLD))
+      self.SetForegroundColour(self.configWindowForeground)
+      self.SetBackgroundColour(self.configWindowBackground)
+
+      self.SetColumnWidth(0, 80 if self.configLineNumber else 0)
+
+      # same colors as the editor markers
+      self.attrPC = wx.ListItemAttr()
+      self.attrPC.SetBackgroundColour("GREEN")
+
+      self.attrBreakpoint = wx.ListItemAttr()
+      self.attrBreakpoint.SetBackgroundColour("RED")
+
+      self.attrPCBreakpoint = wx.ListItemAttr()
+      self.attrPCBreakpoint.SetBackgroundColour("GREEN")
+      self.attrPCBreakpoint.SetTextColour("RED")
+
+   def UpdateSettings(self, config_data):
+      self.configData = config_data
+      self.InitConfig()
+      self.InitUI()
+      self.Refresh()
+
+   def UpdateUI(self, stateData):
+      self.stateData = stateData
+
+   def OnGetItemText(self, item, column):
+      if column == 0:
+         return str(item + 1)
+
+      # mapping of a truncated file can't be read (SIGBUS)
+      if self.program.IsFileChanged():
+         return ""
+
+      return self.program.GetLine(item).rstrip('\r\n').decode('latin-1')
+
+   def OnGetItemAttr(self, item):
+      if item == self.pcLine:
+         if item in self.breakPoints:
+            return self.attrPCBreakpoint
+         return self.attrPC
+
+      if item in self.breakPoints:
+         return self.attrBreakpoint
+
+      return None
+
+   def OnCaretChange(self, e):
+      if self.configAutoScroll >= 2:
+         self.autoScroll = False
+      e.Skip()
+
+   def OnKillFocus(self, e):
+      if self.configAutoScroll == 2:
+         self.autoScroll = True
+      e.Skip()
+
+   def LoadFile(self, fileName):
+      try:
+         program = prog.LoadProgram(fileName)
+      except EnvironmentError:
+         return False
+
+      self.program = program
+      self.stateData.gcodeProgram = program
+      self.pcLine = -1
+      self.breakPoints = set()
+
+      self.SetItemCount(len(program))
+      self.Refresh()
+      return True
+
+   def CloseFile(self):
+      self.program = None
+      self.pcLine = -1
+      self.breakPoints = set()
+      self.SetItemCount(0)
+
+   def SaveFile(self, fileName):
+      # nothing to save but Save As, write a copy of the file
+      if self.program is None:
+         return False
+
+      try:
+         if os.path.abspath(fileName) != os.path.abspath(self.program.fileName):
+            shutil.copyfile(self.program.fileName, fileName)
+      except EnvironmentError:
+         return False
+
+      return True
+
+   def GetReadOnly(self):
+      return True
+
+   def SetReadOnly(self, readOnly):
+      pass
+
+   def GetModify(self):
+      return False
+
+   def GetCurrentLine(self):
+      return max(0, self.GetFocusedItem())
+
+   def GetLineCount(self):
+      return self.GetItemCount()
+
+   def GotoLine(self, line):
+      lines = self.GetItemCount()
+
+      if lines == 0:
+         return
+
+      if line >= lines:
+         line = lines - 1
+
+      if line < 0:
+         line = 0
+
+      self.Select(line)
+      self.Focus(line)
+      self.EnsureVisible(line)
+
+   def FindNextText(self, text):
+      """ Searches the file from the line after the current one, as typed or
+          all upper or lower case (file is not case folded).
+      """
+      if self.program is None or len(text) == 0 or self.program.IsFileChanged():
+         return
+
+      begPos = int(self.program.lineIndex[min(self.GetCurrentLine() + 1, len(self.program))])
+      pos = -1
+
+      for pattern in set([str(text), str(text).upper(), str(text).lower()]):
+         found = self.program.data.find(pattern, begPos)
+         if found > -1 and (pos < 0 or found < pos):
+            pos = found
+
+      if pos > -1:
+         self.GotoLine(self.program.GetLineFromPosition(pos))
+
+   def UpdatePC(self, pc):
+      if pc > -1:
+         oldPC = self.pcLine
+         self.pcLine = pc
+
+         if -1 < oldPC < self.GetItemCount():
+            self.RefreshItem(oldPC)
+
+         if pc < self.GetItemCount():
+            self.RefreshItem(pc)
+
+         if self.autoScroll:
+            self.GotoLine(pc)
+
+   def GoToPC(self):
+      if self.configAutoScroll == 3:
+         self.autoScroll = True
+
+      self.GotoLine(self.pcLine)
+
+   def UpdateBreakPoint(self, pc, enable):
+      if pc == -1 and enable == False:
+         self.breakPoints = set()
+         self.Refresh()
+      else:
+         if pc in self.breakPoints:
+            self.breakPoints.discard(pc)
+         else:
+            self.breakPoints.add(pc)
+
+         if pc < self.GetItemCount():
+            self.RefreshItem(pc)
@@ -0,0 +1,285 @@
+"""----------------------------------------------------------------------------
+   gcode.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import re
+import array
+
+try:
+   import numpy
+except ImportError:
+   numpy = None
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# comments example "( comment string )" or "; comment string"
+gReGcodeComment = re.compile(r'\([^)]*\)|;.*')
+
+# word, letter and number example "X-1.5", "G01", "F 100"
+gReGcodeWord = re.compile(r'([A-Za-z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+# axis letters tracked by the parser
+gGCODE_AXES = "XYZ"
+
+# modal groups, values are the G code numbers
+gGCODE_MOTION_NONE   = -1    # G80, canned cycle cancel
+gGCODE_MOTION_RAPID  = 0     # G0
+gGCODE_MOTION_LINEAR = 1     # G1
+gGCODE_MOTION_CW     = 2     # G2
+gGCODE_MOTION_CCW    = 3     # G3
+gGCODE_MOTION_CODES  = [0, 1, 2, 3] + range(81, 90)
+gGCODE_PLANE_CODES   = [17, 18, 19]
+gGCODE_UNITS_INCH    = 20
+gGCODE_UNITS_MM      = 21
+gGCODE_DISTANCE_CODES = [90, 91]
+
+# non modal codes, axis words on these lines are not a motion (G53 moves
+# are, in machine coordinates)
+gGCODE_NON_MODAL_CODES = [4, 10, 28, 30, 92]
+
+gGCODE_MM_PER_INCH = 25.4
+
+"""----------------------------------------------------------------------------
+   Tokenize:
+   Returns list of (letter, value) words of a line, comments removed,
+   letter is upper case and value is the number string as written.
+----------------------------------------------------------------------------"""
+def Tokenize(line):
+   return [(letter.upper(), value) for letter, value in
+      gReGcodeWord.findall(gReGcodeComment.sub(" ", line))]
+
+"""----------------------------------------------------------------------------
+   ReplaceWords:
+   Returns line with words outside comments replaced by replace(letter,
+   value), when replace returns None the word is kept as is.
+----------------------------------------------------------------------------"""
+def ReplaceWords(line, replace):
+   def ReplaceWord(m):
+      word = replace(m.group(1).upper(), m.group(2))
+      if word is None:
+         return m.group(0)
+      return word
+
+   parts = []
+   position = 0
+
+   for m in gReGcodeComment.finditer(line):
+      parts.append(gReGcodeWord.sub(ReplaceWord, line[position:m.start()]))
+      parts.append(m.group(0))
+      position = m.end()
+
+   parts.append(gReGcodeWord.sub(ReplaceWord, line[position:]))
+   return "".join(parts)
+
+"""----------------------------------------------------------------------------
+   gsatGcodeState:
+   Modal state while going through a program; motion mode, plane, units,
+   distance mode, feed (mm/min) and position (mm).
+----------------------------------------------------------------------------"""
+class gsatGcodeState():
+   def __init__(self):
+      self.motion = gGCODE_MOTION_RAPID
+      self.plane = 17
+      self.units = gGCODE_UNITS_MM
+      self.distance = 90
+      self.feed = 0.0
+      self.position = [0.0, 0.0, 0.0]
+
+   def Copy(self):
+      state = gsatGcodeState()
+      state.motion = self.motion
+      state.plane = self.plane
+      state.units = self.units
+      state.distance = self.distance
+      state.feed = self.feed
+      state.position = list(self.position)
+      return state
+
+   def Update(self, words):
+      """ Applies a line of words (see Tokenize), returns True if the line
+          moves an axis.
+      """
+      nonModal = False
+
+      # G codes first, units and distance mode apply to the same line
+      for letter, value in words:
+         if letter == 'G':
+            code = float(value)
+
+            if code in gGCODE_MOTION_CODES:
+               self.motion = int(code)
+            elif code == 80:
+               self.motion = gGCODE_MOTION_NONE
+            elif code in gGCODE_PLANE_CODES:
+               self.plane = int(code)
+            elif code in [gGCODE_UNITS_INCH, gGCODE_UNITS_MM]:
+               self.units = int(code)
+            elif code in gGCODE_DISTANCE_CODES:
+               self.distance = int(code)
+            elif code in gGCODE_NON_MODAL_CODES:
+               nonModal = True
+
+      scale = 1.0
+      if self.units == gGCODE_UNITS_INCH:
+         scale = gGCODE_MM_PER_INCH
+
+      moved = False
+
+      for letter, value in words:
+         if letter == 'F':
+            self.feed = float(value) * scale
+
+         elif letter in gGCODE_AXES and not nonModal:
+            axis = gGCODE_AXES.index(letter)
+
+            if self.distance == 91:
+               self.position[axis] = self.position[axis] + float(value) * scale
+            else:
+               self.position[axis] = float(value) * scale
+
+            moved = True
+
+      return moved
+
+"""----------------------------------------------------------------------------
+   gsatGcodeTable:
+   Columnar program, one row per line that moves an axis; x, y, z (mm),
+   f (mm/min), motion mode and program line index. Columns are numpy
+   arrays when numpy is available, otherwise arrays.
+----------------------------------------------------------------------------"""
+class gsatGcodeTable():
+   def __init__(self, x, y, z, f, motion, line):
+      self.x = x
+      self.y = y
+      self.z = z
+      self.f = f
+      self.motion = motion
+      self.line = line
+
+   def __len__(self):
+      return len(self.line)
+
+def ToColumn(column):
+   if numpy is None:
+      return column
+
+   return numpy.frombuffer(column.tostring(), numpy.dtype(column.typecode))
+
+"""----------------------------------------------------------------------------
+   ParseProgram:
+   Parses g-code lines (any iterable of strings) into a gsatGcodeTable,
+   state is the modal state to start from (default state if None).
+----------------------------------------------------------------------------"""
+def ParseProgram(lines, state=None):
+   if state is None:
+      state = gsatGcodeState()
+
+   x = array.array('d')
+   y = array.array('d')
+   z = array.array('d')
+   f = array.array('d')
+   motion = array.array('b')
+   lineIndex = array.array('i')
+
+   for index, line in enumerate(lines):
+      if state.Update(Tokenize(line)):
+         x.append(state.position[0])
+         y.append(state.position[1])
+         z.append(state.position[2])
+         f.append(state.feed)
+         motion.append(state.motion)
+         lineIndex.append(index)
+
+   return gsatGcodeTable(ToColumn(x), ToColumn(y), ToColumn(z), ToColumn(f), ToColumn(motion),
+      ToColumn(lineIndex))
+
+"""----------------------------------------------------------------------------
+   ConvertUnits:
+   Returns lines converted from inches to mm (or mm to inches), G20/G21
+   are swapped and X, Y, Z, R and F values scaled, rounded to round_to
+   decimals unless it is -1.
+----------------------------------------------------------------------------"""
+def ConvertUnits(lines, in_to_mm=True, round_to=-1):
+   if in_to_mm:
+      fromUnits, toUnits = gGCODE_UNITS_INCH, gGCODE_UNITS_MM
+   else:
+      fromUnits, toUnits = gGCODE_UNITS_MM, gGCODE_UNITS_INCH
+
+   def ConvertWord(letter, value):
+      if letter == 'G' and float(value) == fromUnits:
+         return "G%d" % toUnits
+
+      if letter in "XYZRF":
+         if in_to_mm:
+            convertValue = float(value) * gGCODE_MM_PER_INCH
+         else:
+            convertValue = float(value) / gGCODE_MM_PER_INCH
+
+         if round_to > -1:
+            convertValue = round(convertValue, round_to)
+
+         return letter + str(convertValue)
+
+      return None
+
+   return [ReplaceWords(line, ConvertWord) for line in lines]
+
+"""----------------------------------------------------------------------------
+   ConvertG81ToG01:
+   Returns lines with G81 drill cycles (R, Z and F on the G81 line) replaced
+   by rapid move, plunge and retract lines for each X Y position. G80, any
+   other motion mode or an empty line ends the cycle.
+----------------------------------------------------------------------------"""
+def ConvertG81ToG01(lines):
+   retLines = []
+   drilling = False
+   drillWords = dict()
+
+   for line in lines:
+      words = Tokenize(line)
+      wordValues = dict(words)
+      gCodes = [float(value) for letter, value in words if letter == 'G']
+
+      if len(line.strip()) == 0:
+         drilling = False
+
+      if 81 in gCodes:
+         drilling = all([letter in wordValues for letter in "RZF"])
+         drillWords = wordValues
+
+      elif len([code for code in gCodes if code == 80 or code in gGCODE_MOTION_CODES]) > 0:
+         drilling = False
+
+      if drilling and 'X' in wordValues and 'Y' in wordValues:
+         line = \
+            "G00 X%s Y%s ( rapid move to drill zone. )\n" \
+            "G01 Z%s F%s ( plunge. )\n" \
+            "G00 Z%s ( retract )\n" % (wordValues['X'], wordValues['Y'],
+               drillWords['Z'], drillWords['F'], drillWords['R'])
+
+      retLines.append(line)
+
+   return retLines
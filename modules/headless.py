@@ -0,0 +1,234 @@
+"""----------------------------------------------------------------------------
+   headless.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import sys
+import time
+import Queue
+import serial
+
+import modules.config as gc
+import modules.device as dev
+import modules.program as prog
+import modules.progexec as progexec
+import modules.procexec as procexec
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# exit status
+gEXIT_OK       = 0
+gEXIT_ERROR    = 1     # file, serial port or device error
+gEXIT_MSG      = 2     # program stopped at MSG line, needs operator
+gEXIT_STOPPED  = 130   # interrupted (Ctrl-C)
+
+# seconds between progress lines
+gPROGRESS_PERIOD = 1.0
+
+"""----------------------------------------------------------------------------
+   gsatHeadless:
+   Runs a g-code file with the program execute thread, no wx needed.
+   Progress goes to stdout, result is the exit status.
+----------------------------------------------------------------------------"""
+class gsatHeadless():
+   def __init__(self, cmd_line_options):
+      self.cmdLineOptions = cmd_line_options
+      self.serPort = None
+      self.progExecThread = None
+      self.mainWndOutQueue = Queue.Queue()
+      self.mainWndInQueue = Queue.Queue()
+
+      self.gcodeProgram = None
+      self.programCounter = 0
+      self.timingStats = None
+      self.progressTime = 0
+
+   def Log(self, message):
+      print "%s %s" % (time.strftime("%H:%M:%S"), message)
+      sys.stdout.flush()
+
+   def Run(self):
+      options = self.cmdLineOptions
+
+      try:
+         self.gcodeProgram = prog.LoadProgram(options.run)
+      except EnvironmentError, e:
+         self.Log("** Can't open g-code file: %s" % str(e))
+         return gEXIT_ERROR
+
+      self.Log("Loaded %s, %d lines" % (options.run, len(self.gcodeProgram)))
+
+      try:
+         self.OpenLink()
+      except (serial.SerialException, OSError, ValueError), e:
+         self.Log("** Can't open serial port: %s" % str(e))
+         self.Close()
+         return gEXIT_ERROR
+
+      try:
+         exitStatus = self.RunProgram()
+      except KeyboardInterrupt:
+         self.Log("Interrupted, stopping...")
+         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_STOP, None))
+         exitStatus = gEXIT_STOPPED
+
+      self.Close()
+      return exitStatus
+
+   def OpenLink(self):
+      options = self.cmdLineOptions
+      deviceID = dev.GetDeviceID(options.device)
+
+      if options.processExec:
+         # worker process owns the port
+         self.progExecThread = procexec.gsatProgramExecuteProcess(None, options.port,
+            int(options.baud), self.mainWndOutQueue, self.mainWndInQueue, options, deviceID,
+            0, options.streaming, options.rxBufferSize, options.queueThreshold,
+            options.traceFile)
+      else:
+         self.serPort = serial.Serial(options.port, int(options.baud), timeout=1)
+
+         self.progExecThread = progexec.gsatProgramExecuteThread(None, self.serPort,
+            self.mainWndOutQueue, self.mainWndInQueue, options, deviceID, 0,
+            options.streaming, options.rxBufferSize, options.queueThreshold, options.traceFile)
+
+   def RunProgram(self):
+      options = self.cmdLineOptions
+
+      # wait for device
+      self.Log("Connected to %s, waiting for %s..." % (options.port, options.device))
+      endTime = time.time() + options.timeout
+      deviceReady = False
+
+      while not deviceReady and time.time() < endTime:
+         te = self.GetEvent()
+
+         if te is None:
+            continue
+
+         if te.event_id == gc.gEV_ABORT:
+            self.Log("** %s" % str(te.data).strip())
+            return gEXIT_ERROR
+
+         if te.event_id in [gc.gEV_DEVICE_DETECTED, gc.gEV_DATA_STATUS]:
+            deviceReady = True
+
+      if not deviceReady:
+         self.Log("** No response from %s in %d seconds" % (options.device, options.timeout))
+         return gEXIT_ERROR
+
+      # run program
+      self.Log("Running %s, streaming %s" % (options.run,
+         gc.gOnString if options.streaming else gc.gOffString))
+      runStartTime = time.time()
+      self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_RUN, [self.gcodeProgram, 0, set()]))
+
+      while True:
+         te = self.GetEvent()
+
+         if te is None:
+            continue
+
+         if te.event_id == gc.gEV_ABORT:
+            self.Log("** %s" % str(te.data).strip())
+            return gEXIT_ERROR
+
+         elif te.event_id == gc.gEV_PC_UPDATE:
+            self.programCounter = te.data
+            self.LogProgress()
+
+         elif te.event_id == gc.gEV_DATA_TIMING:
+            self.timingStats = te.data
+
+         elif te.event_id == gc.gEV_DATA_ERROR:
+            pc, message = te.data
+            if pc is not None:
+               self.Log("** Device %s at line %d" % (message, pc + 1))
+
+         elif te.event_id == gc.gEV_HIT_BRK_PT:
+            # no breakpoints are set, execute thread stops when the program
+            # file changed on disk
+            self.Log("** G-code file changed on disk, stopped at line %d" % (self.programCounter + 1))
+            return gEXIT_ERROR
+
+         elif te.event_id == gc.gEV_HIT_MSG:
+            self.Log("** MSG: %s" % te.data.strip())
+            self.Log("Stopped at line %d, program needs operator" % (self.programCounter + 1))
+            return gEXIT_MSG
+
+         elif te.event_id == gc.gEV_RUN_END:
+            runTime = time.time() - runStartTime
+            self.programCounter = len(self.gcodeProgram)
+            self.progressTime = 0
+            self.LogProgress()
+
+            hours, reminder = divmod(int(runTime), 3600)
+            minutes, seconds = divmod(reminder, 60)
+            self.Log("Done, run time %02d:%02d:%02d" % (hours, minutes, seconds))
+            return gEXIT_OK
+
+   def GetEvent(self):
+      # short timeout, Ctrl-C is not delivered while blocked on a queue
+      try:
+         te = self.mainWndInQueue.get(timeout=0.2)
+      except Queue.Empty:
+         return None
+
+      if self.cmdLineOptions.verbose:
+         if te.event_id == gc.gEV_DATA_OUT:
+            self.Log("> %s" % te.data.strip())
+         elif te.event_id == gc.gEV_DATA_IN:
+            self.Log("%s" % te.data.strip())
+
+      return te
+
+   def LogProgress(self):
+      now = time.time()
+
+      if (now - self.progressTime) < gPROGRESS_PERIOD:
+         return
+
+      self.progressTime = now
+
+      programLen = max(1, len(self.gcodeProgram))
+      progress = "[%6.2f%%] line %d/%d" % (
+         float(self.programCounter) / programLen * 100, self.programCounter, programLen)
+
+      if self.timingStats is not None:
+         progress = "%s, %.1f lines/s, ack p50/p95/p99 %.1f/%.1f/%.1f ms" % (progress,
+            self.timingStats['lps'], self.timingStats['p50'] * 1000.0,
+            self.timingStats['p95'] * 1000.0, self.timingStats['p99'] * 1000.0)
+
+      self.Log(progress)
+
+   def Close(self):
+      if self.progExecThread is not None:
+         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
+         self.progExecThread.join(5)
+         self.progExecThread = None
+
+      if self.serPort is not None:
+         self.serPort.close()
+         self.serPort = None
@@ -30,6 +30,7 @@ from wx.lib import scrolledpanel as scrolled
 from wx.lib.agw import floatspin as fs
 
 import modules.config as gc
+import modules.device as dev
 
 
 """----------------------------------------------------------------------------
@@ -301,6 +302,8 @@ class gsatJoggingPanel(wx.ScrolledWindow):
       self.cliCommand = ""
       self.cliIndex = 0
 
+      self.controlsEnabled = None
+
       self.InitConfig()
       self.InitUI()
       width,height = self.GetSizeTuple()
@@ -428,54 +431,29 @@ class gsatJoggingPanel(wx.ScrolledWindow):
       self.SetSizer(vPanelBoxSizer)
       self.Layout()
 
-   def UpdateUI(self, stateData, statusData=None):
+   def UpdateUI(self, stateData, statusData=None, statusRecord=None):
       self.stateData = stateData
 
-      if statusData is not None and self.configAutoMPOS:
-         if self.stateData.deviceID == gc.gDEV_TINYG or \
-            self.stateData.deviceID == gc.gDEV_TINYG2:
-            # newer version (g2core) moved to TinyG style, checking 
-            # style first
-               
-            x = statusData.get('posx')
-            if x is not None:
-               self.jX.SetValue(x)
-
-            y = statusData.get('posy')
-            if y is not None:
-               self.jY.SetValue(y)
-
-            z = statusData.get('posz')
-            if z is not None:
-               self.jZ.SetValue(z)
-
-            if self.stateData.deviceID == gc.gDEV_TINYG2:
-               x = statusData.get('mpox')
-               if x is not None:
-                  self.jX.SetValue(x)
-
-               y = statusData.get('mpoy')
-               if y is not None:
-                  self.jY.SetValue(y)
-
-               z = statusData.get('mpoz')
-               if z is not None:
-                  self.jZ.SetValue(z)
-         else:
-            x = statusData.get('wposx')
-            if x is not None:
-               self.jX.SetValue(x)
-
-            y = statusData.get('wposy')
-            if y is not None:
-               self.jY.SetValue(y)
-
-            z = statusData.get('wposz')
-            if z is not None:
-               self.jZ.SetValue(z)
-
-
-      if stateData.serialPortIsOpen and not stateData.swState == gc.gSTATE_RUN:
+      if statusRecord is not None and self.configAutoMPOS:
+         x, y, z = statusRecord.GetDroPosition()
+
+         if x is not None:
+            self.UpdateValue(self.jX, gc.gNumberFormatString % x)
+
+         if y is not None:
+            self.UpdateValue(self.jY, gc.gNumberFormatString % y)
+
+         if z is not None:
+            self.UpdateValue(self.jZ, gc.gNumberFormatString % z)
+
+      # only touch controls when enable state changes, saves repaints
+      controlsEnabled = stateData.serialPortIsOpen and not stateData.swState == gc.gSTATE_RUN
+      if controlsEnabled == self.controlsEnabled:
+         return
+
+      self.controlsEnabled = controlsEnabled
+
+      if controlsEnabled:
          self.resetToZeroButton.Enable()
          self.resetToJogButton.Enable()
          self.gotoToZeroButton.Enable()
@@ -514,6 +492,11 @@ class gsatJoggingPanel(wx.ScrolledWindow):
          self.custom4Button.Disable()
          self.cliComboBox.Disable()
 
+   def UpdateValue(self, widget, value):
+      # only touch widgets whose value changed, saves repaints
+      if widget.GetValue() != value:
+         widget.SetValue(value)
+
 
    def CreateJoggingControls(self):
       # Add Buttons -----------------------------------------------------------
@@ -858,38 +841,25 @@ class gsatJoggingPanel(wx.ScrolledWindow):
       # axis         
 
    def OnResetToZero(self, e):
-      if self.stateData.deviceID == gc.gDEV_TINYG or self.stateData.deviceID == gc.gDEV_TINYG2:
-         self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
-            gc.gTINYG_CMD_ALL_RESET_TO_VAL, gc.gTINYG_CMD_RESET_TO_VAL)
-
-         if self.configReqUpdateOnJogSetOp:
-            self.mainWindow.SerialWriteWaitForAck(gc.gTINYG_CMD_GET_STATUS)
-      else:
-         self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
-            gc.gGRBL_CMD_ALL_RESET_TO_VAL, gc.gGRBL_CMD_RESET_TO_VAL)
+      device = dev.GetDeviceClass(self.stateData.deviceID)
+      self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
+         device.allResetToValCmd, device.resetToValCmd)
 
-         if self.configReqUpdateOnJogSetOp:
-            self.mainWindow.SerialWriteWaitForAck(gc.gGRBL_CMD_GET_STATUS)
+      if self.configReqUpdateOnJogSetOp:
+         self.mainWindow.GetMachineStatus()
 
    def OnGoToZero(self, e):
       self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
          gc.gDEVICE_CMD_ALL_GO_TO_POS, gc.gDEVICE_CMD_GO_TO_POS)
 
    def OnResetToJogVal(self, e):
-      if self.stateData.deviceID == gc.gDEV_TINYG or self.stateData.deviceID == gc.gDEV_TINYG2:
-         self.OnJogCmd(
-            self.jX.GetValue(), self.jY.GetValue(), self.jZ.GetValue(),
-            gc.gTINYG_CMD_ALL_RESET_TO_VAL, gc.gTINYG_CMD_RESET_TO_VAL)
-
-         if self.configReqUpdateOnJogSetOp:
-            self.mainWindow.SerialWriteWaitForAck(gc.gTINYG_CMD_GET_STATUS)
-      else:
-         self.OnJogCmd(
-            self.jX.GetValue(), self.jY.GetValue(), self.jZ.GetValue(),
-            gc.gGRBL_CMD_ALL_RESET_TO_VAL, gc.gGRBL_CMD_RESET_TO_VAL)
+      device = dev.GetDeviceClass(self.stateData.deviceID)
+      self.OnJogCmd(
+         self.jX.GetValue(), self.jY.GetValue(), self.jZ.GetValue(),
+         device.allResetToValCmd, device.resetToValCmd)
 
-         if self.configReqUpdateOnJogSetOp:
-            self.mainWindow.SerialWriteWaitForAck(gc.gGRBL_CMD_GET_STATUS)
+      if self.configReqUpdateOnJogSetOp:
+         self.mainWindow.GetMachineStatus()
 
    def OnGoToJogVal(self, e):
       self.OnJogCmd(
@@ -897,12 +867,9 @@ class gsatJoggingPanel(wx.ScrolledWindow):
          gc.gDEVICE_CMD_ALL_GO_TO_POS, gc.gDEVICE_CMD_GO_TO_POS)
 
    def OnGoHome(self, e):
-      if self.stateData.deviceID == gc.gDEV_TINYG or self.stateData.deviceID == gc.gDEV_TINYG2:
-         self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
-            gc.gTINYG_CMD_ALL_GO_HOME, gc.gTINYG_CMD_GO_HOME)
-      else:
-         self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
-            gc.gGRBL_CMD_ALL_GO_HOME, gc.gGRBL_CMD_GO_HOME)
+      device = dev.GetDeviceClass(self.stateData.deviceID)
+      self.OnJogCmd(gc.gZeroString, gc.gZeroString, gc.gZeroString,
+         device.allGoHomeCmd, device.goHomeCmd)
 
    def OnPushStack(self, e):
       xVal = self.jX.GetValue()
@@ -32,24 +32,6 @@ from wx.lib.agw import floatspin as fs
 import modules.config as gc
 
 
-"""----------------------------------------------------------------------------
-   GetDeviceID:
-   translate string to ID.
-----------------------------------------------------------------------------"""
-def GetDeviceID(deviceStr):
-      deviceID = gc.gDEV_NONE
-
-      if "Grbl" in deviceStr:
-         deviceID = gc.gDEV_GRBL
-
-      if "TinyG" in deviceStr:
-         deviceID = gc.gDEV_TINYG
-
-      if "TinyG2" in deviceStr:
-         deviceID = gc.gDEV_TINYG2
-
-      return deviceID
-
 """----------------------------------------------------------------------------
    gsatMachineSettingsPanel:
    Machine settings.
@@ -117,20 +99,13 @@ class gsatMachineSettingsPanel(scrolled.ScrolledPanel):
       # ------------------------------------------------------------------------
       # GRBL related helper/utility
 
-      # Add auto status check box
-      self.cbAutoStatus = wx.CheckBox(self, wx.ID_ANY, "Auto Status Request")
-      self.cbAutoStatus.SetValue(self.configData.Get('/machine/AutoStatus'))
-      self.cbAutoStatus.SetToolTip(
-         wx.ToolTip("Send \"STATUS\" request with every command sent (experimental)"))
-
-      vBoxSizerRoot.Add(self.cbAutoStatus, 0, flag=wx.TOP|wx.LEFT|wx.EXPAND, border=20)
-
       # Add auto refresh check box
       hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
       self.cbAutoRefresh = wx.CheckBox(self, wx.ID_ANY, "Auto Refresh Period")
       self.cbAutoRefresh.SetValue(self.configData.Get('/machine/AutoRefresh'))
       self.cbAutoRefresh.SetToolTip(
-         wx.ToolTip("Send \"STATUS\" request on a time base (experimental)"))
+         wx.ToolTip("Grbl only, the serial link sends a real-time \"STATUS\" request (?) "\
+            "every period, skipped while the previous report has not arrived"))
       hBoxSizer.Add(self.cbAutoRefresh, flag=wx.ALIGN_CENTER_VERTICAL)
 
       # Add spin ctrl
@@ -144,6 +119,24 @@ class gsatMachineSettingsPanel(scrolled.ScrolledPanel):
 
       vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT|wx.EXPAND, border=20)
 
+      # Add status rate spin ctrl
+      hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+      st = wx.StaticText(self, wx.ID_ANY, "Status Update Rate")
+      st.SetToolTip(
+         wx.ToolTip("Status panels are updated at most this many times per second, "\
+            "only the newest values are shown (0 updates on every status)"))
+      hBoxSizer.Add(st, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      self.scStatusRate = wx.SpinCtrl(self, wx.ID_ANY, "")
+      self.scStatusRate.SetRange(0,1000)
+      self.scStatusRate.SetValue(self.configData.Get('/machine/StatusRate'))
+      hBoxSizer.Add(self.scStatusRate, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=10)
+
+      st = wx.StaticText(self, wx.ID_ANY, "(Hz)")
+      hBoxSizer.Add(st, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT|wx.EXPAND, border=20)
+
       # Add Grbl DRO hack check box
       hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
       self.cbGrblDroHack = wx.CheckBox(self, wx.ID_ANY, "Enable Grbl DRO hack")
@@ -152,7 +145,86 @@ class gsatMachineSettingsPanel(scrolled.ScrolledPanel):
          wx.ToolTip("If Device is Grbl, it uses output GCODE to update DRO status"))
       hBoxSizer.Add(self.cbGrblDroHack, flag=wx.ALIGN_CENTER_VERTICAL)
 
-      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT|wx.BOTTOM, border=20)
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT, border=20)
+
+      # Add streaming check box
+      hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+      self.cbStreaming = wx.CheckBox(self, wx.ID_ANY, "Streaming, RX buffer size")
+      self.cbStreaming.SetValue(self.configData.Get('/machine/Streaming'))
+      self.cbStreaming.SetToolTip(
+         wx.ToolTip("Send lines as long as they fit in the device RX buffer instead of "\
+            "waiting for each acknowledge (character counting, Grbl; queue reports, TinyG)"))
+      hBoxSizer.Add(self.cbStreaming, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      # Add spin ctrl
+      self.scRxBufferSize = wx.SpinCtrl(self, wx.ID_ANY, "")
+      self.scRxBufferSize.SetRange(1,1000000)
+      self.scRxBufferSize.SetValue(self.configData.Get('/machine/RxBufferSize'))
+      hBoxSizer.Add(self.scRxBufferSize, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=10)
+
+      st = wx.StaticText(self, wx.ID_ANY, "(bytes)")
+      hBoxSizer.Add(st, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT, border=20)
+
+      # Add queue threshold spin ctrl
+      hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+      st = wx.StaticText(self, wx.ID_ANY, "Streaming, planner free slots threshold")
+      st.SetToolTip(
+         wx.ToolTip("TinyG/TinyG2 only, lines are sent while queue reports show "\
+            "more free planner slots than this value"))
+      hBoxSizer.Add(st, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      self.scQueueThreshold = wx.SpinCtrl(self, wx.ID_ANY, "")
+      self.scQueueThreshold.SetRange(0,1000)
+      self.scQueueThreshold.SetValue(self.configData.Get('/machine/QueueThreshold'))
+      hBoxSizer.Add(self.scQueueThreshold, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=10)
+
+      st = wx.StaticText(self, wx.ID_ANY, "(slots)")
+      hBoxSizer.Add(st, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=5)
+
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT, border=20)
+
+      # Add timing trace file
+      hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+      st = wx.StaticText(self, wx.ID_ANY, "Timing trace file")
+      st.SetToolTip(
+         wx.ToolTip("Binary per line timing trace (queued, written, first response, "\
+            "acknowledge), summary with \"python -m modules.timing FILE\" (empty disables)"))
+      hBoxSizer.Add(st, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      self.tcTraceFile = wx.TextCtrl(self, wx.ID_ANY, "")
+      self.tcTraceFile.SetValue(self.configData.Get('/machine/TraceFile'))
+      hBoxSizer.Add(self.tcTraceFile, 1, flag=wx.LEFT|wx.ALIGN_CENTER_VERTICAL, border=10)
+
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT|wx.RIGHT|wx.EXPAND, border=20)
+
+      # Add process exec check box
+      hBoxSizer = wx.BoxSizer(wx.HORIZONTAL)
+      self.cbProcessExec = wx.CheckBox(self, wx.ID_ANY, "Run serial link in worker process")
+      self.cbProcessExec.SetValue(self.configData.Get('/machine/ProcessExec'))
+      self.cbProcessExec.SetToolTip(
+         wx.ToolTip("Each machine link (program execute and serial RX threads) runs in its "\
+            "own process, so UI load doesn't delay device acknowledges (takes effect on "\
+            "next link open)"))
+      hBoxSizer.Add(self.cbProcessExec, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      vBoxSizerRoot.Add(hBoxSizer, 0, flag=wx.TOP|wx.LEFT, border=20)
+
+      # Add additional machines
+      vBoxSizer = wx.BoxSizer(wx.VERTICAL)
+      st = wx.StaticText(self, wx.ID_ANY, "Additional machines")
+      vBoxSizer.Add(st, 0, flag=wx.ALIGN_CENTER_VERTICAL)
+
+      self.tcMachines = wx.TextCtrl(self, wx.ID_ANY, "", style=wx.TE_MULTILINE)
+      self.tcMachines.SetValue(self.configData.Get('/machine/Machines'))
+      self.tcMachines.SetToolTip(
+         wx.ToolTip("One machine per line \"name, port, baud, device\", for example "\
+            "\"Laser, /dev/ttyACM0, 115200, Grbl\". Select the machine from the status "\
+            "tool bar, other settings are shared"))
+      vBoxSizer.Add(self.tcMachines, 1, flag=wx.ALL|wx.ALIGN_CENTER_VERTICAL|wx.EXPAND)
+
+      vBoxSizerRoot.Add(vBoxSizer, 1, flag=wx.EXPAND|wx.TOP|wx.LEFT|wx.RIGHT|wx.BOTTOM, border=20)
 
    def UpdatConfigData(self):
       self.configData.Set('/machine/Device', self.deviceComboBox.GetValue())
@@ -160,9 +232,15 @@ class gsatMachineSettingsPanel(scrolled.ScrolledPanel):
       self.configData.Set('/machine/Baud', self.sbrComboBox.GetValue())
       self.configData.Set('/machine/InitScript', self.tcInitScript.GetValue())
       self.configData.Set('/machine/GrblDroHack', self.cbGrblDroHack.GetValue())
-      self.configData.Set('/machine/AutoStatus', self.cbAutoStatus.GetValue())
       self.configData.Set('/machine/AutoRefresh', self.cbAutoRefresh.GetValue())
       self.configData.Set('/machine/AutoRefreshPeriod', self.sc.GetValue())
+      self.configData.Set('/machine/StatusRate', self.scStatusRate.GetValue())
+      self.configData.Set('/machine/Streaming', self.cbStreaming.GetValue())
+      self.configData.Set('/machine/RxBufferSize', self.scRxBufferSize.GetValue())
+      self.configData.Set('/machine/QueueThreshold', self.scQueueThreshold.GetValue())
+      self.configData.Set('/machine/TraceFile', self.tcTraceFile.GetValue())
+      self.configData.Set('/machine/Machines', self.tcMachines.GetValue())
+      self.configData.Set('/machine/ProcessExec', self.cbProcessExec.GetValue())
 
 
 
@@ -210,80 +288,62 @@ class gsatMachineStatusPanel(wx.ScrolledWindow):
       self.SetSizer(vBoxSizer)
       self.Layout()
 
-   def UpdateUI(self, stateData, statusData=None):
+   def UpdateUI(self, stateData, statusData=None, statusRecord=None):
       self.stateData = stateData
       if statusData is not None:
 
-         stat = statusData.get('stat')
-         if stat is not None:
-            self.runStatus.SetLabel(stat)
-
          prcnt = statusData.get('prcnt')
          if prcnt is not None:
-            self.prcntStatus.SetLabel(prcnt)
+            self.UpdateLabel(self.prcntStatus, prcnt)
 
          rtime = statusData.get('rtime')
          if rtime is not None:
-            self.runTimeStatus.SetLabel(rtime)
-
-
-         if self.stateData.deviceID == gc.gDEV_TINYG or \
-            self.stateData.deviceID == gc.gDEV_TINYG2:
-            # newer version (g2core) moved to TinyG style, checking 
-            # style first
-            
-            x = statusData.get('posx')
-            if x is not None:
-               self.xPos.SetValue(x)
-
-            y = statusData.get('posy')
-            if y is not None:
-               self.yPos.SetValue(y)
-
-            z = statusData.get('posz')
-            if z is not None:
-               self.zPos.SetValue(z)
-
-            if self.stateData.deviceID == gc.gDEV_TINYG2:
-               x = statusData.get('mpox')
-               if x is not None:
-                  self.xPos.SetValue(x)
-
-               y = statusData.get('mpoy')
-               if y is not None:
-                  self.yPos.SetValue(y)
-
-               z = statusData.get('mpoz')
-               if z is not None:
-                  self.zPos.SetValue(z)
-               
-         else:
-            x = statusData.get('wposx')
-            if x is not None:
-               self.xPos.SetValue(x)
-
-            y = statusData.get('wposy')
-            if y is not None:
-               self.yPos.SetValue(y)
-
-            z = statusData.get('wposz')
-            if z is not None:
-               self.zPos.SetValue(z)
+            self.UpdateLabel(self.runTimeStatus, rtime)
+
+         acklat = statusData.get('acklat')
+         if acklat is not None:
+            self.UpdateLabel(self.ackLatencyStatus, acklat)
+
+         lps = statusData.get('lps')
+         if lps is not None:
+            self.UpdateLabel(self.linesPerSecStatus, lps)
+
+      if statusRecord is not None:
+         if statusRecord.state is not None:
+            self.UpdateLabel(self.runStatus, statusRecord.state)
+
+         x, y, z = statusRecord.GetDroPosition()
+
+         if x is not None:
+            self.UpdateValue(self.xPos, gc.gNumberFormatString % x)
+
+         if y is not None:
+            self.UpdateValue(self.yPos, gc.gNumberFormatString % y)
+
+         if z is not None:
+            self.UpdateValue(self.zPos, gc.gNumberFormatString % z)
 
          #self.sSpindle.SetLabel("?")
 
       if stateData.serialPortIsOpen:
          self.refreshButton.Enable()
-         self.machinePort.SetLabel(stateData.serialPort)
-         self.machineBaud.SetLabel(stateData.serialPortBaud)
+         self.UpdateLabel(self.machinePort, stateData.serialPort)
+         self.UpdateLabel(self.machineBaud, stateData.serialPortBaud)
       else:
          self.refreshButton.Disable()
-         self.machinePort.SetLabel("None")
-         self.machineBaud.SetLabel("None")
+         self.UpdateLabel(self.machinePort, "None")
+         self.UpdateLabel(self.machineBaud, "None")
+
+      self.UpdateLabel(self.devStatus, self.configData.Get('/machine/Device'))
 
-      self.devStatus.SetLabel(self.configData.Get('/machine/Device'))
+   def UpdateLabel(self, widget, label):
+      # only touch widgets whose value changed, saves repaints
+      if widget.GetLabel() != label:
+         widget.SetLabel(label)
 
-      self.Update()
+   def UpdateValue(self, widget, value):
+      if widget.GetValue() != value:
+         widget.SetValue(value)
 
    def CreateStaticBox(self, label):
       staticBox = wx.StaticBox(self, -1, label)
@@ -333,7 +393,7 @@ class gsatMachineStatusPanel(wx.ScrolledWindow):
 
    def CreateStatusStaticBox(self):
       positionBoxSizer = self.CreateStaticBox("Status")
-      flexGridSizer = wx.FlexGridSizer(6,2,1,5)
+      flexGridSizer = wx.FlexGridSizer(8,2,1,5)
       positionBoxSizer.Add(flexGridSizer, 1, flag=wx.EXPAND)
 
       # set font properties
@@ -392,6 +452,25 @@ class gsatMachineStatusPanel(wx.ScrolledWindow):
       flexGridSizer.Add(st, 0, flag=wx.ALIGN_LEFT)
       flexGridSizer.Add(self.runTimeStatus, 0, flag=wx.ALIGN_LEFT)
 
+      # Add acknowledge latency
+      st = wx.StaticText(self, label="Ack p50/p95/p99")
+      st.SetFont(font)
+      st.SetToolTip(wx.ToolTip("Time from line sent to device acknowledge, current run"))
+      self.ackLatencyStatus = wx.StaticText(self, label="0.0 / 0.0 / 0.0 ms")
+      self.ackLatencyStatus.SetForegroundColour(self.machineDataColor)
+      self.ackLatencyStatus.SetFont(font)
+      flexGridSizer.Add(st, 0, flag=wx.ALIGN_LEFT)
+      flexGridSizer.Add(self.ackLatencyStatus, 0, flag=wx.ALIGN_LEFT)
+
+      # Add lines per second
+      st = wx.StaticText(self, label="Lines/sec")
+      st.SetFont(font)
+      self.linesPerSecStatus = wx.StaticText(self, label="0.0")
+      self.linesPerSecStatus.SetForegroundColour(self.machineDataColor)
+      self.linesPerSecStatus.SetFont(font)
+      flexGridSizer.Add(st, 0, flag=wx.ALIGN_LEFT)
+      flexGridSizer.Add(self.linesPerSecStatus, 0, flag=wx.ALIGN_LEFT)
+
       return positionBoxSizer
 
    def OnRefresh(self, e):
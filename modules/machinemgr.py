@@ -0,0 +1,244 @@
+"""----------------------------------------------------------------------------
+   machinemgr.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import os
+import Queue
+import serial
+import collections
+
+import modules.config as gc
+import modules.progexec as progexec
+import modules.procexec as procexec
+import modules.status as st
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# name of machine configured with /machine/Port, /machine/Baud, ...
+gMACHINE_DEFAULT_NAME = "Machine 1"
+
+# state data fields that belong to a machine link, UI keeps only the
+# active machine ones in its state data
+gMACHINE_STATE_KEYS = [
+   'swState', 'serialPortIsOpen', 'serialPort', 'serialPortBaud', 'deviceID',
+   'deviceDetected', 'machineStatusString', 'programCounter',
+]
+
+# status panel values of a machine with no status yet, so switching machines
+# doesn't leave readouts of the previous one (device status is in a
+# status record, see status.py)
+gMACHINE_STATUS_DEFAULTS = {
+   'prcnt':"0.00%", 'rtime':"00:00:00", 'acklat':"0.0 / 0.0 / 0.0 ms", 'lps':"0.0",
+}
+
+# console text kept for machines while not shown
+gCONSOLE_MAX_CHUNKS = 10000
+
+"""----------------------------------------------------------------------------
+   ParseMachineList:
+   Additional machines, one per line "name, port, baud, device", returns
+   list of (name, port, baud, device). Lines starting with # are ignored.
+----------------------------------------------------------------------------"""
+def ParseMachineList(text):
+   machineList = []
+
+   for line in str(text).splitlines():
+      line = line.strip()
+
+      if len(line) == 0 or line.startswith('#'):
+         continue
+
+      fields = [field.strip() for field in line.split(',')]
+
+      if len(fields) == 4 and len(fields[0]) > 0:
+         machineList.append(tuple(fields))
+
+   return machineList
+
+"""----------------------------------------------------------------------------
+   gsatMachine:
+   One serial link, with its own program execute (and serial RX) thread,
+   queues, program, status and console.
+----------------------------------------------------------------------------"""
+class gsatMachine():
+   def __init__(self, name, port, baud, device, device_id):
+      self.name = name
+      self.port = port
+      self.baud = baud
+      self.device = device
+
+      self.serPort = serial.Serial()
+      self.progExecThread = None
+
+      # thread communication queues, commands to and events from thread
+      self.cmdQueue = Queue.Queue()
+      self.eventQueue = Queue.Queue()
+
+      # link state while machine is not the active one
+      self.stateData = gc.gsatStateData()
+      self.stateData.deviceID = device_id
+
+      self.gcodeProgram = None
+      self.statusData = dict(gMACHINE_STATUS_DEFAULTS)
+      self.statusRecord = st.ZeroRecord()
+      self.consoleBuffer = collections.deque(maxlen=gCONSOLE_MAX_CHUNKS)
+      self.runStartTime = 0
+      self.runEndTime = 0
+
+   def Configure(self, port, baud, device, device_id):
+      self.port = port
+      self.baud = baud
+      self.device = device
+
+      if not self.IsOpen():
+         self.stateData.deviceID = device_id
+
+   def IsOpen(self):
+      return self.progExecThread is not None
+
+   def Open(self, notify_sink, cmd_line_options, status_poll=0, streaming=False,
+      rx_buffer_size=127, queue_threshold=4, trace_file="", process_exec=False):
+      """ Opens serial port and starts execute thread, or worker process if
+          process_exec, serial exceptions are left to the caller.
+      """
+      portName = self.port
+      if os.name == 'nt':
+         portName=r"\\.\%s" % (str(self.port))
+
+      self.cmdQueue = Queue.Queue()
+      self.eventQueue = Queue.Queue()
+
+      if process_exec:
+         # worker process owns the port
+         self.progExecThread = procexec.gsatProgramExecuteProcess(notify_sink, portName,
+            self.baud, self.cmdQueue, self.eventQueue, cmd_line_options,
+            self.stateData.deviceID, status_poll, streaming, rx_buffer_size, queue_threshold,
+            trace_file)
+      else:
+         self.serPort.baudrate = self.baud
+         self.serPort.port = portName
+         self.serPort.timeout = 1
+         self.serPort.open()
+
+         self.progExecThread = progexec.gsatProgramExecuteThread(notify_sink, self.serPort,
+            self.cmdQueue, self.eventQueue, cmd_line_options, self.stateData.deviceID,
+            status_poll, streaming, rx_buffer_size, queue_threshold, trace_file)
+
+      self.stateData.serialPortIsOpen = True
+      self.stateData.serialPort = self.port
+      self.stateData.serialPortBaud = self.baud
+
+   def Close(self):
+      if self.progExecThread is not None:
+         self.cmdQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
+      self.progExecThread = None
+      self.serPort.close()
+
+      self.stateData.serialPortIsOpen = False
+      self.stateData.deviceDetected = False
+
+   def RealtimeWrite(self, serialData):
+      """ Real-time commands (feed hold, cycle start, reset), written now
+          ahead of anything queued for the execute thread.
+      """
+      if self.progExecThread is not None:
+         self.progExecThread.RealtimeWrite(serialData)
+
+   def Put(self, event_id, data=None):
+      if self.progExecThread is not None:
+         self.cmdQueue.put(gc.threadEvent(event_id, data))
+
+   def ConsoleAppend(self, text):
+      self.consoleBuffer.append(text)
+
+   def GetConsoleText(self):
+      return "".join(self.consoleBuffer)
+
+   def SaveState(self, stateData):
+      for key in gMACHINE_STATE_KEYS:
+         setattr(self.stateData, key, getattr(stateData, key))
+
+   def LoadState(self, stateData):
+      for key in gMACHINE_STATE_KEYS:
+         setattr(stateData, key, getattr(self.stateData, key))
+
+"""----------------------------------------------------------------------------
+   gsatMachineManager:
+   Machines by name, in configuration order, and which one the UI shows.
+----------------------------------------------------------------------------"""
+class gsatMachineManager():
+   def __init__(self):
+      self.machines = collections.OrderedDict()
+      self.activeName = None
+
+   def Configure(self, machineList):
+      """ machineList is a list of (name, port, baud, device, device_id),
+          existing machines are updated, machines no longer listed are
+          removed unless their link is open.
+      """
+      machines = collections.OrderedDict()
+
+      for name, port, baud, device, deviceID in machineList:
+         machine = self.machines.get(name)
+
+         if machine is None:
+            machine = gsatMachine(name, port, baud, device, deviceID)
+         else:
+            machine.Configure(port, baud, device, deviceID)
+
+         machines[name] = machine
+
+      for name, machine in self.machines.iteritems():
+         if name not in machines and machine.IsOpen():
+            machines[name] = machine
+
+      self.machines = machines
+
+      if self.activeName not in self.machines:
+         self.activeName = self.machines.keys()[0]
+
+   def Get(self, name):
+      return self.machines.get(name)
+
+   def GetActive(self):
+      return self.machines[self.activeName]
+
+   def SetActive(self, name):
+      if name in self.machines:
+         self.activeName = name
+
+      return self.GetActive()
+
+   def GetNames(self):
+      return self.machines.keys()
+
+   def GetMachines(self):
+      return self.machines.values()
+
+   def CloseAll(self):
+      for machine in self.machines.itervalues():
+         if machine.IsOpen():
+            machine.Close()
@@ -59,7 +59,6 @@ import os
 import sys
 import glob
 import serial
-import re
 import threading
 import Queue
 import time
@@ -77,6 +76,7 @@ from wx.lib.wordwrap import wordwrap
 from wx.lib import scrolledpanel as scrolled
 
 import modules.config as gc
+import modules.device as dev
 import images.icons as ico
 import modules.editor as ed
 #import modules.link as link
@@ -84,6 +84,10 @@ import modules.machine as mc
 import modules.jogging as jog
 import modules.compvision as compv
 import modules.progexec as progexec
+import modules.notify as notify
+import modules.machinemgr as mm
+import modules.status as st
+import modules.gcode as gcode
 
 """----------------------------------------------------------------------------
    Globals:
@@ -95,6 +99,7 @@ import modules.progexec as progexec
 gID_TOOLBAR_OPEN                 = wx.NewId()
 gID_TOOLBAR_LINK_STATUS          = wx.NewId()
 gID_TOOLBAR_PROGRAM_STATUS       = wx.NewId()
+gID_TOOLBAR_MACHINE_SELECT       = wx.NewId()
 gID_MENU_MAIN_TOOLBAR            = wx.NewId()
 gID_MENU_SEARCH_TOOLBAR          = wx.NewId()
 gID_MENU_RUN_TOOLBAR             = wx.NewId()
@@ -117,6 +122,9 @@ gID_MENU_BREAK_REMOVE_ALL        = wx.NewId()
 gID_MENU_SET_PC                  = wx.NewId()
 gID_MENU_GOTO_PC                 = wx.NewId()
 gID_MENU_ABORT                   = wx.NewId()
+gID_MENU_FEED_HOLD               = wx.NewId()
+gID_MENU_CYCLE_START             = wx.NewId()
+gID_MENU_RESET                   = wx.NewId()
 gID_MENU_IN2MM                   = wx.NewId()
 gID_MENU_MM2IN                   = wx.NewId()
 gID_MENU_G812G01                 = wx.NewId()
@@ -124,14 +132,8 @@ gID_MENU_FIND                    = wx.NewId()
 gID_MENU_GOTOLINE                = wx.NewId()
 
 
-gID_TIMER_MACHINE_REFRESH        = wx.NewId()
 gID_TIMER_RUN                    = wx.NewId()
-
-# -----------------------------------------------------------------------------
-# regular expressions
-# -----------------------------------------------------------------------------
-gReAxis = re.compile(r'([XYZ])(\s*[-+]*\d+\.{0,1}\d*)', re.IGNORECASE)
-
+gID_TIMER_STATUS                 = wx.NewId()
 
 """----------------------------------------------------------------------------
    gsatLog:
@@ -395,8 +397,9 @@ class gsatMainWindow(wx.Frame):
       # register for thread events
       gc.EVT_THREAD_QUEUE_EVENT(self, self.OnThreadEvent)
 
-      # create serial obj
-      self.serPort = serial.Serial()
+      # create machine manager, one serial link and execute thread per machine
+      self.machineMgr = mm.gsatMachineManager()
+      self.machine = None
 
       # create app data obj
       self.stateData = gc.gsatStateData()
@@ -409,15 +412,13 @@ class gsatMainWindow(wx.Frame):
       self.InitConfig()
 
       # init some variables
-      self.progExecThread = None
-      self.machineAutoRefreshTimer = None
       self.runTimer = None
       self.runStartTime = 0
       self.runEndTime = 0
-
-      # thread communication queues
-      self.mainWndInQueue = Queue.Queue()
-      self.mainWndOutQueue = Queue.Queue()
+      self.statusTimer = None
+      self.statusPending = dict()
+      self.statusRecordPending = None
+      self.statusUpdateTime = 0
 
       # register for close events
       self.Bind(wx.EVT_CLOSE, self.OnClose)
@@ -432,14 +433,20 @@ class gsatMainWindow(wx.Frame):
       self.maxFileHistory = self.configData.Get('/mainApp/MaxFileHistory')
       self.roundInch2mm = self.configData.Get('/mainApp/RoundInch2mm')
       self.roundmm2Inch = self.configData.Get('/mainApp/Roundmm2Inch')
+      self.codeLargeFileSize = self.configData.Get('/code/LargeFileSize')
       self.machinePort = self.configData.Get('/machine/Port')
       self.machineBaud = self.configData.Get('/machine/Baud')
-      self.machineAutoStatus = self.configData.Get('/machine/AutoStatus')
       self.machineAutoRefresh = self.configData.Get('/machine/AutoRefresh')
       self.machineAutoRefreshPeriod = self.configData.Get('/machine/AutoRefreshPeriod')
+      self.machineStatusRate = self.configData.Get('/machine/StatusRate')
       self.deviceName = self.configData.Get('/machine/Device')
-      self.stateData.deviceID = mc.GetDeviceID(self.configData.Get('/machine/Device'))
       self.machineGrblDroHack = self.configData.Get('/machine/GrblDroHack')
+      self.machineStreaming = self.configData.Get('/machine/Streaming')
+      self.machineRxBufferSize = self.configData.Get('/machine/RxBufferSize')
+      self.machineQueueThreshold = self.configData.Get('/machine/QueueThreshold')
+      self.machineTraceFile = self.configData.Get('/machine/TraceFile')
+      self.machineList = self.configData.Get('/machine/Machines')
+      self.machineProcessExec = self.configData.Get('/machine/ProcessExec')
 
       if self.cmdLineOptions.verbose:
          print "Init config values..."
@@ -448,13 +455,48 @@ class gsatMainWindow(wx.Frame):
          print "  maxFileHistory:           ", self.maxFileHistory
          print "  roundInch2mm:             ", self.roundInch2mm
          print "  roundmm2Inch:             ", self.roundmm2Inch
+         print "  codeLargeFileSize:        ", self.codeLargeFileSize
          print "  machinePort:              ", self.machinePort
          print "  machineBaud:              ", self.machineBaud
-         print "  machineAutostatus:        ", self.machineAutoStatus
          print "  machineAutoRefresh:       ", self.machineAutoRefresh
          print "  machineAutoRefreshPeriod: ", self.machineAutoRefreshPeriod
+         print "  machineStatusRate:        ", self.machineStatusRate
          print "  deviceName:               ", self.deviceName
          print "  deviceID:                 ", self.stateData.deviceID
+         print "  machineStreaming:         ", self.machineStreaming
+         print "  machineRxBufferSize:      ", self.machineRxBufferSize
+         print "  machineQueueThreshold:    ", self.machineQueueThreshold
+         print "  machineTraceFile:         ", self.machineTraceFile
+         print "  machineProcessExec:       ", self.machineProcessExec
+         print "  machineList:              ", mm.ParseMachineList(self.machineList)
+
+      self.InitMachines()
+
+   def InitMachines(self):
+      # first machine from main settings, then additional machines
+      machineList = [(mm.gMACHINE_DEFAULT_NAME, self.machinePort, self.machineBaud,
+         self.deviceName, dev.GetDeviceID(self.deviceName))]
+
+      for name, port, baud, device in mm.ParseMachineList(self.machineList):
+         machineList.append((name, port, baud, device, dev.GetDeviceID(device)))
+
+      self.machineMgr.Configure(machineList)
+
+      if self.machine is None:
+         self.machine = self.machineMgr.GetActive()
+         self.machine.LoadState(self.stateData)
+      elif self.machine is not self.machineMgr.GetActive():
+         # active machine was removed (only closed ones are)
+         self.machine.SaveState(self.stateData)
+         self.machine = self.machineMgr.GetActive()
+         self.machine.LoadState(self.stateData)
+
+         if hasattr(self, 'outputText'):
+            self.outputText.SetConsoleText(self.machine.GetConsoleText())
+            self.StatusUpdate(dict(self.machine.statusData), self.machine.statusRecord.Copy())
+
+      if not self.stateData.serialPortIsOpen:
+         self.stateData.deviceID = self.machine.stateData.deviceID
 
    def InitUI(self):
       """ Init main UI """
@@ -479,11 +521,23 @@ class gsatMainWindow(wx.Frame):
       #wx.Log_SetActiveTarget(wx.LogStderr())
       #wx.Log_SetTraceMask(wx.TraceMessages)
 
-      # main gcode list control
-      self.gcText = ed.gsatGcodeStcStyledTextCtrl(self, self.configData, self.stateData, style=wx.NO_BORDER)
+      # main gcode list control, editor or read only viewer for large files,
+      # gcText is the one in use
+      self.gcPanel = wx.Panel(self, style=wx.NO_BORDER)
+      self.gcEditor = ed.gsatGcodeStcStyledTextCtrl(self.gcPanel, self.configData, self.stateData,
+         style=wx.NO_BORDER)
+      self.gcViewer = ed.gsatGcodeListCtrl(self.gcPanel, self.configData, self.stateData,
+         style=wx.NO_BORDER)
+      self.gcViewer.Hide()
+      self.gcText = self.gcEditor
+
+      gcSizer = wx.BoxSizer(wx.VERTICAL)
+      gcSizer.Add(self.gcEditor, 1, wx.EXPAND)
+      gcSizer.Add(self.gcViewer, 1, wx.EXPAND)
+      self.gcPanel.SetSizer(gcSizer)
 
       # add the panes to the manager
-      self.aui_mgr.AddPane(self.gcText,
+      self.aui_mgr.AddPane(self.gcPanel,
          aui.AuiPaneInfo().Name("GCODE_PANEL").CenterPane().Caption("G-Code")\
             .CloseButton(True).MaximizeButton(True).BestSize(600,600))
 
@@ -650,6 +704,21 @@ class gsatMainWindow(wx.Frame):
          abortItem.SetBitmap(ico.imgAbort.GetBitmap())
       runMenu.AppendItem(abortItem)
 
+      feedHoldItem = wx.MenuItem(runMenu, gID_MENU_FEED_HOLD,"&Feed Hold (!)")
+      if os.name != 'nt':
+         feedHoldItem.SetBitmap(ico.imgPause.GetBitmap())
+      runMenu.AppendItem(feedHoldItem)
+
+      cycleStartItem = wx.MenuItem(runMenu, gID_MENU_CYCLE_START,"&Cycle Start (~)")
+      if os.name != 'nt':
+         cycleStartItem.SetBitmap(ico.imgPlay.GetBitmap())
+      runMenu.AppendItem(cycleStartItem)
+
+      resetItem = wx.MenuItem(runMenu, gID_MENU_RESET,"R&eset (Ctrl-X)")
+      if os.name != 'nt':
+         resetItem.SetBitmap(ico.imgStop.GetBitmap())
+      runMenu.AppendItem(resetItem)
+
       #------------------------------------------------------------------------
       # Tool menu
       toolMenu = wx.Menu()
@@ -736,6 +805,9 @@ class gsatMainWindow(wx.Frame):
       self.Bind(wx.EVT_MENU, self.OnSetPC,               id=gID_MENU_SET_PC)
       self.Bind(wx.EVT_MENU, self.OnGoToPC,              id=gID_MENU_GOTO_PC)
       self.Bind(wx.EVT_MENU, self.OnAbort,               id=gID_MENU_ABORT)
+      self.Bind(wx.EVT_MENU, self.OnFeedHold,            id=gID_MENU_FEED_HOLD)
+      self.Bind(wx.EVT_MENU, self.OnCycleStart,          id=gID_MENU_CYCLE_START)
+      self.Bind(wx.EVT_MENU, self.OnReset,               id=gID_MENU_RESET)
 
       self.Bind(wx.EVT_BUTTON, self.OnRun,               id=gID_MENU_RUN)
       self.Bind(wx.EVT_BUTTON, self.OnPause,             id=gID_MENU_PAUSE)
@@ -745,6 +817,9 @@ class gsatMainWindow(wx.Frame):
       self.Bind(wx.EVT_BUTTON, self.OnSetPC,             id=gID_MENU_SET_PC)
       self.Bind(wx.EVT_BUTTON, self.OnGoToPC,            id=gID_MENU_GOTO_PC)
       self.Bind(wx.EVT_BUTTON, self.OnAbort,             id=gID_MENU_ABORT)
+      self.Bind(wx.EVT_BUTTON, self.OnFeedHold,          id=gID_MENU_FEED_HOLD)
+      self.Bind(wx.EVT_BUTTON, self.OnCycleStart,        id=gID_MENU_CYCLE_START)
+      self.Bind(wx.EVT_BUTTON, self.OnReset,             id=gID_MENU_RESET)
 
       self.Bind(wx.EVT_UPDATE_UI, self.OnRunUpdate,      id=gID_MENU_RUN)
       self.Bind(wx.EVT_UPDATE_UI, self.OnPauseUpdate,    id=gID_MENU_PAUSE)
@@ -757,6 +832,9 @@ class gsatMainWindow(wx.Frame):
       self.Bind(wx.EVT_UPDATE_UI, self.OnSetPCUpdate,    id=gID_MENU_SET_PC)
       self.Bind(wx.EVT_UPDATE_UI, self.OnGoToPCUpdate,   id=gID_MENU_GOTO_PC)
       self.Bind(wx.EVT_UPDATE_UI, self.OnAbortUpdate,    id=gID_MENU_ABORT)
+      self.Bind(wx.EVT_UPDATE_UI, self.OnRealtimeUpdate, id=gID_MENU_FEED_HOLD)
+      self.Bind(wx.EVT_UPDATE_UI, self.OnRealtimeUpdate, id=gID_MENU_CYCLE_START)
+      self.Bind(wx.EVT_UPDATE_UI, self.OnRealtimeUpdate, id=gID_MENU_RESET)
 
       #------------------------------------------------------------------------
       # tools menu bind
@@ -907,6 +985,18 @@ class gsatMainWindow(wx.Frame):
          "Abort")
       self.gcodeToolBar.SetToolDisabledBitmap(gID_MENU_ABORT, ico.imgAbortDisabled.GetBitmap())
 
+      self.gcodeToolBar.AddSimpleTool(gID_MENU_FEED_HOLD, "Feed Hold", ico.imgPause.GetBitmap(),
+         "Feed Hold (!), sent to device right away")
+      self.gcodeToolBar.SetToolDisabledBitmap(gID_MENU_FEED_HOLD, ico.imgPauseDisabled.GetBitmap())
+
+      self.gcodeToolBar.AddSimpleTool(gID_MENU_CYCLE_START, "Cycle Start", ico.imgPlay.GetBitmap(),
+         "Cycle Start (~), resume after feed hold")
+      self.gcodeToolBar.SetToolDisabledBitmap(gID_MENU_CYCLE_START, ico.imgPlayDisabled.GetBitmap())
+
+      self.gcodeToolBar.AddSimpleTool(gID_MENU_RESET, "Reset", ico.imgStop.GetBitmap(),
+         "Reset (Ctrl-X), device drops motion and buffered lines")
+      self.gcodeToolBar.SetToolDisabledBitmap(gID_MENU_RESET, ico.imgStopDisabled.GetBitmap())
+
       self.gcodeToolBar.Realize()
 
       self.aui_mgr.AddPane(self.gcodeToolBar,
@@ -933,6 +1023,13 @@ class gsatMainWindow(wx.Frame):
          "Program Status")
       self.statusToolBar.SetToolDisabledBitmap(gID_TOOLBAR_PROGRAM_STATUS, ico.imgProgram.GetBitmap())
 
+      self.statusToolBar.AddSeparator()
+      self.machineChoice = wx.Choice(self.statusToolBar, gID_TOOLBAR_MACHINE_SELECT,
+         choices=self.machineMgr.GetNames())
+      self.machineChoice.SetStringSelection(self.machine.name)
+      self.machineChoice.SetToolTip(wx.ToolTip("Machine shown and controlled by the UI"))
+      self.statusToolBar.AddControl(self.machineChoice)
+      self.Bind(wx.EVT_CHOICE, self.OnMachineSelect, self.machineChoice)
 
       self.statusToolBar.Realize()
 
@@ -1057,6 +1154,10 @@ class gsatMainWindow(wx.Frame):
       if os.path.exists(fileName):
          self.stateData.gcodeFileName = fileName
 
+         # files too large for the editor open in the viewer
+         largeFileSize = self.codeLargeFileSize * 1024 * 1024
+         self.SelectCodeView(largeFileSize > 0 and os.path.getsize(fileName) >= largeFileSize)
+
          readOnly = self.gcText.GetReadOnly()
          self.gcText.SetReadOnly(False)
          self.gcText.LoadFile(self.stateData.gcodeFileName)
@@ -1080,6 +1181,27 @@ class gsatMainWindow(wx.Frame):
 
       #self.gcText.SetReadOnly(True)
 
+   def SelectCodeView(self, useViewer):
+      codeView = self.gcViewer if useViewer else self.gcEditor
+
+      if codeView is self.gcText:
+         return
+
+      # release the text or file of the view being hidden
+      if useViewer:
+         readOnly = self.gcEditor.GetReadOnly()
+         self.gcEditor.SetReadOnly(False)
+         self.gcEditor.ClearAll()
+         self.gcEditor.EmptyUndoBuffer()
+         self.gcEditor.SetReadOnly(readOnly)
+      else:
+         self.gcViewer.CloseFile()
+
+      self.gcEditor.Show(not useViewer)
+      self.gcViewer.Show(useViewer)
+      self.gcText = codeView
+      self.gcPanel.Layout()
+
    def OnFileSave(self, e):
       if not self.stateData.fileIsOpen:
          self.OnFileSaveAs(e)
@@ -1251,21 +1373,22 @@ class gsatMainWindow(wx.Frame):
          dlg.UpdatConfigData()
 
          self.InitConfig()
+         self.UpdateMachineChoice()
 
          # re open serial port if open
          if self.stateData.serialPortIsOpen and \
-            (self.stateData.serialPort != self.machinePort or self.stateData.serialPortBaud != self.machineBaud):
+            (self.stateData.serialPort != self.machine.port or \
+             self.stateData.serialPortBaud != self.machine.baud):
 
             self.SerialClose()
-            self.SerialOpen(self.machinePort, self.machineBaud)
+            self.SerialOpen(self.machine.port, self.machine.baud)
 
-         if self.stateData.machineStatusAutoRefresh != self.machineAutoRefresh or \
-            self.stateData.machineStatusAutoRefreshPeriod != self.machineAutoRefreshPeriod:
+         # status poll period, all open machines share it
+         for machine in self.machineMgr.GetMachines():
+            machine.Put(gc.gEV_CMD_AUTO_STATUS, self.GetStatusPollPeriod())
 
-            self.AutoRefreshTimerStop()
-            self.AutoRefreshTimerStart()
-
-         self.gcText.UpdateSettings(self.configData)
+         self.gcEditor.UpdateSettings(self.configData)
+         self.gcViewer.UpdateSettings(self.configData)
          self.outputText.UpdateSettings(self.configData)
          self.machineStatusPanel.UpdateSettings(self.configData)
          self.machineJoggingPanel.UpdateSettings(self.configData)
@@ -1288,15 +1411,14 @@ class gsatMainWindow(wx.Frame):
       self.OnSetPCUpdate()
       self.OnGoToPCUpdate()
       self.OnAbortUpdate()
+      self.OnRealtimeUpdate()
       self.gcodeToolBar.Refresh()
 
    def OnRun(self, e=None):
-      if self.progExecThread is not None:
-         rawText = self.gcText.GetText()
-         self.stateData.gcodeFileLines = rawText.splitlines(True)
-
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_RUN,
-            [self.stateData.gcodeFileLines, self.stateData.programCounter, self.stateData.breakPoints]))
+      if self.machine.IsOpen() and not self.IsProgramFileChanged():
+         self.UpdateMachineProgram()
+         self.machine.Put(gc.gEV_CMD_RUN,
+            [self.machine.gcodeProgram, self.stateData.programCounter, self.stateData.breakPoints])
 
          if self.stateData.swState != gc.gSTATE_PAUSE and \
             self.stateData.swState != gc.gSTATE_BREAK:
@@ -1309,6 +1431,28 @@ class gsatMainWindow(wx.Frame):
          self.stateData.swState = gc.gSTATE_RUN
          self.UpdateUI()
 
+   def UpdateMachineProgram(self):
+      # machine runs its own copy, editor may load other files meanwhile,
+      # copy again only if the program changed since last run or step
+      machineProgram = self.machine.gcodeProgram
+      if machineProgram is None or \
+         machineProgram.revision != self.stateData.gcodeProgram.revision:
+         self.machine.gcodeProgram = self.stateData.gcodeProgram.Copy()
+
+   def IsProgramFileChanged(self):
+      # file programs (large file viewer) read the file on disk as they run
+      if not self.stateData.gcodeProgram.IsFileChanged():
+         return False
+
+      dlg = wx.MessageDialog(self,
+         "The file changed on disk since it was opened.\n" \
+         "File: %s\n\n" \
+         "Please open the file again before running it." % self.stateData.gcodeFileName, "",
+         wx.OK|wx.ICON_STOP)
+      dlg.ShowModal()
+      dlg.Destroy()
+      return True
+
    def OnRunUpdate(self, e=None):
       state = False
       if self.stateData.serialPortIsOpen and \
@@ -1341,12 +1485,10 @@ class gsatMainWindow(wx.Frame):
       self.gcodeToolBar.EnableTool(gID_MENU_STOP, state)
 
    def OnStep(self, e):
-      if self.progExecThread is not None:
-         rawText = self.gcText.GetText()
-         self.stateData.gcodeFileLines = rawText.splitlines(True)
-
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_STEP,
-            [self.stateData.gcodeFileLines, self.stateData.programCounter, self.stateData.breakPoints]))
+      if self.machine.IsOpen() and not self.IsProgramFileChanged():
+         self.UpdateMachineProgram()
+         self.machine.Put(gc.gEV_CMD_STEP,
+            [self.machine.gcodeProgram, self.stateData.programCounter, self.stateData.breakPoints])
 
          self.stateData.swState = gc.gSTATE_STEP
          self.UpdateUI()
@@ -1446,15 +1588,15 @@ class gsatMainWindow(wx.Frame):
       self.gcodeToolBar.EnableTool(gID_MENU_GOTO_PC, state)
 
    def OnAbort(self, e):
-      self.serPort.write("!\n")
+      self.machine.RealtimeWrite(gc.gDEVICE_CMD_FEED_HOLD)
       self.Stop(gc.gSTATE_ABORT)
-      self.outputText.AppendText("> !\n")
-      self.outputText.AppendText(
+      self.ConsoleAppend(
          "*** ABORT!!! a feed-hold command (!) has been sent to %s, you can\n"\
-         "    use cycle-restart command (~) to continue.\n"\
+         "    use cycle-start command (~) to continue.\n"\
          "    \n"
-         "    Note: If this is not desirable please reset %s, by closing and opening\n"\
-         "    the serial link port.\n" % (self.deviceName, self.deviceName))
+         "    Note: If this is not desirable please reset %s, with Reset (Ctrl-X)\n"\
+         "    or by closing and opening the serial link port.\n" % (self.machine.device,
+         self.machine.device))
 
    def OnAbortUpdate(self, e=None):
       state = False
@@ -1466,6 +1608,29 @@ class gsatMainWindow(wx.Frame):
 
       self.gcodeToolBar.EnableTool(gID_MENU_ABORT, state)
 
+   def OnFeedHold(self, e):
+      self.machine.RealtimeWrite(gc.gDEVICE_CMD_FEED_HOLD)
+
+   def OnCycleStart(self, e):
+      self.machine.RealtimeWrite(gc.gDEVICE_CMD_CYCLE_START)
+
+   def OnReset(self, e):
+      # don't wait for acknowledge of lines the device is going to drop
+      self.machine.RealtimeWrite(gc.gDEVICE_CMD_RESET)
+      self.Stop()
+
+   def OnRealtimeUpdate(self, e=None):
+      state = False
+      if self.stateData.serialPortIsOpen:
+         state = True
+
+      if e is not None:
+         e.Enable(state)
+
+      self.gcodeToolBar.EnableTool(gID_MENU_FEED_HOLD, state)
+      self.gcodeToolBar.EnableTool(gID_MENU_CYCLE_START, state)
+      self.gcodeToolBar.EnableTool(gID_MENU_RESET, state)
+
    #---------------------------------------------------------------------------
    # Tools Menu Handlers
    #---------------------------------------------------------------------------
@@ -1476,6 +1641,10 @@ class gsatMainWindow(wx.Frame):
           self.stateData.swState == gc.gSTATE_PAUSE):
          state = True
 
+      # viewer has no text to convert
+      if self.gcText is self.gcViewer:
+         state = False
+
       e.Enable(state)
 
    def OnInch2mm(self, e):
@@ -1580,7 +1749,7 @@ class gsatMainWindow(wx.Frame):
       if self.stateData.serialPortIsOpen:
          self.SerialClose()
       else:
-         self.SerialOpen(self.configData.Get('/machine/Port'), self.configData.Get('/machine/Baud'))
+         self.SerialOpen(self.machine.port, self.machine.baud)
 
    #---------------------------------------------------------------------------
    # Help Menu Handlers
@@ -1617,8 +1786,10 @@ class gsatMainWindow(wx.Frame):
       if self.stateData.serialPortIsOpen:
          self.SerialClose()
 
-      if self.progExecThread is not None:
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
+      self.machineMgr.CloseAll()
+
+      if self.statusTimer is not None:
+         self.statusTimer.Stop()
 
       self.machineJoggingPanel.SaveCli()
       self.configData.Save(self.configFile)
@@ -1659,36 +1830,58 @@ class gsatMainWindow(wx.Frame):
          self.stateData.swState != gc.gSTATE_BREAK:
          self.RunTimerStop()
 
-      self.machineStatusPanel.UpdateUI(self.stateData, dict({'rtime':runTimeStr}))
+      self.StatusUpdate(dict({'rtime':runTimeStr}))
 
+   def StatusUpdate(self, statusData=None, statusRecord=None):
+      # coalesce status data, newest value per key (record field) wins,
+      # panels are updated at most once per frame interval
+      if statusData is not None:
+         self.machine.statusData.update(statusData)
+         self.statusPending.update(statusData)
 
-   def AutoRefreshTimerStart(self):
-      self.stateData.machineStatusAutoRefresh = self.machineAutoRefresh
-      self.stateData.machineStatusAutoRefreshPeriod = self.machineAutoRefreshPeriod
+      if statusRecord is not None:
+         self.machine.statusRecord.Merge(statusRecord)
 
-      if self.stateData.machineStatusAutoRefresh:
-         if self.machineAutoRefreshTimer is not None:
-            self.machineAutoRefreshTimer.Stop()
+         if self.statusRecordPending is None:
+            self.statusRecordPending = statusRecord
          else:
-            t = self.machineAutoRefreshTimer = wx.Timer(self, gID_TIMER_MACHINE_REFRESH)
-            self.Bind(wx.EVT_TIMER, self.OnAutoRefreshTimerAction, t)
-
-         self.machineAutoRefreshTimer.Start(self.stateData.machineStatusAutoRefreshPeriod)
-
-   def AutoRefreshTimerStop(self):
-      if self.machineAutoRefreshTimer is not None:
-         self.machineAutoRefreshTimer.Stop()
-
-   def OnAutoRefreshTimerAction(self, e):
-      if self.stateData.deviceDetected:
-         # this is know to cause problems with Grbl 0.8c (maybe fixed in 0.9),
-         # if too many request are sent Grbl behaves erratically, this is really
-         # not require needed with TinyG(2) as its purpose is to update status
-         # panel, and TinyG(2) already provides this information at run time.
-         if self.stateData.deviceID == gc.gDEV_TINYG2 or self.stateData.deviceID == gc.gDEV_TINYG:
-            self.SerialWrite(gc.gTINYG_CMD_GET_STATUS)
-         elif self.stateData.deviceID == gc.gDEV_GRBL:
-            self.SerialWrite(gc.gGRBL_CMD_GET_STATUS)
+            self.statusRecordPending.Merge(statusRecord)
+
+      if self.statusTimer is not None and self.statusTimer.IsRunning():
+         return
+
+      waitTime = 0
+      if self.machineStatusRate > 0:
+         waitTime = self.statusUpdateTime + 1.0/self.machineStatusRate - time.time()
+
+      if waitTime <= 0:
+         self.OnStatusTimerAction()
+      else:
+         if self.statusTimer is None:
+            t = self.statusTimer = wx.Timer(self, gID_TIMER_STATUS)
+            self.Bind(wx.EVT_TIMER, self.OnStatusTimerAction, t)
+
+         self.statusTimer.Start(max(1, int(waitTime * 1000)), wx.TIMER_ONE_SHOT)
+
+   def OnStatusTimerAction(self, e=None):
+      statusData = self.statusPending
+      self.statusPending = dict()
+      statusRecord = self.statusRecordPending
+      self.statusRecordPending = None
+      self.statusUpdateTime = time.time()
+
+      if statusRecord is not None and statusRecord.state is not None:
+         self.stateData.machineStatusString = statusRecord.state
+
+      self.machineStatusPanel.UpdateUI(self.stateData, statusData, statusRecord)
+      self.machineJoggingPanel.UpdateUI(self.stateData, statusData, statusRecord)
+
+   def GetStatusPollPeriod(self):
+      # milliseconds, 0 turns link status poller off
+      if self.machineAutoRefresh:
+         return self.machineAutoRefreshPeriod
+
+      return 0
 
    def GetSerialPortList(self):
       spList = []
@@ -1717,19 +1910,15 @@ class gsatMainWindow(wx.Frame):
       return sbList
 
    def SerialOpen(self, port, baud):
-      self.serPort.baudrate = baud
-
       if port != "None":
-         portName = port
-         if os.name == 'nt':
-            portName=r"\\.\%s" % (str(port))
-
-         self.serPort.port = portName
-         self.serPort.timeout=1
+         self.machine.port = port
+         self.machine.baud = baud
 
          try:
-            #import pdb;pdb.set_trace()
-            self.serPort.open()
+            self.machine.Open(notify.gsatWxNotifySink(self, self.machine.name),
+               self.cmdLineOptions, self.GetStatusPollPeriod(), self.machineStreaming,
+               self.machineRxBufferSize, self.machineQueueThreshold,
+               self.GetMachineTraceFile(self.machine), self.machineProcessExec)
 
          except serial.SerialException, e:
             if self.cmdLineOptions.verbose:
@@ -1739,7 +1928,7 @@ class gsatMainWindow(wx.Frame):
                "pySerial exception", wx.OK|wx.ICON_STOP)
             result = dlg.ShowModal()
             dlg.Destroy()
-            self.serPort.close()
+            self.machine.serPort.close()
          except OSError, e:
             if self.cmdLineOptions.verbose:
                print "gsatMainWindow OSError exception: %s" % str(e)
@@ -1748,16 +1937,12 @@ class gsatMainWindow(wx.Frame):
                "OSError exception", wx.OK|wx.ICON_STOP)
             result = dlg.ShowModal()
             dlg.Destroy()
-            self.serPort.close()
-
-         if self.serPort.isOpen():
-            self.progExecThread = progexec.gsatProgramExecuteThread(self, self.serPort, self.mainWndOutQueue,
-               self.mainWndInQueue, self.cmdLineOptions, self.stateData.deviceID, self.machineAutoStatus)
+            self.machine.serPort.close()
 
+         if self.machine.IsOpen():
             self.stateData.serialPortIsOpen = True
             self.stateData.serialPort = port
             self.stateData.serialPortBaud = baud
-            self.AutoRefreshTimerStart()
       else:
          dlg = wx.MessageDialog(self,
             "There is no valid serial port detected.\n" \
@@ -1770,22 +1955,16 @@ class gsatMainWindow(wx.Frame):
       self.UpdateUI()
 
    def SerialClose(self):
-      if self.progExecThread is not None:
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
-      self.progExecThread = None
-      self.serPort.close()
+      self.machine.Close()
 
       self.stateData.serialPortIsOpen = False
       self.stateData.deviceDetected = False
-      self.AutoRefreshTimerStop()
       self.UpdateUI()
 
    def SerialWrite(self, serialData):
       if self.stateData.serialPortIsOpen:
 
-         if self.progExecThread is not None:
-            self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_SEND, serialData))
-            #self.mainWndOutQueue.join()
+         self.machine.Put(gc.gEV_CMD_SEND, serialData)
 
       elif self.cmdLineOptions.verbose:
          print "gsatMainWindow ERROR: attempt serial write with port closed!!"
@@ -1793,15 +1972,14 @@ class gsatMainWindow(wx.Frame):
    def SerialWriteWaitForAck(self, serialData):
       if self.stateData.serialPortIsOpen:
 
-         if self.progExecThread is not None:
-            self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_SEND_W_ACK, serialData))
+         self.machine.Put(gc.gEV_CMD_SEND_W_ACK, serialData)
 
       elif self.cmdLineOptions.verbose:
          print "gsatMainWindow ERROR: attempt serial write with port closed!!"
 
    def Stop(self, toState=gc.gSTATE_IDLE):
-      if self.progExecThread is not None:
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_STOP, None))
+      if self.machine.IsOpen():
+         self.machine.Put(gc.gEV_CMD_STOP)
 
          self.stateData.swState = toState
          self.UpdateUI()
@@ -1813,21 +1991,14 @@ class gsatMainWindow(wx.Frame):
       self.stateData.programCounter = pc
       self.gcText.UpdatePC(pc)
 
-   def MachineStatusAutoRefresh(self, autoRefresh):
-      self.stateData.machineStatusAutoRefresh = autoRefresh
-
-      if self.progExecThread is not None:
-         self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_AUTO_STATUS, self.stateData.machineStatusAutoRefresh))
-
-      if autoRefresh:
-         self.GetMachineStatus()
-
    def GetMachineStatus(self):
       if self.stateData.serialPortIsOpen:
-         if self.stateData.deviceID == gc.gDEV_TINYG2 or self.stateData.deviceID == gc.gDEV_TINYG:
-            self.SerialWriteWaitForAck(gc.gTINYG_CMD_GET_STATUS)
-         elif self.stateData.deviceID == gc.gDEV_GRBL:
-            self.SerialWrite(gc.gGRBL_CMD_GET_STATUS)
+         device = dev.GetDeviceClass(self.stateData.deviceID)
+
+         if device.statusPollCmd is not None:
+            self.machine.RealtimeWrite(device.statusPollCmd)
+         elif device.getStatusCmd is not None:
+            self.SerialWriteWaitForAck(device.getStatusCmd)
 
    def LoadLayoutData(self, key, update=True):
       dimesnionsData = layoutData = self.configFile.Read(key+"/Dimensions")
@@ -1872,146 +2043,89 @@ class gsatMainWindow(wx.Frame):
       self.configFile.Write(key+"/Perspective", layoutData)
 
    def ConvertInchAndmm(self, lines, in_to_mm=True, round_to=-1):
-      ret_lienes=[]
-
-      # itarate input lines
-      for line in lines:
-
-         # check for G20/G21 anc hange accordingly
-         if in_to_mm:
-            re_matches = re.findall(r"G20", line)
-            if len(re_matches) > 0:
-               line = line.replace("G20", "G21")
-               #line = line.replace("INCHES", "MILLIMETERS")
-         else:
-            re_matches = re.findall(r"G21", line)
-            if len(re_matches) > 0:
-               line = line.replace("G21", "G20")
-               #line = line.replace("MILLIMETERS", "INCHES")
-
-         # check for G with units to convert code
-         re_matches = re.findall(r"((X|Y|Z|R|F)([-+]?\d*\.\d*))", line)
-         #re_matches = re.findall(r"((Z|R|F)([-+]?\d*\.\d*))", line)
-         #import pdb;pdb.set_trace()
-         if len(re_matches) > 0:
-            # convert here
-            # re_match item: string to (replace, literal, value)
-            for match in re_matches:
-               current_val = float(match[2])
-               if in_to_mm:
-                  convert_val = 25.4 * current_val
-               else:
-                  convert_val = current_val / 25.4
-
-               if round_to > -1:
-                  convert_val = round(convert_val, round_to)
-
-               current_str = match[0]
-               convert_str = match[1] + str(convert_val)
-
-               line = line.replace(current_str, convert_str)
-
-         ret_lienes.append(line)
-
-      return ret_lienes
+      return gcode.ConvertUnits(lines, in_to_mm, round_to)
 
    def ConvertG812G01(self, lines):
-      ret_lienes=[]
-      state = 0
-      R = 0
-      Z = 0
-      F = 0
-
-      for line in lines:
-
-         # check for empty lines
-         if len(line.strip()) == 0:
-            if state != 0:
-               state = 0
-
-         # check for G code
-         match = re.match(r"G81\s*R(\d*\.\d*)\s*Z([-+]?\d*\.\d*)\sF(\d*\.\d*)", line)
-         if match is not None:
-            state = 81
-            R = match.group(1)
-            Z = match.group(2)
-            F = match.group(3)
-
-         # in 81 state, convert G81 XY lines to G01
-         if state == 81:
-            match = re.match(r".*X([-+]?\d*\.\d*)\sY([-+]?\d*\.\d*)", line)
-            if match is not None:
-               X = match.group(1)
-               Y = match.group(2)
-
-               line = \
-                  "G00 X%s Y%s ( rapid move to drill zone. )\n" \
-                  "G01 Z%s F%s ( plunge. )\n" \
-                  "G00 Z%s ( retract )\n" % (X,Y,Z,F,R)
-
-         ret_lienes.append(line)
-
-      return ret_lienes
+      return gcode.ConvertG81ToG01(lines)
 
    """-------------------------------------------------------------------------
    gsatMainWindow: Serial Port Thread Event Handlers
    Handle events coming from serial port thread
    -------------------------------------------------------------------------"""
    def OnThreadEvent(self, e):
-      while (not self.mainWndInQueue.empty()):
+      # event data is the name of the machine with events to consume
+      machine = self.machineMgr.Get(e.data)
+
+      if machine is None:
+         return
+
+      if machine is not self.machine:
+         self.OnMachineThreadEvent(machine)
+         return
+
+      while (not self.machine.eventQueue.empty()):
          # get dat from queue
-         te = self.mainWndInQueue.get()
+         te = self.machine.eventQueue.get()
 
          if te.event_id == gc.gEV_ABORT:
             if self.cmdLineOptions.vverbose:
                print "gsatMainWindow got event gc.gEV_ABORT."
-            self.outputText.AppendText(te.data)
-            self.progExecThread = None
+            self.ConsoleAppend(te.data)
             self.SerialClose()
 
          elif te.event_id == gc.gEV_DATA_STATUS:
-            self.stateData.machineStatusString = te.data.get('stat', 'Uknown')
-            self.machineStatusPanel.UpdateUI(self.stateData, te.data)
-            self.machineJoggingPanel.UpdateUI(self.stateData, te.data)
+            self.StatusUpdate(statusRecord=te.data)
+
+         elif te.event_id == gc.gEV_DATA_TIMING:
+            if self.cmdLineOptions.vverbose:
+               print "gsatMainWindow got event gc.gEV_DATA_TIMING."
+
+            self.StatusUpdate(self.FormatTimingStatus(te.data))
 
          elif te.event_id == gc.gEV_DATA_IN:
             if self.cmdLineOptions.vverbose:
                print "gsatMainWindow got event gc.gEV_DATA_IN."
 
-            self.outputText.AppendText("%s" % te.data)
+            self.ConsoleAppend("%s" % te.data)
+
+         elif te.event_id == gc.gEV_DATA_ERROR:
+            if self.cmdLineOptions.vverbose:
+               print "gsatMainWindow got event gc.gEV_DATA_ERROR."
+
+            self.ConsoleAppend(self.FormatDeviceError(te.data))
 
          elif te.event_id == gc.gEV_DATA_OUT:
             if self.cmdLineOptions.vverbose:
                print "gsatMainWindow got event gc.gEV_DATA_OUT."
-            self.outputText.AppendText("> %s" % te.data)
+            self.ConsoleAppend("> %s" % te.data)
 
             # -----------------------------------------------------------------
             # Grbl DRO Hack
-            if self.machineGrblDroHack and self.stateData.deviceID == gc.gDEV_GRBL:
-               rematch = gReAxis.findall(te.data)
-               if len(rematch) > 0:
-                  machineStatus = dict()
-                  for match in rematch:
-                     machineStatus["wpos%s" % match[0].lower()] = match[1]
+            if self.machineGrblDroHack and \
+               dev.GetDeviceClass(self.stateData.deviceID).statusPollCmd is not None:
+               axisWords = [(letter, value) for letter, value in gcode.Tokenize(te.data)
+                  if letter in gcode.gGCODE_AXES]
+               if len(axisWords) > 0:
+                  statusRecord = st.gsatStatusRecord()
+                  for letter, value in axisWords:
+                     setattr(statusRecord, "wpos%s" % letter.lower(), float(value))
 
                   if self.cmdLineOptions.vverbose:
-                     print "gsatMainWindow re GRBL GCODE match %s" % str(rematch)
+                     print "gsatMainWindow GRBL GCODE axis words %s" % str(axisWords)
                      print "gsatMainWindow str match from %s" % str(te.data.strip())
 
-                  self.stateData.machineStatusString = machineStatus.get('stat', 'Uknown')
-                  self.machineStatusPanel.UpdateUI(self.stateData, machineStatus)
-                  self.machineJoggingPanel.UpdateUI(self.stateData, machineStatus)
+                  self.StatusUpdate(statusRecord=statusRecord)
                   #self.UpdateUI()
 
          elif te.event_id == gc.gEV_PC_UPDATE:
             # calculate percentage if lines sent
-            prcnt = "%.2f%%" % (float(te.data)/float(len(self.stateData.gcodeFileLines)) * 100)
+            prcnt = "%.2f%%" % (float(te.data)/float(len(self.machine.gcodeProgram)) * 100)
 
             if self.cmdLineOptions.vverbose:
                print "gsatMainWindow got event gc.gEV_PC_UPDATE [%s], %s sent." \
                   % (str(te.data), prcnt)
             self.SetPC(te.data)
-            self.machineStatusPanel.UpdateUI(self.stateData, dict({'prcnt':prcnt}))
+            self.StatusUpdate(dict({'prcnt':prcnt}))
 
          elif te.event_id == gc.gEV_DEVICE_DETECTED:
             self.stateData.deviceDetected = True
@@ -2023,7 +2137,7 @@ class gsatMainWindow(wx.Frame):
                print "gsatMainWindow got event gc.gEV_RUN_END, 100%% sent."
             self.stateData.swState = gc.gSTATE_IDLE
             self.RunTimerStop()
-            self.machineStatusPanel.UpdateUI(self.stateData, dict({'prcnt':"100.00%"}))
+            self.StatusUpdate(dict({'prcnt':"100.00%"}))
             self.Refresh()
             self.UpdateUI()
             self.SetPC(0)
@@ -2040,7 +2154,7 @@ class gsatMainWindow(wx.Frame):
             runStartTimeStr = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime(self.runStartTime))
             runEndTimeStr = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime(self.runEndTime))
 
-            self.machineStatusPanel.UpdateUI(self.stateData, dict({'rtime':runTimeStr}))
+            self.StatusUpdate(dict({'rtime':runTimeStr}))
 
             # display run time dialog.
             if self.displayRuntimeDialog:
@@ -2072,7 +2186,7 @@ class gsatMainWindow(wx.Frame):
             self.stateData.swState = gc.gSTATE_PAUSE
             self.UpdateUI()
 
-            self.outputText.AppendText("** MSG: %s" % te.data.strip())
+            self.ConsoleAppend("** MSG: %s" % te.data.strip())
 
             if lastSwState == gc.gSTATE_RUN:
                dlg = wx.MessageDialog(self, te.data.strip() + "\n\nContinue program?", "G-Code Message",
@@ -2094,9 +2208,134 @@ class gsatMainWindow(wx.Frame):
             self.UpdateUI()
 
       # tell program exec thread that our queue is empty, ok to post more event
-      self.mainWndOutQueue.put(gc.threadEvent(gc.gEV_CMD_OK_TO_POST, None))
+      self.machine.Put(gc.gEV_CMD_OK_TO_POST)
+
+   def OnMachineThreadEvent(self, machine):
+      # machine not shown, keep its state, status and console up to date
+      while (not machine.eventQueue.empty()):
+         te = machine.eventQueue.get()
+
+         if te.event_id == gc.gEV_ABORT:
+            self.ConsoleAppend(te.data, machine)
+            machine.Close()
+
+         elif te.event_id == gc.gEV_DATA_STATUS:
+            machine.statusRecord.Merge(te.data)
+
+         elif te.event_id == gc.gEV_DATA_TIMING:
+            machine.statusData.update(self.FormatTimingStatus(te.data))
+
+         elif te.event_id == gc.gEV_DATA_IN:
+            self.ConsoleAppend("%s" % te.data, machine)
+
+         elif te.event_id == gc.gEV_DATA_ERROR:
+            self.ConsoleAppend(self.FormatDeviceError(te.data), machine)
+
+         elif te.event_id == gc.gEV_DATA_OUT:
+            self.ConsoleAppend("> %s" % te.data, machine)
+
+         elif te.event_id == gc.gEV_PC_UPDATE:
+            machine.stateData.programCounter = te.data
+            machine.statusData['prcnt'] = "%.2f%%" % \
+               (float(te.data)/float(len(machine.gcodeProgram)) * 100)
+
+         elif te.event_id == gc.gEV_DEVICE_DETECTED:
+            machine.stateData.deviceDetected = True
+            self.RunDeviceInitScript(machine)
+
+         elif te.event_id == gc.gEV_RUN_END:
+            machine.stateData.swState = gc.gSTATE_IDLE
+            machine.stateData.programCounter = 0
+            machine.statusData['prcnt'] = "100.00%"
+            machine.runEndTime = int(time.time())
+
+         elif te.event_id == gc.gEV_STEP_END:
+            machine.stateData.swState = gc.gSTATE_IDLE
+
+         elif te.event_id == gc.gEV_HIT_BRK_PT:
+            machine.stateData.swState = gc.gSTATE_BREAK
+
+         elif te.event_id == gc.gEV_HIT_MSG:
+            machine.stateData.swState = gc.gSTATE_PAUSE
+            self.ConsoleAppend("** MSG: %s" % te.data.strip(), machine)
+
+      machine.Put(gc.gEV_CMD_OK_TO_POST)
+
+   def FormatDeviceError(self, errorData):
+      # device error acknowledge, program line is None for UI commands
+      pc, message = errorData
+
+      if pc is None:
+         return "** Device %s\n" % message
+
+      return "** Device %s at line %d\n" % (message, pc + 1)
+
+   def FormatTimingStatus(self, timingData):
+      return dict({
+         'acklat':"%.1f / %.1f / %.1f ms" % (timingData['p50']*1000.0,
+            timingData['p95']*1000.0, timingData['p99']*1000.0),
+         'lps':"%.1f" % timingData['lps']})
+
+   def ConsoleAppend(self, text, machine=None):
+      # every machine keeps its console, output panel shows active machine
+      if machine is None:
+         machine = self.machine
+
+      machine.ConsoleAppend(text)
+
+      if machine is self.machine:
+         self.outputText.AppendText(text)
+
+   def OnMachineSelect(self, e):
+      self.SelectMachine(self.machineChoice.GetStringSelection())
+
+   def SelectMachine(self, name):
+      if name == self.machine.name or self.machineMgr.Get(name) is None:
+         return
+
+      # keep state of machine going to background
+      self.machine.SaveState(self.stateData)
+      self.machine.runStartTime = self.runStartTime
+      self.machine.runEndTime = self.runEndTime
+
+      self.machine = self.machineMgr.SetActive(name)
+      self.machine.LoadState(self.stateData)
+      self.runStartTime = self.machine.runStartTime
+      self.runEndTime = self.machine.runEndTime
+
+      if self.cmdLineOptions.verbose:
+         print "gsatMainWindow active machine [%s]" % name
+
+      self.outputText.SetConsoleText(self.machine.GetConsoleText())
+      self.gcText.UpdatePC(self.stateData.programCounter)
+
+      if self.stateData.swState in [gc.gSTATE_RUN, gc.gSTATE_PAUSE, gc.gSTATE_BREAK]:
+         self.RunTimerStart()
+      else:
+         self.RunTimerStop()
+
+      self.StatusUpdate(dict(self.machine.statusData), self.machine.statusRecord.Copy())
+      self.UpdateUI()
+
+      # events that arrived while in background
+      self.OnThreadEvent(gc.threadEvent(None, self.machine.name))
+
+   def UpdateMachineChoice(self):
+      self.machineChoice.SetItems(self.machineMgr.GetNames())
+      self.machineChoice.SetStringSelection(self.machine.name)
+
+   def GetMachineTraceFile(self, machine):
+      # one trace file per machine
+      if len(self.machineTraceFile) == 0 or machine.name == mm.gMACHINE_DEFAULT_NAME:
+         return self.machineTraceFile
+
+      root, ext = os.path.splitext(self.machineTraceFile)
+      return "%s-%s%s" % (root, machine.name.replace(' ', '_'), ext)
+
+   def RunDeviceInitScript (self, machine=None):
+      if machine is None:
+         machine = self.machine
 
-   def RunDeviceInitScript (self):
       # run init script
       initScript = str(self.configData.Get('/machine/InitScript')).splitlines()
 
@@ -2104,9 +2343,9 @@ class gsatMainWindow(wx.Frame):
          if self.cmdLineOptions.verbose:
             print "gsatMainWindow queuing machine init script..."
 
-         self.outputText.AppendText("Queuing machine init script...\n")
+         self.ConsoleAppend("Queuing machine init script...\n", machine)
          for initLine in initScript:
             initLine = "".join([initLine, "\n"])
             #self.SerialWrite(initLine)
-            self.SerialWriteWaitForAck(initLine)
-            self.outputText.AppendText(initLine)
+            machine.Put(gc.gEV_CMD_SEND_W_ACK, initLine)
+            self.ConsoleAppend(initLine, machine)
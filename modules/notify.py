@@ -0,0 +1,80 @@
+"""----------------------------------------------------------------------------
+   notify.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import modules.config as gc
+
+"""----------------------------------------------------------------------------
+   gsatNotifySink:
+   How the program execute thread tells its owner there are events in the
+   out queue. Notify is called once, and not again until the owner sends
+   gc.gEV_CMD_OK_TO_POST after draining the queue. LogMessage is for
+   messages the user should see even if nothing reads the queue.
+   Sinks are called from the execute and serial threads.
+
+   This base sink is queue only, nothing is signaled, the owner reads the
+   out queue on its own (headless, benchmarks, tests).
+----------------------------------------------------------------------------"""
+class gsatNotifySink():
+   def Notify(self):
+      pass
+
+   def LogMessage(self, message):
+      pass
+
+"""----------------------------------------------------------------------------
+   gsatCallbackNotifySink:
+   Calls plain functions, either can be None.
+----------------------------------------------------------------------------"""
+class gsatCallbackNotifySink(gsatNotifySink):
+   def __init__(self, notify_callback=None, log_callback=None):
+      self.notifyCallback = notify_callback
+      self.logCallback = log_callback
+
+   def Notify(self):
+      if self.notifyCallback is not None:
+         self.notifyCallback()
+
+   def LogMessage(self, message):
+      if self.logCallback is not None:
+         self.logCallback(message)
+
+"""----------------------------------------------------------------------------
+   gsatWxNotifySink:
+   Posts a thread queue event to a wx window, see gc.EVT_THREAD_QUEUE_EVENT.
+   data is passed along in the event (machine name with several machines).
+----------------------------------------------------------------------------"""
+class gsatWxNotifySink(gsatNotifySink):
+   def __init__(self, window, data=None):
+      import wx
+
+      self.wx = wx
+      self.window = window
+      self.data = data
+
+   def Notify(self):
+      self.wx.PostEvent(self.window, gc.threadQueueEvent(self.data))
+
+   def LogMessage(self, message):
+      self.wx.LogMessage(message)
@@ -0,0 +1,378 @@
+"""----------------------------------------------------------------------------
+   procexec.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import serial
+import struct
+import marshal
+import threading
+import Queue
+import multiprocessing
+
+import modules.config as gc
+import modules.notify as notify
+import modules.program as prog
+import modules.progexec as progexec
+import modules.status as st
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# frame header, event id and payload length, followed by marshal payload.
+# Several frames can travel in one pipe message.
+gFRAME_HEADER = struct.Struct('<iI')
+
+# worker process frames, not seen outside this module
+gPROC_EV_OPEN_OK     = -1
+gPROC_EV_OPEN_ERROR  = -2
+gPROC_EV_LOG         = -3
+gPROC_EV_PROGRAM     = -4     # (revision, program), sent ahead of run/step
+
+# seconds to wait for worker process to open serial port
+gPROC_OPEN_TIMEOUT = 10
+
+# max events sent in one pipe message
+gPROC_BATCH_SIZE = 256
+
+"""----------------------------------------------------------------------------
+   EncodeFrame/DecodeFrames:
+   Events as bytes, programs and status records go as plain lists and
+   tuples so marshal can take them. Run and step carry only the program
+   revision, the program itself goes once in a gPROC_EV_PROGRAM frame.
+----------------------------------------------------------------------------"""
+def EncodeFrame(event_id, data):
+   if event_id in [gc.gEV_CMD_RUN, gc.gEV_CMD_STEP]:
+      data = (data[0].revision, data[1], data[2])
+   elif event_id == gPROC_EV_PROGRAM:
+      data = (data.revision, data.Encode())
+   elif event_id == gc.gEV_DATA_STATUS:
+      data = data.Encode()
+
+   payload = marshal.dumps(data)
+   return gFRAME_HEADER.pack(event_id, len(payload)) + payload
+
+def DecodeFrames(buffer):
+   frames = []
+   offset = 0
+
+   while offset < len(buffer):
+      event_id, length = gFRAME_HEADER.unpack_from(buffer, offset)
+      offset = offset + gFRAME_HEADER.size
+      data = marshal.loads(buffer[offset:offset + length])
+      offset = offset + length
+
+      if event_id == gPROC_EV_PROGRAM:
+         data = (data[0], prog.DecodeProgram(data[1]))
+      elif event_id == gc.gEV_DATA_STATUS:
+         data = st.DecodeRecord(data)
+
+      frames.append((event_id, data))
+
+   return frames
+
+"""----------------------------------------------------------------------------
+   gsatFrameChannel:
+   One way pipe per direction, a duplex pipe can't be read and written from
+   two threads at once on Windows.
+----------------------------------------------------------------------------"""
+class gsatFrameChannel():
+   def __init__(self, reader, writer):
+      self.reader = reader
+      self.writer = writer
+      self.sendLock = threading.Lock()
+
+   def Send(self, event_id, data=None):
+      self.SendFrames([EncodeFrame(event_id, data)])
+
+   def SendFrames(self, frames):
+      with self.sendLock:
+         self.writer.send_bytes("".join(frames))
+
+   def Poll(self, timeout):
+      return self.reader.poll(timeout)
+
+   def Receive(self):
+      return DecodeFrames(self.reader.recv_bytes())
+
+   def Close(self):
+      self.reader.close()
+      self.writer.close()
+
+"""----------------------------------------------------------------------------
+   ExecuteProcessMain:
+   Worker process, owns the serial port and runs the program execute (and
+   serial RX) threads, events go back over the channel in batches.
+----------------------------------------------------------------------------"""
+def ExecuteProcessMain(reader, writer, port, baud, cmd_line_options, device_id,
+   machine_status_poll, machine_streaming, machine_rx_buffer_size,
+   machine_queue_threshold, machine_trace_file):
+
+   channel = gsatFrameChannel(reader, writer)
+
+   serPort = serial.Serial()
+   serPort.baudrate = baud
+   serPort.port = port
+   serPort.timeout = 1
+
+   try:
+      serPort.open()
+   except (serial.SerialException, OSError, ValueError), e:
+      channel.Send(gPROC_EV_OPEN_ERROR, str(e))
+      channel.Close()
+      return
+
+   channel.Send(gPROC_EV_OPEN_OK)
+
+   inQueue = Queue.Queue()
+   outQueue = Queue.Queue()
+
+   def LogMessage(message):
+      try:
+         channel.Send(gPROC_EV_LOG, message)
+      except (IOError, EOFError):
+         pass
+
+   progExecThread = progexec.gsatProgramExecuteThread(
+      notify.gsatCallbackNotifySink(log_callback=LogMessage), serPort, inQueue, outQueue,
+      cmd_line_options, device_id, machine_status_poll, machine_streaming,
+      machine_rx_buffer_size, machine_queue_threshold, machine_trace_file)
+
+   # last program received, (revision, program)
+   workerProgram = [None, None]
+
+   def ReadCommands():
+      while True:
+         try:
+            frames = channel.Receive()
+         except (IOError, EOFError):
+            # owner is gone
+            frames = [(gc.gEV_CMD_EXIT, None)]
+
+         for event_id, data in frames:
+            # real-time lane, don't wait behind the execute thread queue
+            if event_id == gc.gEV_CMD_REALTIME:
+               progExecThread.RealtimeWrite(data)
+               continue
+
+            if event_id == gPROC_EV_PROGRAM:
+               workerProgram[:] = data
+               continue
+
+            if event_id in [gc.gEV_CMD_RUN, gc.gEV_CMD_STEP]:
+               # owner sends the program ahead when the revision changes
+               if data[0] != workerProgram[0]:
+                  LogMessage("** Program revision %s not received, run ignored" % str(data[0]))
+                  continue
+
+               data = [workerProgram[1], data[1], data[2]]
+
+            inQueue.put(gc.threadEvent(event_id, data))
+
+            if event_id == gc.gEV_CMD_EXIT:
+               return
+
+   readThread = threading.Thread(target=ReadCommands)
+   readThread.daemon = True
+   readThread.start()
+
+   while progExecThread.is_alive() or not outQueue.empty():
+      try:
+         te = outQueue.get(timeout=0.5)
+      except Queue.Empty:
+         continue
+
+      frames = [EncodeFrame(te.event_id, te.data)]
+
+      # whatever else is ready goes in the same message
+      while len(frames) < gPROC_BATCH_SIZE:
+         try:
+            te = outQueue.get_nowait()
+         except Queue.Empty:
+            break
+
+         frames.append(EncodeFrame(te.event_id, te.data))
+
+      try:
+         channel.SendFrames(frames)
+      except (IOError, EOFError):
+         inQueue.put(gc.threadEvent(gc.gEV_CMD_EXIT, None))
+         break
+
+   progExecThread.join(5)
+   serPort.close()
+   channel.Close()
+
+"""----------------------------------------------------------------------------
+   gsatProgramExecuteProcess:
+   Same queues and notify sink contract as gsatProgramExecuteThread, but
+   the execute thread runs in a worker process so serial timing doesn't
+   depend on the UI holding the GIL. Serial open errors are raised here as
+   serial.SerialException.
+----------------------------------------------------------------------------"""
+class gsatProgramExecuteProcess():
+   def __init__(self, notify_sink, port, baud, in_queue, out_queue, cmd_line_options,
+      device_id, machine_status_poll=0, machine_streaming=False,
+      machine_rx_buffer_size=127, machine_queue_threshold=4, machine_trace_file=""):
+
+      self.notifySink = notify_sink
+      if self.notifySink is None:
+         self.notifySink = notify.gsatNotifySink()
+
+      self.progExecInQueue = in_queue
+      self.progExecOutQueue = out_queue
+      self.cmdLineOptions = cmd_line_options
+      self.okToPostEvents = True
+      self.postLock = threading.Lock()
+      self.exiting = False
+
+      # revision of the program the worker has, see gPROC_EV_PROGRAM
+      self.sentProgramRevision = None
+
+      cmdReader, cmdWriter = multiprocessing.Pipe(False)
+      eventReader, eventWriter = multiprocessing.Pipe(False)
+
+      self.process = multiprocessing.Process(target=ExecuteProcessMain,
+         args=(cmdReader, eventWriter, port, baud, cmd_line_options, device_id,
+            machine_status_poll, machine_streaming, machine_rx_buffer_size,
+            machine_queue_threshold, machine_trace_file))
+      self.process.daemon = True
+      self.process.start()
+
+      # child ends belong to the worker now
+      cmdReader.close()
+      eventWriter.close()
+
+      self.channel = gsatFrameChannel(eventReader, cmdWriter)
+
+      # wait for serial port open result
+      openError = "worker process did not start"
+      try:
+         if self.channel.Poll(gPROC_OPEN_TIMEOUT):
+            event_id, data = self.channel.Receive()[0]
+
+            if event_id == gPROC_EV_OPEN_OK:
+               openError = None
+            else:
+               openError = data
+      except (IOError, EOFError):
+         pass
+
+      if openError is not None:
+         self.channel.Close()
+         self.process.join(1)
+         if self.process.is_alive():
+            self.process.terminate()
+         raise serial.SerialException(openError)
+
+      self.commandThread = threading.Thread(target=self.CommandLoop)
+      self.commandThread.daemon = True
+      self.commandThread.start()
+
+      self.eventThread = threading.Thread(target=self.EventLoop)
+      self.eventThread.daemon = True
+      self.eventThread.start()
+
+      if self.cmdLineOptions.vverbose:
+         print "** gsatProgramExecuteProcess started worker pid %d." % self.process.pid
+
+   def CommandLoop(self):
+      while True:
+         e = self.progExecInQueue.get()
+
+         # posting is throttled here, worker sends events as they come
+         if e.event_id == gc.gEV_CMD_OK_TO_POST:
+            with self.postLock:
+               self.okToPostEvents = True
+            self.PostEvents()
+            continue
+
+         if e.event_id == gc.gEV_CMD_EXIT:
+            self.exiting = True
+
+         frames = []
+
+         # program goes once per revision, a step or resume after a break
+         # sends only revision, PC and breakpoints
+         if e.event_id in [gc.gEV_CMD_RUN, gc.gEV_CMD_STEP] and \
+            e.data[0].revision != self.sentProgramRevision:
+            frames.append(EncodeFrame(gPROC_EV_PROGRAM, e.data[0]))
+            self.sentProgramRevision = e.data[0].revision
+
+         frames.append(EncodeFrame(e.event_id, e.data))
+
+         try:
+            self.channel.SendFrames(frames)
+         except (IOError, EOFError):
+            return
+
+         if e.event_id == gc.gEV_CMD_EXIT:
+            return
+
+   def RealtimeWrite(self, serialData):
+      try:
+         self.channel.Send(gc.gEV_CMD_REALTIME, serialData)
+      except (IOError, EOFError):
+         # worker is gone, event loop posts gEV_ABORT for it
+         pass
+
+   def EventLoop(self):
+      while True:
+         try:
+            frames = self.channel.Receive()
+         except (IOError, EOFError):
+            break
+
+         for event_id, data in frames:
+            if event_id == gPROC_EV_LOG:
+               self.notifySink.LogMessage(data)
+            else:
+               self.progExecOutQueue.put(gc.threadEvent(event_id, data))
+
+         self.PostEvents()
+
+      if not self.exiting:
+         exMsg = "** Program execute worker process exited (%s)\n" % str(self.process.exitcode)
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, exMsg))
+         self.notifySink.Notify()
+
+      self.process.join(5)
+      self.channel.Close()
+
+      if self.cmdLineOptions.vverbose:
+         print "** gsatProgramExecuteProcess exit."
+
+   def PostEvents(self):
+      with self.postLock:
+         if not self.okToPostEvents or self.progExecOutQueue.empty():
+            return
+         self.okToPostEvents = False
+
+      self.notifySink.Notify()
+
+   def is_alive(self):
+      return self.eventThread.is_alive()
+
+   def join(self, timeout=None):
+      self.eventThread.join(timeout)
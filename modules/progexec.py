@@ -24,77 +24,41 @@
 ----------------------------------------------------------------------------"""
 
 import os
-import re
 import serial
 import threading
 import Queue
 import time
+import collections
 import pdb
 
-import wx
-
 import modules.config as gc
+import modules.device as dev
+import modules.notify as notify
+import modules.program as prog
+import modules.timing as gt
 
 # -----------------------------------------------------------------------------
-# regular expressions
+# status poller
 # -----------------------------------------------------------------------------
-gReAxis = re.compile(r'([XYZ])(\s*[-+]*\d+\.{0,1}\d*)', re.IGNORECASE)
-
-# -------------
-# Grbl
-
-# grbl version, example "Grbl 0.8c ['$' for help]"
-gReGrblVersion = re.compile(r'Grbl\s*(.*)\s*\[.*\]')
-
-# status,
-# quick re check to avoid multiple checks, speeds things up
-gReMachineStatus = re.compile(r'pos', re.I)
-
-# GRBL example "<Run,MPos:20.163,0.000,0.000,WPos:20.163,0.000,0.000>"
-gReGRBLMachineStatus = re.compile(r'<(.*),MPos:(.*),(.*),(.*),WPos:(.*),(.*),(.*)>')
-
-# -------------
-#TinyG/TinyG2
-
-# TinyG detect, example "tinyg [mm] ok>"
-gReTinyGDetect = re.compile(r'tinyg\s+(.*)\s+ok>')
-
-# tinyG example posx:12.000,posy:12.200,posz:10.000,vel:0.000,stat:3
-gReTinyGVerbose = re.compile(r'(\w*):(-?\d+\.?\d*)')
-
-# tinyG query response example:
-#X position:          30.408 mm
-#Y position:          20.701 mm
-#Z position:          10.000 mm
-#Machine state:       Stop
-gReTinyGPosStatus = re.compile(r'(\w*)\s+position:\s+(-?\d+\.?\d*)\s+.*')
-gReTinyGStateStatus = re.compile(r'(\w*)\s+state:\s+(\w*).*')
-
-# tinyG query response example:
-#X machine posn:      30.408 mm
-#Y machine posn:      20.701 mm
-#Z machine posn:      10.000 mm
-#Machine state:       Stop
-gReTinyG2PosStatus = re.compile(r'(\w*)\s+machine posn:\s+(-?\d+\.?\d*)\s+.*')
+# seconds after which an unanswered status request is taken as lost
+gSTATUS_POLL_LOST = 1.0
 
-# -------------
+# seconds between checks while polling is off
+gSTATUS_POLL_OFF_SLEEP = 0.25
 
-# comments example "( comment string )" or "; comment string"
-gReGcodeComments = [re.compile(r'\(.*\)'), re.compile(r';.*')]
-
-# message example "(MSG, CHANGE TOOL BIT: to drill size 0.81300 mm)"
-gReGcodeMsg = re.compile(r'^\s*\(MSG,(.+)\)')
-
-# acknowledge
-gReAcknowlege = [
-   re.compile(r'^ok\s$'),     # grbl example  "ok"
-   re.compile(r'\sok>\s$')    # tinyG example "tinyg [xxx] ok>"
-]
+# -----------------------------------------------------------------------------
+# real-time commands
+# -----------------------------------------------------------------------------
+# console text of real-time commands, status requests are not shown
+gREALTIME_ECHO = {
+   gc.gDEVICE_CMD_FEED_HOLD:"!\n", gc.gDEVICE_CMD_CYCLE_START:"~\n", gc.gDEVICE_CMD_RESET:"^X\n",
+}
 
-gReErrorAck = [
-   re.compile(r'^error:.*\s$'),     # grbl
-   re.compile(r'^.*\serr:.*\s$')    # tinyG
-]
+# -----------------------------------------------------------------------------
+# program file
+# -----------------------------------------------------------------------------
+# lines between checks that a file program is still the file opened
+gFILE_CHECK_LINES = 256
 
 """----------------------------------------------------------------------------
    gsatProgramExecuteThread:
@@ -106,23 +70,27 @@ gReErrorAck = [
 ----------------------------------------------------------------------------"""
 class gsatProgramExecuteThread(threading.Thread):
    """Worker Thread Class."""
-   def __init__(self, notify_window, serial, in_queue, out_queue, cmd_line_options, device_id, machine_auto_status=False):
+   def __init__(self, notify_sink, serial, in_queue, out_queue, cmd_line_options, device_id,
+      machine_status_poll=0, machine_streaming=False, machine_rx_buffer_size=127,
+      machine_queue_threshold=4, machine_trace_file=""):
       """Init Worker Thread Class."""
       threading.Thread.__init__(self)
 
-      # init local variables
-      self.notifyWindow = notify_window
+      # init local variables, no sink means owner reads out queue on its own
+      self.notifySink = notify_sink
+      if self.notifySink is None:
+         self.notifySink = notify.gsatNotifySink()
+
       self.serPort = serial
       self.progExecInQueue = in_queue
       self.progExecOutQueue = out_queue
-      self.progExecSerialRxInQueue = Queue.Queue()
       self.progExecSerialRxOutQueue = Queue.Queue()
       self.cmdLineOptions = cmd_line_options
       self.deviceID = device_id
       self.deviceDetected = False
       self.okToPostEvents = True
 
-      self.gcodeDataLines = []
+      self.gcodeProgram = prog.gsatProgram()
       self.breakPointSet = set()
       self.initialProgramCounter = 0
       self.workingCounterWorking = 0
@@ -130,12 +98,51 @@ class gsatProgramExecuteThread(threading.Thread):
       self.swState = gc.gSTATE_IDLE
       self.lastEventID = gc.gEV_CMD_NULL
 
-      self.machineAutoStatus = machine_auto_status
+      # status poller, period in seconds (0 is off)
+      self.statusPollPeriod = machine_status_poll / 1000.0
+      self.statusPollPending = False
+      self.statusPollSentTime = 0
+      self.statusPollThread = None
+
+      # device protocol, hot path calls are bound once here
+      self.device = dev.GetDevice(device_id)
+      self.deviceDetect = self.device.Detect
+      self.deviceIsAcknowledge = self.device.IsAcknowledge
+      self.deviceGetError = self.device.GetError
+      self.deviceParseStatus = self.device.ParseStatus
+      self.deviceParseQueueReport = self.device.ParseQueueReport
 
       self.serialRxThread = None
 
       self.serialWriteQueue = []
 
+      # real-time commands are written from other threads too
+      self.serialWriteLock = threading.Lock()
+
+      # streaming, lines sent to device not yet acknowledged
+      self.machineStreaming = machine_streaming and self.device.flowControl != dev.gFLOW_ACK
+      self.machineRxBufferSize = machine_rx_buffer_size
+      self.streamPendingLines = collections.deque()
+      self.streamPendingBytes = 0
+
+      # streaming, TinyG planner queue free slots (from queue reports)
+      self.machineQueueThreshold = machine_queue_threshold
+      self.streamPlannerFree = None
+
+      if self.device.flowControl == dev.gFLOW_QUEUE_REPORT:
+         self.StreamFlowControl = self.StreamFlowQueueReport
+      else:
+         self.StreamFlowControl = self.StreamFlowCharCount
+
+      # per line timing, acknowledge latency histogram and trace
+      self.machineTraceFile = machine_trace_file
+      self.lineTiming = None
+      self.rxAcknowledge = False
+
+      # program line (None for UI commands) of last line sent waiting for
+      # acknowledge, errors are reported against it
+      self.ackPendingPC = None
+
       # start thread
       self.start()
 
@@ -143,18 +150,23 @@ class gsatProgramExecuteThread(threading.Thread):
    gsatProgramExecuteThread: Main Window Event Handlers
    Handle events coming from main UI
    -------------------------------------------------------------------------"""
-   def ProcessQueue(self):
+   def ProcessQueue(self, block=False):
+      rxData = ""
+
       # check output queue and notify UI if is not empty
       if not self.progExecOutQueue.empty():
          if self.okToPostEvents:
             self.okToPostEvents = False
-            wx.PostEvent(self.notifyWindow, gc.threadQueueEvent(None))
+            self.notifySink.Notify()
 
       # process events from queue ---------------------------------------------
-      if not self.progExecInQueue.empty():
-         # get item from queue
+      if block or not self.progExecInQueue.empty():
+         # get item from queue, serial RX thread also posts here
          e = self.progExecInQueue.get()
 
+         if e.event_id == gc.gEV_SER_RXDATA or e.event_id == gc.gEV_ABORT:
+            return self.SerialRead(e)
+
          self.lastEventID = e.event_id
 
          if e.event_id == gc.gEV_CMD_EXIT:
@@ -169,26 +181,30 @@ class gsatProgramExecuteThread(threading.Thread):
          elif e.event_id == gc.gEV_CMD_RUN:
             if self.cmdLineOptions.vverbose:
                print "** gsatProgramExecuteThread got event gc.gEV_CMD_RUN, swState->gc.gSTATE_RUN"
-            self.gcodeDataLines = e.data[0]
+            self.gcodeProgram = e.data[0]
             self.initialProgramCounter = e.data[1]
             self.workingProgramCounter = self.initialProgramCounter
             self.breakPointSet =  e.data[2]
             self.swState = gc.gSTATE_RUN
+            self.CheckProgramFile()
+            self.lineTiming.RunStart()
 
          elif e.event_id == gc.gEV_CMD_STEP:
             if self.cmdLineOptions.vverbose:
                print "** gsatProgramExecuteThread got event gc.gEV_CMD_STEP, swState->gc.gSTATE_STEP"
-            self.gcodeDataLines = e.data[0]
+            self.gcodeProgram = e.data[0]
             self.initialProgramCounter = e.data[1]
             self.workingProgramCounter = self.initialProgramCounter
             self.breakPointSet =  e.data[2]
             self.swState = gc.gSTATE_STEP
+            self.CheckProgramFile()
 
          elif e.event_id == gc.gEV_CMD_STOP:
             if self.cmdLineOptions.vverbose:
                print "** gsatProgramExecuteThread got event gc.gEV_CMD_STOP, swState->gc.gSTATE_IDLE"
 
             self.swState = gc.gSTATE_IDLE
+            self.lineTiming.Reset()
 
          elif e.event_id == gc.gEV_CMD_SEND:
             if self.cmdLineOptions.vverbose:
@@ -203,7 +219,23 @@ class gsatProgramExecuteThread(threading.Thread):
          elif e.event_id == gc.gEV_CMD_AUTO_STATUS:
             if self.cmdLineOptions.vverbose:
                print "** gsatProgramExecuteThread got event gc.gEV_CMD_AUTO_STATUS."
-            self.machineAutoStatus = e.data
+            self.statusPollPeriod = e.data / 1000.0
+
+         elif e.event_id == gc.gEV_CMD_REALTIME:
+            if self.cmdLineOptions.vverbose:
+               print "** gsatProgramExecuteThread got event gc.gEV_CMD_REALTIME."
+
+            # already written by RealtimeWrite, device drops what it has
+            # not executed on reset, no acknowledge will come for it
+            if e.data == gc.gDEVICE_CMD_RESET:
+               self.swState = gc.gSTATE_IDLE
+               self.lastEventID = gc.gEV_CMD_STOP
+               self.serialWriteQueue = []
+               self.streamPendingLines.clear()
+               self.streamPendingBytes = 0
+               self.streamPlannerFree = None
+               self.statusPollPending = False
+               self.lineTiming.Reset()
 
          elif e.event_id == gc.gEV_CMD_OK_TO_POST:
             if self.cmdLineOptions.vverbose:
@@ -214,19 +246,30 @@ class gsatProgramExecuteThread(threading.Thread):
             if self.cmdLineOptions.vverbose:
                print "** gsatProgramExecuteThread got unknown event!! [%s]." % str(e.event_id)
 
+      return rxData
+
    """-------------------------------------------------------------------------
    gsatProgramExecuteThread: General Functions
    -------------------------------------------------------------------------"""
-   def SerialWrite(self, serialData):
+   def SerialWrite(self, serialData, pc=None, queued=None):
       exFlag = False
       exMsg = ""
 
+      # every line counts against device RX buffer, including UI commands
+      if self.StreamEnabled():
+         self.StreamLineSent(pc, serialData)
+      else:
+         self.ackPendingPC = pc
+
+      self.lineTiming.LineWritten(pc, serialData.count('\n'), queued)
+
       # sent data to UI
       self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_OUT, serialData))
 
       try:
          # send command
-         self.serPort.write(serialData.encode('ascii'))
+         with self.serialWriteLock:
+            self.serPort.write(serialData.encode('ascii'))
 
          if self.cmdLineOptions.vverbose:
             print "[%03d] -> ASCII:{%s} HEX:{%s}" % (len(serialData),
@@ -255,162 +298,157 @@ class gsatProgramExecuteThread(threading.Thread):
 
          # add data to queue and signal main window
          self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, exMsg))
-         wx.PostEvent(self.notifyWindow, gc.threadQueueEvent(None))
+         self.notifySink.Notify()
 
 
-   def DecodeStatusData (self, serialData):
+   def RealtimeWrite(self, serialData):
+      """ Real-time command lane, writes to serial port right away from the
+          calling thread, even while this thread waits for an acknowledge.
+          The thread is told after, to drop its state on reset.
+      """
+      if self.SerialWriteRealtime(serialData) and serialData in gREALTIME_ECHO:
+         # console shows the command only once it is written
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_OUT, gREALTIME_ECHO[serialData]))
 
-      # -----------------------------------------------------------------
-      # Grbl
-      if self.deviceID == gc.gDEV_GRBL:
-
-         # GRBL status data
-         rematch = gReGRBLMachineStatus.match(serialData)
-         # data is expected to be an array of strings as follows
-         # statusData[0] : Machine state
-         # statusData[1] : Machine X
-         # statusData[2] : Machine Y
-         # statusData[3] : Machine Z
-         # statusData[4] : Work X
-         # statusData[5] : Work Y
-         # statusData[6] : Work Z
-
-         if rematch is not None:
-            statusData = rematch.groups()
-            machineStatus = dict()
-            machineStatus['stat'] = statusData[0]
-            machineStatus['posx'] = statusData[1]
-            machineStatus['posy'] = statusData[2]
-            machineStatus['posz'] = statusData[3]
-            machineStatus['wposx'] = statusData[4]
-            machineStatus['wposy'] = statusData[5]
-            machineStatus['wposz'] = statusData[6]
+      self.progExecInQueue.put(gc.threadEvent(gc.gEV_CMD_REALTIME, serialData))
 
-            if self.cmdLineOptions.vverbose:
-               print "** gsatProgramExecuteThread re GRBL status match %s" % str(statusData)
-               print "** gsatProgramExecuteThread str match from %s" % str(serialData.strip())
+   def SerialWriteRealtime(self, serialData):
+      """ Returns True if written, write errors abort like SerialWrite,
+          feed hold and reset must not fail silently.
+      """
+      exMsg = ""
 
-            self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_STATUS, machineStatus))
+      try:
+         with self.serialWriteLock:
+            self.serPort.write(serialData.encode('ascii'))
 
+         if self.cmdLineOptions.vverbose:
+            print "[%03d] -> RT:{%s}" % (len(serialData), serialData.encode('string_escape'))
 
-         elif self.deviceDetected == False:
-            rematch = gReGrblVersion.match(serialData)
-            if rematch is not None:
-               self.deviceDetected = True
-               self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DEVICE_DETECTED, None))
+         return True
 
-      # -----------------------------------------------------------------
-      # TinyG and TinyG2
-      if self.deviceID == gc.gDEV_TINYG or self.deviceID == gc.gDEV_TINYG2:
+      except serial.SerialException, e:
+         exMsg = "** PySerial exception: %s\n" % e.message
 
-         if self.deviceDetected == False:
-            rematch = gReTinyGDetect.findall(serialData)
-            if len(rematch) > 0:
-               self.deviceDetected = True
-               self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DEVICE_DETECTED, None))
+      except OSError, e:
+         exMsg = "** OSError exception: %s\n" % str(e)
 
-         # tinyG verbose/status
-         rematch = gReTinyGVerbose.findall(serialData)
-         if len(rematch) > 0:
+      except IOError, e:
+         exMsg = "** IOError exception: %s\n" % str(e)
 
-            if self.cmdLineOptions.vverbose:
-               print "** gsatProgramExecuteThread re tinyG verbose match %s" % str(rematch)
-               print "** gsatProgramExecuteThread str match from %s" % str(serialData)
-
-            machineStatus = dict(rematch)
-
-            status = machineStatus.get('stat')
-            if status is not None:
-               if '0' in status:
-                  machineStatus['stat'] = 'Init'
-               elif '1' in status:
-                  machineStatus['stat'] = 'Ready'
-               elif '2' in status:
-                  machineStatus['stat'] = 'Alarm'
-               elif '3' in status:
-                  machineStatus['stat'] = 'Stop'
-               elif '4' in status:
-                  machineStatus['stat'] = 'End'
-               elif '5' in status:
-                  machineStatus['stat'] = 'Run'
-               elif '6' in status:
-                  machineStatus['stat'] = 'Hold'
-               elif '7' in status:
-                  machineStatus['stat'] = 'Probe'
-               elif '8' in status:
-                  machineStatus['stat'] = 'Run'
-               elif '9' in status:
-                  machineStatus['stat'] = 'Home'
-
-            self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_STATUS, machineStatus))
+      # make sure we stop processing any states...
+      self.swState = gc.gSTATE_ABORT
 
-         else:
-            rematch = []
+      if self.cmdLineOptions.verbose:
+         print exMsg.strip()
 
-            if self.deviceID == gc.gDEV_TINYG2:
-               rematch = gReTinyG2PosStatus.findall(serialData)
-               
-               # newer version (g2core) moved to TinyG style
-               if len(rematch) == 0:
-                  rematch = gReTinyGPosStatus.findall(serialData)
-                  
-            elif self.deviceID == gc.gDEV_TINYG:
-               rematch = gReTinyGPosStatus.findall(serialData)
+      # add data to queue and signal main window
+      self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, exMsg))
+      self.notifySink.Notify()
+      return False
 
-            if len(rematch) > 0:
-               if self.cmdLineOptions.vverbose:
-                  print "** gsatProgramExecuteThread re tinyG status match %s" % str(rematch)
-                  print "** gsatProgramExecuteThread str match from %s" % str(serialData)
+   def StatusPoll(self):
+      """ Called by status poll thread every period, real-time status
+          request, skipped while the previous report has not arrived.
+          Devices with no poll command (TinyG/TinyG2) send status reports
+          on their own while moving.
+      """
+      statusPollCmd = self.device.statusPollCmd
 
-               machineStatus = dict()
+      if self.statusPollPeriod <= 0 or not self.deviceDetected or statusPollCmd is None:
+         return
 
-               if self.deviceID == gc.gDEV_TINYG2:
-                  machineStatus["mpo%s" % rematch[0][0].lower()] = rematch[0][1]
-               elif self.deviceID == gc.gDEV_TINYG:
-                  machineStatus["pos%s" % rematch[0][0].lower()] = rematch[0][1]
+      now = gt.MonotonicTime()
 
-               self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_STATUS, machineStatus))
+      if self.statusPollPending and (now - self.statusPollSentTime) < gSTATUS_POLL_LOST:
+         return
 
-            else:
-               rematch = gReTinyGStateStatus.findall(serialData)
+      self.statusPollPending = True
+      self.statusPollSentTime = now
+      self.SerialWriteRealtime(statusPollCmd)
 
-               if len(rematch) > 0:
-                  if self.cmdLineOptions.vverbose:
-                     print "** gsatProgramExecuteThread re tinyG status match %s" % str(serialData)
+   def DecodeStatusData (self, serialData):
+      """ Returns True if serialData is a status or queue report.
+      """
+      report = False
 
-                  machineStatus = dict()
-                  machineStatus["stat"] = rematch[0][1]
+      if not self.deviceDetected and self.deviceDetect(serialData):
+         self.deviceDetected = True
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DEVICE_DETECTED, None))
 
-                  self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_STATUS, machineStatus))
+      # queue reports are for flow control only, not for UI
+      plannerFree = self.deviceParseQueueReport(serialData)
+      if plannerFree is not None:
+         self.streamPlannerFree = plannerFree
+         report = True
 
-   def SerialRead(self):
+      # -----------------------------------------------------------------
+      # status report, same record for all devices
+      statusRecord = self.deviceParseStatus(serialData)
+
+      if statusRecord is not None:
+         if self.cmdLineOptions.vverbose:
+            print "** gsatProgramExecuteThread status %s" % str(statusRecord)
+            print "** gsatProgramExecuteThread str match from %s" % str(serialData.strip())
+
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_STATUS, statusRecord))
+         self.statusPollPending = False
+         report = True
+
+      return report
+
+   def SerialRead(self, e):
       serialData = ""
 
-      if not self.progExecSerialRxInQueue.empty():
-         # get item from queue
-         e = self.progExecSerialRxInQueue.get()
+      if e.event_id == gc.gEV_ABORT:
+         # make sure we stop processing any states...
+         self.swState = gc.gSTATE_ABORT
 
-         if e.event_id == gc.gEV_ABORT:
-            # make sure we stop processing any states...
-            self.swState = gc.gSTATE_ABORT
+         # add data to queue and signal main window to consume
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, e.data))
+         self.notifySink.Notify()
+
+      elif e.event_id == gc.gEV_SER_RXDATA:
+
+         if len(e.data) > 0:
 
             # add data to queue and signal main window to consume
-            self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, e.data))
-            wx.PostEvent(self.notifyWindow, gc.threadQueueEvent(None))
+            self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_IN, e.data))
+
+            serialData = e.data
 
-         elif e.event_id == gc.gEV_SER_RXDATA:
+            report = self.DecodeStatusData(serialData)
 
-            if len(e.data) > 0:
+            # acknowledge is detected once here, for wait, streaming and timing
+            self.rxAcknowledge = self.IsAcknowledge(serialData)
+            self.lineTiming.Response(self.rxAcknowledge, report)
 
-               # add data to queue and signal main window to consume
-               self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_IN, e.data))
+            # reconcile acknowledge with oldest line in flight
+            if self.rxAcknowledge:
+               pc = self.ackPendingPC
+               self.ackPendingPC = None
+               if len(self.streamPendingLines) > 0:
+                  pc = self.StreamAcknowledge()
 
-               serialData = e.data
+               error = self.deviceGetError(serialData)
+               if error is not None:
+                  self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_ERROR, (pc, error)))
 
-               self.DecodeStatusData(serialData)
+               if self.lineTiming.StatsDue():
+                  self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_TIMING,
+                     self.lineTiming.GetStats()))
 
       return serialData
 
+   def IsAcknowledge(self, rxData):
+      if self.deviceIsAcknowledge(rxData):
+         if self.cmdLineOptions.vverbose:
+            print "** gsatProgramExecuteThread found acknowledgement"\
+               " [%s]" % rxData.strip()
+         return True
+
+      return False
+
    def WaitForAcknowledge(self):
       waitForAcknowlege = True
 
@@ -426,32 +464,17 @@ class gsatProgramExecuteThread(threading.Thread):
          if self.endThread:
             waitForAcknowlege = False
 
-         for reAcknowlege in gReAcknowlege:
-            ack = reAcknowlege.search(rxData)
-
-            if ack is not None:
-               if self.cmdLineOptions.vverbose:
-                  print "** gsatProgramExecuteThread found acknowledgement"\
-                     " [%s]" % rxData.strip()
-               waitForAcknowlege = False
-               break
-
-         for reErrorAck in gReErrorAck:
-            errAck = reErrorAck.search(rxData)
-
-            if errAck is not None:
-               if self.cmdLineOptions.vverbose:
-                  print "** gsatProgramExecuteThread found error acknowledgement"\
-                     " [%s]" % rxData.strip()
-               waitForAcknowlege = False
-               break
+         if self.rxAcknowledge:
+            waitForAcknowlege = False
 
    def WaitForResponse(self):
       waitForResponse = True
       rxData = ""
 
       while (waitForResponse):
-         rxData = self.SerialRead()
+         # block until serial RX data or a UI command arrives
+         self.rxAcknowledge = False
+         rxData = self.ProcessQueue(block=True)
 
          if self.swState == gc.gSTATE_ABORT:
             waitForResponse = False
@@ -459,33 +482,25 @@ class gsatProgramExecuteThread(threading.Thread):
          if len(rxData.strip()) > 0:
             waitForResponse = False
 
-         self.ProcessQueue()
-
          if self.endThread:
             waitForResponse = False
 
          if self.lastEventID == gc.gEV_CMD_STOP:
             waitForResponse = False
 
-         time.sleep(0.01)
-
       return rxData
 
 
-   def RunStepSendGcode(self, gcodeData):
-      gcode = gcodeData.strip()
+   def FormatGcode(self, gcode):
+      # status requests are not mixed in the program, see StatusPoll
+      return "%s\n" % (gcode)
 
+   def RunStepSendGcode(self, gcode):
       if len(gcode) > 0:
-         if self.machineAutoStatus:
-            if self.deviceID == gc.gDEV_TINYG2 or self.deviceID == gc.gDEV_TINYG:
-               gcode = "%s%s" % (gcode, gc.gTINYG_CMD_GET_STATUS)
-            elif self.deviceID == gc.gDEV_GRBL:
-               gcode = "%s%s" % (gcode, gc.gGRBL_CMD_GET_STATUS)
-         else:
-            gcode = "%s\n" % (gcode)
+         gcode = self.FormatGcode(gcode)
 
          # write data
-         self.SerialWrite(gcode)
+         self.SerialWrite(gcode, self.workingProgramCounter)
 
 
          # wait for response
@@ -499,23 +514,131 @@ class gsatProgramExecuteThread(threading.Thread):
          self.progExecOutQueue.put(gc.threadEvent(gc.gEV_PC_UPDATE, self.workingProgramCounter))
 
 
+   """-------------------------------------------------------------------------
+   gsatProgramExecuteThread: Streaming Functions
+   Character counting, keeps track of the bytes sent to the device that have
+   not been acknowledged. New lines are sent as soon as they fit in the
+   device serial RX buffer, instead of waiting for each acknowledge.
+   For devices with queue reports (TinyG/TinyG2) lines are also sent only
+   while the planner queue has more free slots than the configured
+   threshold. StreamFlowControl is bound to one of the StreamFlow* methods
+   by the device flow control.
+   -------------------------------------------------------------------------"""
+   def StreamEnabled(self):
+      return self.machineStreaming
+
+   def StreamCanSend(self, serialData):
+      if len(self.streamPendingLines) == 0:
+         return True
+
+      if (self.streamPendingBytes + len(serialData)) > self.machineRxBufferSize:
+         return False
+
+      return self.StreamFlowControl()
+
+   def StreamFlowCharCount(self):
+      return True
+
+   def StreamFlowQueueReport(self):
+      # no queue report yet, one line at a time
+      if self.streamPlannerFree is None:
+         return False
+
+      return self.streamPlannerFree > self.machineQueueThreshold
+
+   def StreamLineSent(self, pc, serialData):
+      # one entry per line, device acknowledges every line it receives
+      dataLen = len(serialData)
+
+      for i in range(serialData.count('\n')):
+         self.streamPendingLines.append((pc, dataLen))
+         self.streamPendingBytes += dataLen
+         dataLen = 0
+
+         # until next queue report, assume each line takes a planner slot
+         if self.streamPlannerFree is not None:
+            self.streamPlannerFree -= 1
+
+   def StreamAcknowledge(self):
+      # returns program line acknowledged, None for UI commands
+      pc, dataLen = self.streamPendingLines.popleft()
+      self.streamPendingBytes -= dataLen
+
+      if self.swState == gc.gSTATE_RUN and pc is not None:
+         # PC follows the oldest line the device has not acknowledged
+         nextPC = self.workingProgramCounter
+         for pendingLine in self.streamPendingLines:
+            if pendingLine[0] is not None:
+               nextPC = pendingLine[0]
+               break
+
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_PC_UPDATE, nextPC))
+
+      return pc
+
+   def StreamSendGcode(self, gcode):
+      if len(gcode) > 0:
+         gcode = self.FormatGcode(gcode)
+         queuedTime = gt.MonotonicTime()
+
+         # wait for room in device RX buffer
+         while not self.StreamCanSend(gcode):
+            self.WaitForResponse()
+
+            if self.swState != gc.gSTATE_RUN or self.endThread:
+               # if we stop early make sure to update PC to main UI
+               if self.swState == gc.gSTATE_IDLE:
+                  self.progExecOutQueue.put(gc.threadEvent(gc.gEV_PC_UPDATE, self.workingProgramCounter))
+               return
+
+         # write data
+         self.SerialWrite(gcode, self.workingProgramCounter, queuedTime)
+
+      self.workingProgramCounter += 1
+
+   def CheckProgramFile(self):
+      """ Returns True if file program changed, file programs read the file
+          as they run, changed file stops like a breakpoint.
+      """
+      if not self.gcodeProgram.IsFileChanged():
+         return False
+
+      self.swState = gc.gSTATE_BREAK
+      self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_IN,
+         "** G-code file changed on disk since it was opened, stopped\n"))
+      self.progExecOutQueue.put(gc.threadEvent(gc.gEV_HIT_BRK_PT, None))
+      return True
+
    def ProcessRunSate(self):
       # send data to serial port ----------------------------------------------
 
       # check if we are done with gcode
-      if self.workingProgramCounter >= len(self.gcodeDataLines):
+      if self.workingProgramCounter >= len(self.gcodeProgram):
+         # let the device acknowledge lines in flight
+         if len(self.streamPendingLines) > 0:
+            self.WaitForResponse()
+            return
+
          self.swState = gc.gSTATE_IDLE
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_DATA_TIMING,
+            self.lineTiming.GetStats(run_end=True)))
          self.progExecOutQueue.put(gc.threadEvent(gc.gEV_RUN_END, None))
          if self.cmdLineOptions.vverbose:
             print "** gsatProgramExecuteThread reach last PC, swState->gc.gSTATE_IDLE"
          return
 
-      # update PC
-      self.progExecOutQueue.put(gc.threadEvent(gc.gEV_PC_UPDATE, self.workingProgramCounter))
+      # update PC, when streaming PC follows device acknowledge
+      if not self.StreamEnabled():
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_PC_UPDATE, self.workingProgramCounter))
 
       # check for break point hit
       if (self.workingProgramCounter in self.breakPointSet) and \
          (self.workingProgramCounter != self.initialProgramCounter):
+         # let the device acknowledge lines in flight
+         if len(self.streamPendingLines) > 0:
+            self.WaitForResponse()
+            return
+
          self.swState = gc.gSTATE_BREAK
          self.progExecOutQueue.put(gc.threadEvent(gc.gEV_HIT_BRK_PT, None))
          if self.cmdLineOptions.vverbose:
@@ -523,32 +646,46 @@ class gsatProgramExecuteThread(threading.Thread):
                (self.workingProgramCounter)
          return
 
-      # get gcode line
-      gcode = self.gcodeDataLines[self.workingProgramCounter]
-
       # check for msg line
-      reMsgSearch = gReGcodeMsg.search(gcode)
-      if (reMsgSearch is not None) and \
+      msg = self.gcodeProgram.GetMsg(self.workingProgramCounter)
+      if (msg is not None) and \
          (self.workingProgramCounter != self.initialProgramCounter):
+         # let the device acknowledge lines in flight
+         if len(self.streamPendingLines) > 0:
+            self.WaitForResponse()
+            return
+
          self.swState = gc.gSTATE_BREAK
-         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_HIT_MSG, reMsgSearch.group(1)))
+         self.progExecOutQueue.put(gc.threadEvent(gc.gEV_HIT_MSG, msg))
          if self.cmdLineOptions.vverbose:
             print "** gsatProgramExecuteThread encounter MSG line PC[%s], swState->gc.gSTATE_BREAK, MSG[%s]" % \
-               (self.workingProgramCounter, reMsgSearch.group(1))
+               (self.workingProgramCounter, msg)
          return
 
-      # don't sent unnecessary data save the bits for speed
-      for reComments in gReGcodeComments:
-         gcode = reComments.sub("", gcode)
+      # check file changed while running, lines read from a changed file
+      # are blank until then
+      if (self.workingProgramCounter % gFILE_CHECK_LINES) == 0 and self.CheckProgramFile():
+         return
+
+      # get gcode line, already stripped of comments and white space
+      gcode = self.gcodeProgram.GetWire(self.workingProgramCounter)
 
       # send g-code command
-      self.RunStepSendGcode(gcode)
+      if self.StreamEnabled():
+         self.StreamSendGcode(gcode)
+      else:
+         self.RunStepSendGcode(gcode)
 
    def ProcessStepSate(self):
       # send data to serial port ----------------------------------------------
 
+      # let the device acknowledge lines in flight from a previous run
+      if len(self.streamPendingLines) > 0:
+         self.WaitForResponse()
+         return
+
       # check if we are done with gcode
-      if self.workingProgramCounter >= len(self.gcodeDataLines):
+      if self.workingProgramCounter >= len(self.gcodeProgram):
          self.swState = gc.gSTATE_IDLE
          self.progExecOutQueue.put(gc.threadEvent(gc.gEV_STEP_END, None))
          if self.cmdLineOptions.vverbose:
@@ -566,19 +703,30 @@ class gsatProgramExecuteThread(threading.Thread):
             print "** gsatProgramExecuteThread finish STEP cmd, swState->gc.gSTATE_IDLE"
          return
 
-      gcode = self.gcodeDataLines[self.workingProgramCounter]
-
-      # don't sent unnecessary data save the bits for speed
-      for reComments in gReGcodeComments:
-         gcode = reComments.sub("", gcode)
+      gcode = self.gcodeProgram.GetWire(self.workingProgramCounter)
 
       self.RunStepSendGcode(gcode)
 
    def ProcessIdleSate(self):
-      self.SerialRead()
+      # if there is nothing to send, sleep until serial RX data or a UI
+      # command arrives
+      block = True
+      if len(self.serialWriteQueue) > 0 and self.StreamCanSend(self.serialWriteQueue[0][0]):
+         block = False
+
+      self.ProcessQueue(block)
 
    def ProcessSerialWriteQueue(self):
       if len(self.serialWriteQueue) > 0:
+         # lines in flight, stream data so acknowledges stay in order
+         if len(self.streamPendingLines) > 0:
+            data = self.serialWriteQueue[0]
+
+            if self.StreamCanSend(data[0]):
+               self.serialWriteQueue.pop(0)
+               self.SerialWrite(data[0])
+            return
+
          data = self.serialWriteQueue.pop(0)
          self.SerialWrite(data[0])
 
@@ -593,16 +741,23 @@ class gsatProgramExecuteThread(threading.Thread):
       if self.cmdLineOptions.vverbose:
          print "** gsatProgramExecuteThread start."
 
+      try:
+         self.lineTiming = gt.gsatLineTiming(self.machineTraceFile)
+      except IOError, e:
+         if self.cmdLineOptions.verbose:
+            print "** gsatProgramExecuteThread can't open trace file: %s" % str(e)
+         self.lineTiming = gt.gsatLineTiming()
+
       # inti serial RX thread
-      self.serialRxThread = gsatSerialPortThread(self, self.serPort, self.progExecSerialRxOutQueue,
-      self.progExecSerialRxInQueue, self.cmdLineOptions)
+      self.serialRxThread = gsatSerialPortThread(self.notifySink, self.serPort, self.progExecSerialRxOutQueue,
+      self.progExecInQueue, self.cmdLineOptions)
+
+      # init status poll thread
+      self.statusPollThread = gsatStatusPollThread(self)
 
-      # init communication with device (helps to force tinyG into txt mode
-      if self.deviceID == gc.gDEV_TINYG2 or self.deviceID == gc.gDEV_TINYG:
-         self.SerialWrite(gc.gTINYG_CMD_GET_STATUS)
-      elif self.deviceID == gc.gDEV_GRBL:
-         self.SerialWrite(gc.gGRBL_CMD_GET_STATUS)
-         self.SerialWrite(gc.gGRBL_CMD_GET_STATUS)
+      # init communication with device
+      for initCmd in self.device.GetInitCommands(self.StreamEnabled()):
+         self.SerialWrite(initCmd)
 
       while(self.endThread != True):
 
@@ -627,7 +782,7 @@ class gsatProgramExecuteThread(threading.Thread):
                self.ProcessIdleSate()
             elif self.swState == gc.gSTATE_ABORT:
                # do nothing, wait to be terminated
-               pass
+               self.ProcessQueue(block=True)
             else:
                if self.cmdLineOptions.verbose:
                   print "** gsatProgramExecuteThread unexpected state [%d], moving back to IDLE." \
@@ -646,15 +801,42 @@ class gsatProgramExecuteThread(threading.Thread):
 
             # add data to queue and signal main window to consume
             self.progExecOutQueue.put(gc.threadEvent(gc.gEV_ABORT, ""))
-            wx.PostEvent(self.notifyWindow, gc.threadQueueEvent(None))
-            wx.LogMessage(message)
+            self.notifySink.Notify()
+            self.notifySink.LogMessage(message)
             break
 
-         time.sleep(0.02)
+      self.statusPollThread.endThread = True
+      self.lineTiming.Close()
 
       if self.cmdLineOptions.vverbose:
          print "** gsatProgramExecuteThread exit."
 
+"""----------------------------------------------------------------------------
+   gsatStatusPollThread:
+   Paces the execute thread status poller. A thread of its own, so the
+   execute thread keeps blocking on its queue with no timeout.
+----------------------------------------------------------------------------"""
+class gsatStatusPollThread(threading.Thread):
+   def __init__(self, prog_exec_thread):
+      threading.Thread.__init__(self)
+
+      self.progExecThread = prog_exec_thread
+      self.endThread = False
+
+      self.daemon = True
+      self.start()
+
+   def run(self):
+      while not self.endThread:
+         period = self.progExecThread.statusPollPeriod
+
+         if period > 0:
+            time.sleep(period)
+            if not self.endThread:
+               self.progExecThread.StatusPoll()
+         else:
+            time.sleep(gSTATUS_POLL_OFF_SLEEP)
+
 """----------------------------------------------------------------------------
    gsatSerialPortThread:
    Threads that monitor serial port for new data and sends events to
@@ -662,12 +844,12 @@ class gsatProgramExecuteThread(threading.Thread):
 ----------------------------------------------------------------------------"""
 class gsatSerialPortThread(threading.Thread):
    """Worker Thread Class."""
-   def __init__(self, notify_window, serial, in_queue, out_queue, cmd_line_options):
+   def __init__(self, notify_sink, serial, in_queue, out_queue, cmd_line_options):
       """Init Worker Thread Class."""
       threading.Thread.__init__(self)
 
       # init local variables
-      self.notifyWindow = notify_window
+      self.notifySink = notify_sink
       self.serPort = serial
       self.serialThreadInQueue = in_queue
       self.serialThreadOutQueue = out_queue
@@ -684,9 +866,9 @@ class gsatSerialPortThread(threading.Thread):
    gsatSerialPortThread: Main Window Event Handlers
    Handle events coming from main UI
    -------------------------------------------------------------------------"""
-   def ProcessQueue(self):
+   def ProcessQueue(self, block=False):
       # process events from queue ---------------------------------------------
-      if not self.serialThreadInQueue.empty():
+      if block or not self.serialThreadInQueue.empty():
          # get item from queue
          e = self.serialThreadInQueue.get()
 
@@ -708,16 +890,22 @@ class gsatSerialPortThread(threading.Thread):
       serialData = ""
 
       try:
-         inDataCnt = self.serPort.inWaiting()
+         # block until data arrives or port read timeout expires, then
+         # pick up anything else already waiting
+         rxData = self.serPort.read(1)
 
-         while inDataCnt > 0 and not exFlag:
+         if len(rxData) > 0:
+            inDataCnt = self.serPort.inWaiting()
 
             # read data from port
             # Was running with performance issues using readline(), move to read()
             # Using "".join() as performance is much better then "+="
             #serialData = self.serPort.readline()
             #self.rxBuffer += self.serPort.read(inDataCnt)
-            self.rxBuffer = "".join([self.rxBuffer, self.serPort.read(inDataCnt)])
+            if inDataCnt > 0:
+               rxData = "".join([rxData, self.serPort.read(inDataCnt)])
+
+            self.rxBuffer = "".join([self.rxBuffer, rxData])
 
             while '\n' in self.rxBuffer:
                serialData, self.rxBuffer = self.rxBuffer.split('\n', 1)
@@ -734,8 +922,6 @@ class gsatSerialPortThread(threading.Thread):
                   # add data to queue
                   self.serialThreadOutQueue.put(gc.threadEvent(gc.gEV_SER_RXDATA, "%s\n" % serialData))
 
-            inDataCnt = self.serPort.inWaiting()
-
       except serial.SerialException, e:
          exMsg = "** PySerial exception: %s\n" % e.message
          exFlag = True
@@ -748,6 +934,11 @@ class gsatSerialPortThread(threading.Thread):
          exMsg = "** IOError exception: %s\n" % str(e)
          exFlag = True
 
+      except TypeError, e:
+         # port closed by main window while blocked in read
+         exMsg = "** Serial port closed: %s\n" % str(e)
+         exFlag = True
+
       if exFlag:
          # make sure we stop processing any states...
          self.swState = gc.gSTATE_ABORT
@@ -780,7 +971,7 @@ class gsatSerialPortThread(threading.Thread):
                self.SerialRead()
             elif self.swState == gc.gSTATE_ABORT:
                # do nothing, wait to be terminated
-               pass
+               self.ProcessQueue(block=True)
             else:
                if self.cmdLineOptions.verbose:
                   print "** gsatSerialPortThread unexpected state [%d], moving back to IDLE." \
@@ -799,10 +990,8 @@ class gsatSerialPortThread(threading.Thread):
 
             # add data to queue
             self.serialThreadOutQueue.put(gc.threadEvent(gc.gEV_ABORT, ""))
-            wx.LogMessage(message)
+            self.notifySink.LogMessage(message)
             break
 
-         time.sleep(0.01)
-
       if self.cmdLineOptions.vverbose:
          print "** gsatSerialPortThread exit."
@@ -0,0 +1,395 @@
+"""----------------------------------------------------------------------------
+   program.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import os
+import re
+import mmap
+import array
+import bisect
+import itertools
+
+try:
+   import numpy
+except ImportError:
+   numpy = None
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# comments example "( comment string )" or "; comment string"
+gReGcodeComments = [re.compile(r'\(.*\)'), re.compile(r';.*')]
+
+# message example "(MSG, CHANGE TOOL BIT: to drill size 0.81300 mm)"
+gReGcodeMsg = re.compile(r'^\s*\(MSG,(.+)\)')
+
+# line ends, same lines as the styled text control (a trailing line end
+# starts a new empty line)
+gReLineSplit = re.compile(r'\r\n|\r|\n')
+
+# line flags
+gPROG_LINE_BLANK  = 0x01     # nothing to send after stripping comments
+gPROG_LINE_MSG    = 0x02     # MSG line, program stops and shows message
+
+# program source, first item of Encode data
+gPROG_SOURCE_LINES = 0       # gsatProgram, compiled lines
+gPROG_SOURCE_FILE  = 1       # gsatFileProgram, file name and line index
+
+# bytes scanned at a time when indexing with numpy, bounds temporary arrays
+gPROG_INDEX_CHUNK = 16*1024*1024
+
+# MSG line marker, see gReGcodeMsg
+gPROG_MSG_MARKER = "(MSG,"
+
+# program revisions, a new one for each compile or edit, copies keep it
+gPROG_REVISIONS = itertools.count(1)
+
+"""----------------------------------------------------------------------------
+   CompileLine:
+   Returns (wire, flags, msg) for a single source line, wire is the g-code
+   without comments or white space, msg is None unless line is a MSG line.
+----------------------------------------------------------------------------"""
+def CompileLine(line):
+   flags = 0
+   msg = None
+
+   # don't sent unnecessary data save the bits for speed
+   if '(' in line or ';' in line:
+      reMsgSearch = gReGcodeMsg.search(line)
+      if reMsgSearch is not None:
+         msg = reMsgSearch.group(1)
+         flags |= gPROG_LINE_MSG
+
+      for reComments in gReGcodeComments:
+         line = reComments.sub("", line)
+
+   wire = line.strip()
+
+   if len(wire) == 0:
+      wire = ""
+      flags |= gPROG_LINE_BLANK
+
+   return wire, flags, msg
+
+def SplitLines(text):
+   return gReLineSplit.split(text)
+
+"""----------------------------------------------------------------------------
+   IndexLines:
+   Line start offsets of data (str or mmap), one entry per line plus one
+   past the end, so line i is data[index[i]:index[i+1]-1]. Lines end with
+   "\n" ("\r" before it is stripped with the line), or "\r" for files with
+   no "\n" at all. numpy uint64 array when numpy is available, found in
+   one vectorized pass per chunk, otherwise array of unsigned long.
+----------------------------------------------------------------------------"""
+def IndexLines(data):
+   size = len(data)
+   lineEnd = '\n'
+   if data.find(lineEnd) < 0:
+      lineEnd = '\r'
+
+   if numpy is not None:
+      dataBytes = numpy.frombuffer(data, numpy.uint8)
+      lineEndByte = ord(lineEnd)
+      starts = [numpy.zeros(1, numpy.uint64)]
+
+      for offset in xrange(0, size, gPROG_INDEX_CHUNK):
+         chunk = dataBytes[offset:offset + gPROG_INDEX_CHUNK]
+         starts.append((numpy.flatnonzero(chunk == lineEndByte) + (offset + 1)).astype(numpy.uint64))
+
+      starts.append(numpy.array([size + 1], numpy.uint64))
+      return numpy.concatenate(starts)
+
+   index = array.array('L', [0])
+   append = index.append
+   find = data.find
+
+   position = find(lineEnd)
+   while position >= 0:
+      append(position + 1)
+      position = find(lineEnd, position + 1)
+
+   append(size + 1)
+   return index
+
+def IndexToString(index):
+   return index.tostring()
+
+def IndexFromString(data):
+   # same process type or a worker process of it, same index type
+   if numpy is not None:
+      return numpy.frombuffer(data, numpy.uint64)
+
+   index = array.array('L')
+   index.fromstring(data)
+   return index
+
+"""----------------------------------------------------------------------------
+   LoadProgram:
+   Program for a g-code file, file backed (see gsatFileProgram) for the
+   large file viewer and headless runs, empty files can't be mapped and
+   get an empty compiled program. IOError and mmap errors
+   (EnvironmentError) are left to the caller.
+----------------------------------------------------------------------------"""
+def LoadProgram(file_name):
+   if os.path.getsize(file_name) == 0:
+      return gsatProgram([""])
+
+   return gsatFileProgram(file_name)
+
+def GetFileStat(file_name):
+   """ (size, modification time) of a file, None if it can't be read.
+   """
+   try:
+      fileStat = os.stat(file_name)
+   except OSError:
+      return None
+
+   return (fileStat.st_size, fileStat.st_mtime)
+
+def DecodeProgram(data):
+   """ Program from Encode data, file programs read the file again.
+   """
+   if data[0] == gPROG_SOURCE_FILE:
+      # worker only runs the program, lines are read from the file, nothing
+      # is mapped, changed file refuses to run (IsFileChanged)
+      return gsatFileProgram(data[1], "", IndexFromString(data[2]), data[3], data[4])
+
+   program = gsatProgram()
+   program.wireLines = data[1]
+   program.lineFlags = bytearray(data[2])
+   program.msgLines = data[3]
+   return program
+
+"""----------------------------------------------------------------------------
+   gsatProgram:
+   Compiled g-code program, built once when file is opened or edited so the
+   program execute thread does no per line regex work while running.
+   Index in all tables is the source (editor) line number.
+----------------------------------------------------------------------------"""
+class gsatProgram():
+   def __init__(self, lines=None):
+      self.wireLines = []
+      self.lineFlags = bytearray()
+      self.msgLines = dict()
+      self.revision = next(gPROG_REVISIONS)
+
+      if lines is not None:
+         self.Compile(lines)
+
+   def __len__(self):
+      return len(self.lineFlags)
+
+   def Compile(self, lines):
+      wireLines = []
+      lineFlags = bytearray(len(lines))
+      msgLines = dict()
+
+      for index, line in enumerate(lines):
+         wire, flags, msg = CompileLine(line)
+
+         wireLines.append(wire)
+         lineFlags[index] = flags
+
+         if msg is not None:
+            msgLines[index] = msg
+
+      self.wireLines = wireLines
+      self.lineFlags = lineFlags
+      self.msgLines = msgLines
+      self.revision = next(gPROG_REVISIONS)
+
+   def Splice(self, index, count, lines):
+      """ Replace count lines starting at index with lines, only the new
+          lines are compiled.
+      """
+      wireLines = []
+      lineFlags = bytearray(len(lines))
+      msgLines = dict()
+
+      for offset, line in enumerate(lines):
+         wire, flags, msg = CompileLine(line)
+
+         wireLines.append(wire)
+         lineFlags[offset] = flags
+
+         if msg is not None:
+            msgLines[index + offset] = msg
+
+      self.wireLines[index:index + count] = wireLines
+      self.lineFlags[index:index + count] = lineFlags
+
+      # move MSG entries after the edit
+      delta = len(lines) - count
+      for msgIndex, msg in self.msgLines.iteritems():
+         if msgIndex < index:
+            msgLines[msgIndex] = msg
+         elif msgIndex >= index + count:
+            msgLines[msgIndex + delta] = msg
+
+      self.msgLines = msgLines
+      self.revision = next(gPROG_REVISIONS)
+
+   def Copy(self):
+      """ Snapshot for a run, the editor can keep changing the original.
+      """
+      program = gsatProgram()
+      program.wireLines = list(self.wireLines)
+      program.lineFlags = bytearray(self.lineFlags)
+      program.msgLines = dict(self.msgLines)
+      program.revision = self.revision
+      return program
+
+   def Encode(self):
+      # plain types, for marshal and pipes
+      return (gPROG_SOURCE_LINES, self.wireLines, str(self.lineFlags), self.msgLines)
+
+   def GetWire(self, index):
+      return self.wireLines[index]
+
+   def GetMsg(self, index):
+      return self.msgLines.get(index)
+
+   def IsBlank(self, index):
+      return (self.lineFlags[index] & gPROG_LINE_BLANK) != 0
+
+   def IsFileChanged(self):
+      # compiled lines don't depend on the file
+      return False
+
+"""----------------------------------------------------------------------------
+   gsatFileProgram:
+   Program backed by a memory mapped g-code file, for files too big to
+   keep as a list of lines. Only the line index (8 bytes per line) and MSG
+   lines are built when opened from the mapping, the viewer reads lines
+   from it too. The execute thread reads lines with seek and read on its
+   own file object and compiles them as it sends them, a file truncated
+   while running gives a short read instead of a SIGBUS from the mapping.
+   Same interface as gsatProgram, read only. File size and modification
+   time are kept from when it was mapped, a changed file must not be run,
+   see IsFileChanged.
+----------------------------------------------------------------------------"""
+class gsatFileProgram():
+   def __init__(self, file_name, data=None, line_index=None, msg_lines=None, file_stat=None):
+      self.fileName = file_name
+
+      if data is None:
+         with open(file_name, 'rb') as f:
+            fileStat = os.fstat(f.fileno())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+         if file_stat is None:
+            file_stat = (fileStat.st_size, fileStat.st_mtime)
+
+      self.data = data
+      self.file = None
+      self.fileStat = file_stat
+      self.revision = next(gPROG_REVISIONS)
+
+      if line_index is None:
+         line_index = IndexLines(self.data)
+
+      self.lineIndex = line_index
+
+      if msg_lines is None:
+         msg_lines = self.FindMsgLines()
+
+      self.msgLines = msg_lines
+
+   def __len__(self):
+      return len(self.lineIndex) - 1
+
+   def FindMsgLines(self):
+      # MSG lines are rare, find marker in mapping instead of compiling
+      # every line
+      msgLines = dict()
+      position = self.data.find(gPROG_MSG_MARKER)
+
+      while position >= 0:
+         index = self.GetLineFromPosition(position)
+         wire, flags, msg = CompileLine(self.GetLine(index))
+
+         if msg is not None:
+            msgLines[index] = msg
+
+         position = self.data.find(gPROG_MSG_MARKER, int(self.lineIndex[index + 1]))
+
+      return msgLines
+
+   def GetLineFromPosition(self, position):
+      if numpy is not None and isinstance(self.lineIndex, numpy.ndarray):
+         return int(numpy.searchsorted(self.lineIndex, position, side='right')) - 1
+
+      return bisect.bisect_right(self.lineIndex, position) - 1
+
+   def GetLine(self, index):
+      return self.data[int(self.lineIndex[index]):int(self.lineIndex[index + 1]) - 1]
+
+   def ReadLine(self, index):
+      # execute path, unbuffered so every read sees the file as it is now,
+      # short read means the file changed, nothing of a partial line is
+      # returned
+      start = int(self.lineIndex[index])
+      length = int(self.lineIndex[index + 1]) - 1 - start
+
+      try:
+         if self.file is None:
+            self.file = open(self.fileName, 'rb', 0)
+
+         self.file.seek(start)
+         line = self.file.read(length)
+      except IOError:
+         return ""
+
+      if len(line) < length:
+         return ""
+
+      return line
+
+   def Copy(self):
+      """ File is read only, runs share mapping and index, each copy reads
+          with its own file object.
+      """
+      program = gsatFileProgram(self.fileName, self.data, self.lineIndex, self.msgLines,
+         self.fileStat)
+      program.revision = self.revision
+      return program
+
+   def Encode(self):
+      # worker process reads file again, index is sent as is
+      return (gPROG_SOURCE_FILE, self.fileName, IndexToString(self.lineIndex), self.msgLines,
+         self.fileStat)
+
+   def GetWire(self, index):
+      return CompileLine(self.ReadLine(index))[0]
+
+   def GetMsg(self, index):
+      return self.msgLines.get(index)
+
+   def IsBlank(self, index):
+      return len(self.GetWire(index)) == 0
+
+   def IsFileChanged(self):
+      return GetFileStat(self.fileName) != self.fileStat
@@ -0,0 +1,475 @@
+"""----------------------------------------------------------------------------
+   simulator.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import os
+import re
+import sys
+import time
+import json
+import threading
+import collections
+from optparse import OptionParser
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# same names as /machine/Device
+gSIM_DEVICE_LIST = ["Grbl", "TinyG", "TinyG2"]
+
+# defaults per device, (version, RX buffer size, planner size)
+gSIM_DEVICE_DEFAULTS = {
+   "Grbl"   : ("0.8c",   128, 18),
+   "TinyG"  : ("440.20", 254, 28),
+   "TinyG2" : ("100.19", 1024, 48),
+}
+
+gSIM_REALTIME_CHARS = "?!~\x18"
+
+gReSimAxis = re.compile(r'([XYZ])\s*([-+]?\d*\.?\d*)', re.I)
+gReSimWord = re.compile(r'\s*([A-Z])\s*([-+]?\d*\.?\d*)', re.I)
+gReSimComments = [re.compile(r'\(.*\)'), re.compile(r';.*')]
+
+"""----------------------------------------------------------------------------
+   gsatDeviceSimulator:
+   Simulated controller attached to a pseudo terminal, gsat (or anything
+   else) opens PortName like a real serial port. Emulates the Grbl and
+   TinyG/TinyG2 text and JSON ({"ej":1}) protocols: version banner,
+   acknowledges, error responses, status query, a bounded RX buffer and a
+   planner queue that
+   executes one line every line_delay seconds. Lines are acknowledged when
+   they move from the RX buffer into the planner, as the real devices do.
+   Posix only (pty).
+----------------------------------------------------------------------------"""
+class gsatDeviceSimulator(threading.Thread):
+   def __init__(self, device="Grbl", version=None, rx_buffer_size=None, planner_size=None,
+      line_delay=0.0, verbose=False):
+      threading.Thread.__init__(self)
+      self.daemon = True
+
+      import pty
+      import tty
+
+      if device not in gSIM_DEVICE_LIST:
+         raise ValueError("Unknown device [%s], expected one of %s" % (device, gSIM_DEVICE_LIST))
+
+      defVersion, defRxBufferSize, defPlannerSize = gSIM_DEVICE_DEFAULTS[device]
+
+      self.device = device
+      self.version = version or defVersion
+      self.rxBufferSize = rx_buffer_size or defRxBufferSize
+      self.plannerSize = planner_size or defPlannerSize
+      self.lineDelay = line_delay
+      self.verbose = verbose
+
+      # pty, keep slave open so master does not see hang ups when the client
+      # closes the port
+      self.masterFd, self.slaveFd = pty.openpty()
+      tty.setraw(self.slaveFd)
+      self.portName = os.ttyname(self.slaveFd)
+
+      self.lock = threading.Condition()
+      self.writeLock = threading.Lock()
+
+      self.rxBuffer = bytearray()
+      self.plannerQueue = collections.deque()
+      self.position = [0.0, 0.0, 0.0]
+      self.hold = False
+      self.connected = False
+      self.queueReports = False
+      self.jsonMode = False
+      self.endThread = False
+
+      # statistics
+      self.stats = dict({
+         'linesReceived'   : 0,
+         'linesExecuted'   : 0,
+         'bytesReceived'   : 0,
+         'rxOverflow'      : 0,
+         'rxBufferPeak'    : 0,
+         'statusRequests'  : 0,
+         'errors'          : 0,
+      })
+
+      self.readThread = threading.Thread(target=self.ReadLoop)
+      self.readThread.daemon = True
+      self.motionThread = threading.Thread(target=self.MotionLoop)
+      self.motionThread.daemon = True
+
+   def Start(self):
+      self.readThread.start()
+      self.motionThread.start()
+      self.start()
+      return self.portName
+
+   def Stop(self):
+      with self.lock:
+         self.endThread = True
+         self.lock.notify_all()
+
+      for fd in [self.masterFd, self.slaveFd]:
+         try:
+            os.close(fd)
+         except OSError:
+            pass
+
+   def GetStats(self):
+      with self.lock:
+         return dict(self.stats)
+
+   """-------------------------------------------------------------------------
+   gsatDeviceSimulator: Device output
+   -------------------------------------------------------------------------"""
+   def Write(self, data):
+      if self.verbose:
+         for line in data.splitlines():
+            if len(line.strip()) > 0:
+               print "[sim] -> %s" % line.strip()
+
+      with self.writeLock:
+         try:
+            os.write(self.masterFd, data)
+         except OSError:
+            pass
+
+   def WriteBanner(self):
+      if self.device == "Grbl":
+         self.Write("\r\nGrbl %s ['$' for help]\r\n" % self.version)
+      elif self.jsonMode:
+         self.WriteJsonResponse({'fb':self.version, 'msg':"SYSTEM READY"})
+      else:
+         self.WritePrompt()
+
+   def WriteJson(self, data):
+      self.Write("%s\n" % json.dumps(data, separators=(',', ':')))
+
+   def WriteJsonResponse(self, response, status=0):
+      # footer: revision, status, RX buffer bytes free
+      self.WriteJson({'r':response, 'f':[1, status, self.rxBufferSize - len(self.rxBuffer)]})
+
+   def GetStatusReport(self):
+      stat = 3
+      if self.hold:
+         stat = 6
+      elif len(self.plannerQueue) > 0:
+         stat = 5
+
+      x, y, z = self.position
+      return {'posx':round(x, 3), 'posy':round(y, 3), 'posz':round(z, 3), 'vel':0.0,
+         'stat':stat}
+
+   def WritePrompt(self):
+      # TinyG2 text mode uses same prompt as TinyG
+      self.Write("tinyg [mm] ok> \n")
+
+   def WriteAck(self):
+      if self.device == "Grbl":
+         self.Write("ok\r\n")
+      elif self.jsonMode:
+         self.WriteJsonResponse({})
+      else:
+         self.WritePrompt()
+
+   def WriteError(self, message):
+      self.stats['errors'] += 1
+
+      if self.device == "Grbl":
+         self.Write("error: %s\r\n" % message)
+      elif self.jsonMode:
+         self.WriteJsonResponse({'msg':message}, 108)
+      else:
+         self.Write("tinyg [mm] err: %s\n" % message)
+
+   def WriteStatus(self):
+      x, y, z = self.position
+      state = self.GetStateName()
+
+      if self.device == "Grbl":
+         self.Write("<%s,MPos:%0.3f,%0.3f,%0.3f,WPos:%0.3f,%0.3f,%0.3f>\r\n" %
+            (state, x, y, z, x, y, z))
+      else:
+         if self.device == "TinyG2":
+            posFmt = "%s machine posn:    %0.3f mm\n"
+         else:
+            posFmt = "%s position:          %0.3f mm\n"
+
+         self.Write("".join([posFmt % ("X", x), posFmt % ("Y", y), posFmt % ("Z", z),
+            "Machine state:       %s\n" % state]))
+
+   def WriteStatusReport(self):
+      # TinyG status report, sent when machine starts or stops moving
+      report = self.GetStatusReport()
+
+      if self.jsonMode:
+         self.WriteJson({'sr':report})
+      else:
+         self.Write("posx:%0.3f,posy:%0.3f,posz:%0.3f,vel:0.000,stat:%d\n" % (
+            report['posx'], report['posy'], report['posz'], report['stat']))
+
+   def WriteQueueReport(self):
+      if self.queueReports:
+         if self.jsonMode:
+            self.WriteJson({'qr':self.plannerSize - len(self.plannerQueue)})
+         else:
+            self.Write("qr:%d\n" % (self.plannerSize - len(self.plannerQueue)))
+
+   def GetStateName(self):
+      if self.hold:
+         return "Hold"
+      elif len(self.plannerQueue) > 0:
+         return "Run"
+      elif self.device == "Grbl":
+         return "Idle"
+
+      return "Stop"
+
+   """-------------------------------------------------------------------------
+   gsatDeviceSimulator: Serial RX, bytes land in RX buffer, real time
+   commands are handled as soon as they arrive
+   -------------------------------------------------------------------------"""
+   def ReadLoop(self):
+      while not self.endThread:
+         try:
+            data = os.read(self.masterFd, 1024)
+         except OSError:
+            break
+
+         if len(data) == 0:
+            break
+
+         with self.lock:
+            # real device resets when port opens, show banner first
+            if not self.connected:
+               self.connected = True
+               self.WriteBanner()
+
+            self.stats['bytesReceived'] += len(data)
+
+            for c in data:
+               if self.device == "Grbl" and c in gSIM_REALTIME_CHARS:
+                  self.ProcessRealtime(c)
+               elif self.device != "Grbl" and c in "!~\x18":
+                  self.ProcessRealtime(c)
+               elif len(self.rxBuffer) < self.rxBufferSize:
+                  self.rxBuffer.append(c)
+               else:
+                  # real device drops data when RX buffer is full
+                  self.stats['rxOverflow'] += 1
+
+            self.stats['rxBufferPeak'] = max(self.stats['rxBufferPeak'], len(self.rxBuffer))
+            self.lock.notify_all()
+
+   def ProcessRealtime(self, c):
+      if c == '?':
+         self.stats['statusRequests'] += 1
+         self.WriteStatus()
+      elif c == '!':
+         self.hold = True
+      elif c == '~':
+         self.hold = False
+      elif c == '\x18':
+         self.rxBuffer = bytearray()
+         self.plannerQueue.clear()
+         self.hold = False
+         self.WriteBanner()
+
+   """-------------------------------------------------------------------------
+   gsatDeviceSimulator: Parser, moves lines from RX buffer to planner
+   -------------------------------------------------------------------------"""
+   def run(self):
+      while True:
+         with self.lock:
+            while not self.endThread and \
+               ('\n' not in self.rxBuffer or len(self.plannerQueue) >= self.plannerSize):
+               self.lock.wait()
+
+            if self.endThread:
+               break
+
+            index = self.rxBuffer.index('\n')
+            line = str(self.rxBuffer[:index]).strip()
+            del self.rxBuffer[:index+1]
+
+            self.ProcessLine(line)
+            self.lock.notify_all()
+
+   def ProcessLine(self, line):
+      statusQuery = False
+
+      if self.verbose and len(line) > 0:
+         print "[sim] <- %s" % line
+
+      # TinyG status query, also appended to lines by gsat auto status
+      if self.device != "Grbl" and line.endswith('?'):
+         line = line[:-1].strip()
+         statusQuery = True
+
+      if len(line) == 0:
+         pass
+
+      elif line.startswith('$'):
+         self.ProcessSetting(line)
+
+      elif self.device != "Grbl" and line.startswith('{'):
+         # JSON command, response is the acknowledge
+         self.ProcessJson(line)
+         return
+
+      else:
+         self.stats['linesReceived'] += 1
+
+         gcode = line
+         for reComments in gReSimComments:
+            gcode = reComments.sub("", gcode)
+
+         if len(gReSimWord.sub("", gcode).strip()) > 0:
+            self.WriteError("Invalid statement")
+            return
+
+         if len(gcode.strip()) > 0:
+            self.plannerQueue.append(self.GetTarget(gcode))
+            self.WriteQueueReport()
+
+            if self.device != "Grbl" and len(self.plannerQueue) == 1:
+               self.WriteStatusReport()
+
+      if statusQuery:
+         self.WriteStatus()
+
+      self.WriteAck()
+
+   def ProcessSetting(self, line):
+      setting = line[1:].strip().lower()
+
+      if setting.startswith("qv"):
+         value = setting[2:].strip(" =")
+         if len(value) > 0:
+            self.queueReports = value != "0"
+         self.Write("Queue report verbosity: %d [0=off,1=single,2=triple]\n" % int(self.queueReports))
+
+   def ProcessJson(self, line):
+      try:
+         command = json.loads(line)
+      except ValueError:
+         command = None
+
+      if not isinstance(command, dict):
+         self.WriteError("JSON syntax error")
+         return
+
+      response = dict()
+      for key, value in command.iteritems():
+         if key == 'ej' and value is not None:
+            self.jsonMode = bool(value)
+         elif key == 'qv' and value is not None:
+            self.queueReports = bool(value)
+         elif key == 'sr':
+            value = self.GetStatusReport()
+         elif key == 'qr':
+            value = self.plannerSize - len(self.plannerQueue)
+
+         response[key] = value
+
+      if self.jsonMode:
+         self.WriteJsonResponse(response)
+      else:
+         self.WritePrompt()
+
+   def GetTarget(self, gcode):
+      target = list(self.position)
+      if len(self.plannerQueue) > 0:
+         target = list(self.plannerQueue[-1])
+
+      for axis, value in gReSimAxis.findall(gcode):
+         try:
+            target["XYZ".index(axis.upper())] = float(value)
+         except ValueError:
+            pass
+
+      return target
+
+   """-------------------------------------------------------------------------
+   gsatDeviceSimulator: Motion, executes one planner block every line_delay
+   -------------------------------------------------------------------------"""
+   def MotionLoop(self):
+      while True:
+         with self.lock:
+            while not self.endThread and (len(self.plannerQueue) == 0 or self.hold):
+               self.lock.wait()
+
+            if self.endThread:
+               break
+
+         if self.lineDelay > 0:
+            time.sleep(self.lineDelay)
+
+         with self.lock:
+            # planner may be flushed by reset while we slept
+            if len(self.plannerQueue) > 0 and not self.hold:
+               self.position = self.plannerQueue.popleft()
+               self.stats['linesExecuted'] += 1
+               self.WriteQueueReport()
+
+               if self.device != "Grbl" and len(self.plannerQueue) == 0:
+                  self.WriteStatusReport()
+
+               self.lock.notify_all()
+
+"""----------------------------------------------------------------------------
+   main:
+   Run simulator stand alone, connect gsat to the printed port.
+----------------------------------------------------------------------------"""
+if __name__ == '__main__':
+   parser = OptionParser(usage="usage: %prog [options]")
+   parser.add_option("-d", "--device", dest="device", default="Grbl",
+      help="Device to simulate %s [default: %%default]" % gSIM_DEVICE_LIST)
+   parser.add_option("--device-version", dest="version", default=None,
+      help="Version reported by device (Grbl 0.8c, 0.9j ...)")
+   parser.add_option("--rx-buffer", dest="rxBufferSize", type="int", default=None,
+      help="Device RX buffer size in bytes")
+   parser.add_option("--planner", dest="plannerSize", type="int", default=None,
+      help="Device planner queue size in lines")
+   parser.add_option("--delay", dest="lineDelay", type="float", default=0.0,
+      help="Line execution time in milliseconds [default: %default]")
+   parser.add_option("-v", "--verbose", dest="verbose", action="store_true", default=False,
+      help="print data sent and received by device")
+
+   (options, args) = parser.parse_args()
+
+   sim = gsatDeviceSimulator(options.device, options.version, options.rxBufferSize,
+      options.plannerSize, options.lineDelay/1000.0, options.verbose)
+
+   print "Simulated %s %s on %s (RX buffer %d bytes, planner %d lines), Ctrl-C to exit." % \
+      (sim.device, sim.version, sim.Start(), sim.rxBufferSize, sim.plannerSize)
+   sys.stdout.flush()
+
+   try:
+      while True:
+         time.sleep(1)
+   except KeyboardInterrupt:
+      pass
+
+   sim.Stop()
+   print sim.GetStats()
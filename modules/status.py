@@ -0,0 +1,235 @@
+"""----------------------------------------------------------------------------
+   status.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import re
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# number, device reports use fixed point
+gNUM = r'(-?\d+\.?\d*)'
+
+# Grbl 0.8/0.9 example "<Run,MPos:20.163,0.000,0.000,WPos:20.163,0.000,0.000>",
+# 0.9 may add ",Buf:0,RX:0,F:100.0" before ">"
+gReGrblStatus = re.compile(r'<(\w+),MPos:%s,%s,%s,WPos:%s,%s,%s(?:[^>]*,F:%s)?' %
+   (gNUM, gNUM, gNUM, gNUM, gNUM, gNUM, gNUM))
+
+# Grbl 1.1 example "<Run|MPos:20.163,0.000,0.000|FS:500,8000|WCO:0.000,0.000,0.000>"
+gReGrbl11Status = re.compile(r'<(\w+)(?::\d+)?\|([^>]*)>')
+
+# TinyG status report/verbose example "posx:12.000,posy:12.200,posz:10.000,vel:0.000,stat:3"
+gReTinyGVerbose = re.compile(r'(\w*):(-?\d+\.?\d*)')
+
+# TinyG text query example "X position:          30.408 mm",
+# TinyG2 "X machine posn:      30.408 mm", "Machine state:       Stop"
+gReTinyGPosition = re.compile(r'([XYZ])\s+position:\s+%s' % gNUM)
+gReTinyGMachinePosition = re.compile(r'([XYZ])\s+machine posn:\s+%s' % gNUM)
+gReTinyGState = re.compile(r'(\w*)\s+state:\s+(\w*)')
+
+# TinyG report keys to record fields
+gTINYG_KEYS = {
+   'posx':'wposx', 'posy':'wposy', 'posz':'wposz',
+   'mpox':'mposx', 'mpoy':'mposy', 'mpoz':'mposz',
+   'vel':'feed',
+}
+
+# TinyG "stat" codes
+gTINYG_STATES = {
+   0:'Init', 1:'Ready', 2:'Alarm', 3:'Stop', 4:'End', 5:'Run', 6:'Hold', 7:'Probe',
+   8:'Run', 9:'Home',
+}
+
+"""----------------------------------------------------------------------------
+   gsatStatusRecord:
+   Machine status, same fields for all devices. Positions, feed and spindle
+   are floats, state is the device state name. Fields a report doesn't
+   carry are None, Merge keeps the newest value of each field.
+----------------------------------------------------------------------------"""
+class gsatStatusRecord(object):
+   __slots__ = ('state', 'mposx', 'mposy', 'mposz', 'wposx', 'wposy', 'wposz',
+      'feed', 'spindle')
+
+   def __init__(self, state=None, mposx=None, mposy=None, mposz=None, wposx=None,
+      wposy=None, wposz=None, feed=None, spindle=None):
+      self.state = state
+      self.mposx = mposx
+      self.mposy = mposy
+      self.mposz = mposz
+      self.wposx = wposx
+      self.wposy = wposy
+      self.wposz = wposz
+      self.feed = feed
+      self.spindle = spindle
+
+   def __repr__(self):
+      return "gsatStatusRecord%s" % str(self.Encode())
+
+   def Merge(self, record):
+      for name in gsatStatusRecord.__slots__:
+         value = getattr(record, name)
+         if value is not None:
+            setattr(self, name, value)
+
+   def Copy(self):
+      return gsatStatusRecord(*self.Encode())
+
+   def Encode(self):
+      # plain tuple, for marshal and pipes
+      return (self.state, self.mposx, self.mposy, self.mposz, self.wposx, self.wposy,
+         self.wposz, self.feed, self.spindle)
+
+   def GetDroPosition(self):
+      """ DRO shows work position, machine position for axes a device only
+          reports in machine coordinates.
+      """
+      x = self.wposx if self.wposx is not None else self.mposx
+      y = self.wposy if self.wposy is not None else self.mposy
+      z = self.wposz if self.wposz is not None else self.mposz
+      return (x, y, z)
+
+def DecodeRecord(data):
+   return gsatStatusRecord(*data)
+
+def ZeroRecord(state="Idle"):
+   # status of a machine with no reports yet
+   return gsatStatusRecord(state, wposx=0.0, wposy=0.0, wposz=0.0)
+
+"""----------------------------------------------------------------------------
+   gsatGrblStatusParser:
+   Grbl status report ("?" response) to record, Grbl 0.8/0.9 and 1.1.
+----------------------------------------------------------------------------"""
+class gsatGrblStatusParser():
+   def __init__(self):
+      # Grbl 1.1 sends work coordinate offset only now and then
+      self.wco = None
+
+   def Parse(self, serialData):
+      if '<' not in serialData:
+         return None
+
+      rematch = gReGrblStatus.search(serialData)
+      if rematch is not None:
+         data = rematch.groups()
+         feed = float(data[7]) if data[7] is not None else None
+         return gsatStatusRecord(data[0], float(data[1]), float(data[2]), float(data[3]),
+            float(data[4]), float(data[5]), float(data[6]), feed)
+
+      rematch = gReGrbl11Status.search(serialData)
+      if rematch is not None:
+         return self.ParseGrbl11(rematch.group(1), rematch.group(2))
+
+      return None
+
+   def ParseGrbl11(self, state, fields):
+      record = gsatStatusRecord(state)
+      mpos = wpos = None
+
+      for field in fields.split('|'):
+         key, sep, value = field.partition(':')
+         try:
+            values = [float(v) for v in value.split(',')]
+         except ValueError:
+            continue
+
+         if key == 'MPos':
+            mpos = values
+         elif key == 'WPos':
+            wpos = values
+         elif key == 'WCO':
+            self.wco = values
+         elif key == 'FS':
+            record.feed = values[0]
+            if len(values) > 1:
+               record.spindle = values[1]
+         elif key == 'F':
+            record.feed = values[0]
+
+      if self.wco is not None:
+         if mpos is not None and wpos is None:
+            wpos = [m - o for m, o in zip(mpos, self.wco)]
+         elif wpos is not None and mpos is None:
+            mpos = [w + o for w, o in zip(wpos, self.wco)]
+
+      if mpos is not None and len(mpos) >= 3:
+         record.mposx, record.mposy, record.mposz = mpos[:3]
+
+      if wpos is not None and len(wpos) >= 3:
+         record.wposx, record.wposy, record.wposz = wpos[:3]
+
+      return record
+
+"""----------------------------------------------------------------------------
+   TinyGReportRecord:
+   TinyG report (key, value) pairs to record, from text verbose reports or
+   JSON "sr" objects. None if no key is a status field.
+----------------------------------------------------------------------------"""
+def TinyGReportRecord(report):
+   record = gsatStatusRecord()
+   found = False
+
+   for key, value in report:
+      try:
+         if key == 'stat':
+            record.state = gTINYG_STATES.get(int(float(value)), str(value))
+            found = True
+         else:
+            name = gTINYG_KEYS.get(key)
+            if name is not None:
+               setattr(record, name, float(value))
+               found = True
+      except (TypeError, ValueError):
+         pass
+
+   return record if found else None
+
+"""----------------------------------------------------------------------------
+   gsatTinyGStatusParser:
+   TinyG/TinyG2 status reports, verbose and text query responses to record.
+   Queue reports (qr) are flow control, not status, and left out.
+----------------------------------------------------------------------------"""
+class gsatTinyGStatusParser():
+   def Parse(self, serialData):
+      rematch = gReTinyGVerbose.findall(serialData)
+      if len(rematch) > 0:
+         return TinyGReportRecord(rematch)
+
+      rematch = gReTinyGMachinePosition.search(serialData)
+      if rematch is not None:
+         record = gsatStatusRecord()
+         setattr(record, "mpos%s" % rematch.group(1).lower(), float(rematch.group(2)))
+         return record
+
+      rematch = gReTinyGPosition.search(serialData)
+      if rematch is not None:
+         record = gsatStatusRecord()
+         setattr(record, "wpos%s" % rematch.group(1).lower(), float(rematch.group(2)))
+         return record
+
+      rematch = gReTinyGState.search(serialData)
+      if rematch is not None:
+         return gsatStatusRecord(rematch.group(2))
+
+      return None
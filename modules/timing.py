@@ -0,0 +1,296 @@
+"""----------------------------------------------------------------------------
+   timing.py
+
+   Copyright (C) 2013-2014 Wilhelm Duembeg
+
+   This file is part of gsat. gsat is a cross-platform GCODE debug/step for
+   Grbl like GCODE interpreters. With features similar to software debuggers.
+   Features such as breakpoint, change current program counter, inspection
+   and modification of variables.
+
+   gsat is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 2 of the License, or
+   (at your option) any later version.
+
+   gsat is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with gsat.  If not, see <http://www.gnu.org/licenses/>.
+
+----------------------------------------------------------------------------"""
+
+import sys
+import math
+import time
+import array
+import struct
+import collections
+
+"""----------------------------------------------------------------------------
+   Globals:
+----------------------------------------------------------------------------"""
+
+# histogram, log scale buckets from 1us, 16 buckets per power of two
+# (about 4% resolution) up to ~1000 seconds
+gHIST_BUCKETS_PER_OCTAVE = 16
+gHIST_OCTAVES = 30
+gHIST_BUCKETS = gHIST_BUCKETS_PER_OCTAVE * gHIST_OCTAVES + 1
+
+# trace file, header then one record per line
+# record: pc (-1 not a program line), queued, written, first response, ack
+gTRACE_MAGIC = "GSATTRC1"
+gTRACE_RECORD = struct.Struct('<i4d')
+
+# how often line stats are sent to UI (seconds)
+gSTATS_INTERVAL = 1.0
+
+"""----------------------------------------------------------------------------
+   MonotonicTime:
+   Seconds from an arbitrary point, not affected by system clock changes.
+   Python 2 has no time.monotonic, use clock_gettime where available.
+----------------------------------------------------------------------------"""
+def InitMonotonicTime():
+   if sys.platform.startswith('win'):
+      return time.clock
+
+   try:
+      import ctypes
+      import ctypes.util
+
+      class timespec(ctypes.Structure):
+         _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+      libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+      clock_gettime = libc.clock_gettime
+      clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+      # CLOCK_MONOTONIC, 1 on Linux, 6 on Mac
+      clockID = 6 if sys.platform == 'darwin' else 1
+      ts = timespec()
+
+      if clock_gettime(clockID, ctypes.pointer(ts)) != 0:
+         return time.time
+
+      def monotonic():
+         # timespec per call, ctypes releases the GIL and several threads
+         # (execute, status poll) read the clock
+         ts = timespec()
+         clock_gettime(clockID, ctypes.byref(ts))
+         return ts.tv_sec + ts.tv_nsec * 1e-9
+
+      return monotonic
+
+   except (ImportError, OSError, AttributeError):
+      return time.time
+
+MonotonicTime = InitMonotonicTime()
+
+"""----------------------------------------------------------------------------
+   gsatLatencyHistogram:
+   Fixed size histogram of latencies in seconds, percentiles are accurate
+   to the bucket resolution.
+----------------------------------------------------------------------------"""
+class gsatLatencyHistogram():
+   def __init__(self):
+      self.Reset()
+
+   def Reset(self):
+      self.buckets = array.array('L', [0] * gHIST_BUCKETS)
+      self.count = 0
+      self.maxValue = 0.0
+
+   def Add(self, value):
+      us = value * 1000000.0
+
+      index = 0
+      if us > 1.0:
+         index = min(int(math.log(us, 2) * gHIST_BUCKETS_PER_OCTAVE) + 1, gHIST_BUCKETS - 1)
+
+      self.buckets[index] += 1
+      self.count += 1
+
+      if value > self.maxValue:
+         self.maxValue = value
+
+   def Percentile(self, pct):
+      if self.count == 0:
+         return 0.0
+
+      target = max(1, int(math.ceil(pct / 100.0 * self.count)))
+      total = 0
+
+      for index, count in enumerate(self.buckets):
+         total += count
+         if total >= target:
+            break
+
+      # bucket upper bound, never more than the max seen
+      value = 2.0 ** (float(index) / gHIST_BUCKETS_PER_OCTAVE) / 1000000.0
+      return min(value, self.maxValue)
+
+"""----------------------------------------------------------------------------
+   gsatLineTiming:
+   Per line timestamps, queued (picked from program), written (to serial
+   port), first response and acknowledge. Acknowledge latency goes into a
+   histogram, full records optionally to a binary trace file.
+   Device acknowledges lines in order, one acknowledge per line, lines in
+   flight are dropped on device reset, stop and run start.
+----------------------------------------------------------------------------"""
+class gsatLineTiming():
+   def __init__(self, trace_file_name=""):
+      self.ackHistogram = gsatLatencyHistogram()
+      self.pendingLines = collections.deque()
+      self.traceFile = None
+
+      self.RunStart()
+
+      if len(trace_file_name) > 0:
+         self.OpenTraceFile(trace_file_name)
+
+   def OpenTraceFile(self, fileName):
+      self.traceFile = open(fileName, 'ab')
+
+      if self.traceFile.tell() == 0:
+         self.traceFile.write(gTRACE_MAGIC)
+
+   def Close(self):
+      if self.traceFile is not None:
+         self.traceFile.close()
+         self.traceFile = None
+
+   def Reset(self):
+      self.pendingLines.clear()
+
+   def RunStart(self):
+      now = MonotonicTime()
+      self.Reset()
+      self.ackHistogram.Reset()
+      self.runStartTime = now
+      self.runLines = 0
+      self.statsTime = now
+      self.statsLines = 0
+
+   def LineWritten(self, pc, lines, queued=None):
+      now = MonotonicTime()
+
+      if queued is None:
+         queued = now
+
+      for i in range(lines):
+         self.pendingLines.append([pc, queued, now, None])
+
+   def Response(self, acknowledge, report=False):
+      """ report is True for status and queue reports, these are not a
+          response to the line in flight.
+      """
+      if len(self.pendingLines) == 0 or (report and not acknowledge):
+         return
+
+      now = MonotonicTime()
+      line = self.pendingLines[0]
+
+      if line[3] is None and not report:
+         line[3] = now
+
+      if acknowledge:
+         self.pendingLines.popleft()
+         self.ackHistogram.Add(now - line[2])
+         self.runLines += 1
+         self.statsLines += 1
+
+         if self.traceFile is not None:
+            pc = line[0]
+            if pc is None:
+               pc = -1
+
+            self.traceFile.write(gTRACE_RECORD.pack(pc, line[1], line[2], line[3], now))
+
+   def StatsDue(self):
+      return self.statsLines > 0 and (MonotonicTime() - self.statsTime) >= gSTATS_INTERVAL
+
+   def GetStats(self, run_end=False):
+      """ Returns dict, latencies in seconds, lps over the last interval or
+          over the whole run at run end.
+      """
+      now = MonotonicTime()
+
+      if run_end:
+         lines, elapsed = self.runLines, now - self.runStartTime
+      else:
+         lines, elapsed = self.statsLines, now - self.statsTime
+
+      self.statsTime = now
+      self.statsLines = 0
+
+      lps = 0.0
+      if elapsed > 0:
+         lps = lines / elapsed
+
+      if self.traceFile is not None:
+         self.traceFile.flush()
+
+      return dict({
+         'count'  : self.ackHistogram.count,
+         'p50'    : self.ackHistogram.Percentile(50),
+         'p95'    : self.ackHistogram.Percentile(95),
+         'p99'    : self.ackHistogram.Percentile(99),
+         'max'    : self.ackHistogram.maxValue,
+         'lps'    : lps,
+      })
+
+"""----------------------------------------------------------------------------
+   ReadTraceFile:
+   Generator of trace records (pc, queued, written, first response, ack).
+----------------------------------------------------------------------------"""
+def ReadTraceFile(fileName):
+   with open(fileName, 'rb') as f:
+      if f.read(len(gTRACE_MAGIC)) != gTRACE_MAGIC:
+         raise ValueError("%s is not a gsat trace file" % fileName)
+
+      while True:
+         data = f.read(gTRACE_RECORD.size)
+
+         if len(data) < gTRACE_RECORD.size:
+            break
+
+         yield gTRACE_RECORD.unpack(data)
+
+"""----------------------------------------------------------------------------
+   main:
+   Summary of a trace file, time waiting to send (gsat/link), time to first
+   response and to acknowledge (device).
+----------------------------------------------------------------------------"""
+if __name__ == '__main__':
+   if len(sys.argv) != 2:
+      print "usage: python -m modules.timing TRACE_FILE"
+      sys.exit(1)
+
+   sendWait = gsatLatencyHistogram()
+   firstResponse = gsatLatencyHistogram()
+   ackLatency = gsatLatencyHistogram()
+   firstAck = None
+   lastAck = None
+
+   for pc, queued, written, response, ack in ReadTraceFile(sys.argv[1]):
+      sendWait.Add(written - queued)
+      firstResponse.Add(response - written)
+      ackLatency.Add(ack - written)
+
+      if firstAck is None:
+         firstAck = ack
+      lastAck = ack
+
+   print "lines: %d" % ackLatency.count
+
+   if ackLatency.count > 1 and lastAck > firstAck:
+      print "lines/s: %0.1f" % ((ackLatency.count - 1) / (lastAck - firstAck))
+
+   for name, hist in [("send wait", sendWait), ("first response", firstResponse),
+      ("acknowledge", ackLatency)]:
+      print "%-16s ms p50 %8.3f p95 %8.3f p99 %8.3f max %8.3f" % (name,
+         hist.Percentile(50) * 1000.0, hist.Percentile(95) * 1000.0,
+         hist.Percentile(99) * 1000.0, hist.maxValue * 1000.0)